@@ -1,6 +1,6 @@
 from pathlib import Path
 
-from decouple import config
+from decouple import Csv, config
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -21,10 +21,15 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'guide.middleware.static_cache.StaticCacheControlMiddleware',
+    'guide.middleware.queries.QueryCountMiddleware',
+    'guide.middleware.timing.ServerTimingMiddleware',
+    'guide.middleware.metrics.MetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'guide.middleware.replicas.PrimaryStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -37,24 +42,153 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # шаблоны компилируются один раз на процесс (guide.warmup загружает их до первого запроса)
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
 
 WSGI_APPLICATION = 'giguide.wsgi.application'
+ASGI_APPLICATION = 'giguide.asgi.application'
+
+# Профиль БД: 'sqlite' — как раньше (локальная разработка),
+# 'sqlite-prod' — WAL + прагмы на каждое соединение + IMMEDIATE-транзакции.
+DB_PROFILE = config('DJANGO_DB_PROFILE', default='sqlite')
+
+SQLITE_PROD_PRAGMAS = {
+    'journal_mode': 'WAL',        # читатели не блокируют писателя и наоборот
+    'synchronous': 'NORMAL',      # в WAL безопасно и без fsync на каждый коммит
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,     # в КиБ (отрицательное значение) — 64 МиБ
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,         # мс ожидания блокировки вместо мгновенного "database is locked"
+}
 
-DATABASES = {
-    'default': {
+DB_PROFILES = {
+    'sqlite': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    'sqlite-prod': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': config('DJANGO_DB_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+        # Постоянные соединения — только под WSGI (gunicorn и т.п.). Под ASGI (Uvicorn, прод) запрос
+        # выполняется в новом sync-потоке, соединение потока не переиспользуется и лишь висит до выхода.
+        'CONN_MAX_AGE': config('DJANGO_CONN_MAX_AGE', default=0, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ''.join(f'PRAGMA {k}={v};' for k, v in SQLITE_PROD_PRAGMAS.items()),
+            # писатель сразу берёт RESERVED-блокировку: нет взаимных блокировок при сдвиге позиций
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': SQLITE_PROD_PRAGMAS['busy_timeout'] / 1000,
+        },
+    },
+}
+
+DATABASES = {
+    'default': DB_PROFILES[DB_PROFILE],
+}
+
+# Реплики только для чтения (для SQLite — копии файла, см. manage.py sync_replicas)
+DB_REPLICAS = config('DJANGO_DB_REPLICAS', default='', cast=Csv())
+for _i, _name in enumerate(DB_REPLICAS, start=1):
+    DATABASES[f'replica{_i}'] = {
+        **DATABASES['default'],
+        'NAME': _name,
+        'TEST': {'MIRROR': 'default'},
     }
+
+DATABASE_ROUTERS = ['guide.routers.ReplicaRouter']
+# Сколько секунд после сохранения редактор читает из основной БД
+DB_REPLICA_STICKY_SECONDS = config('DJANGO_DB_REPLICA_STICKY_SECONDS', default=10, cast=int)
+
+# Общий кэш для всех воркеров (по умолчанию — файлы на диске; можно memcached:
+# DJANGO_CACHE_BACKEND=django.core.cache.backends.memcached.PyMemcacheCache, DJANGO_CACHE_LOCATION=127.0.0.1:11211)
+CACHES = {
+    'default': {
+        'BACKEND': config('DJANGO_CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('DJANGO_CACHE_LOCATION', default=str(BASE_DIR / 'cache')),
+        'TIMEOUT': 60 * 60 * 24,
+    }
+}
+# LRU в памяти процесса перед общим кэшем
+GUIDE_LOCAL_CACHE_MAX_ENTRIES = config('GUIDE_LOCAL_CACHE_MAX_ENTRIES', default=512, cast=int)
+GUIDE_LOCAL_CACHE_TTL = config('GUIDE_LOCAL_CACHE_TTL', default=300, cast=int)
+
+# Бюджеты запросов к БД по имени маршрута (QueryCountMiddleware).
+# Превышение пишется в лог guide.queries; в тестах (строгий режим) — падение.
+GUIDE_QUERY_BUDGETS = {
+    'guide:home': 6,
+    'guide:search': 6,
+    'guide:contacts': 3,
+    'guide:product_add': 3,
+    'guide:product_list': 8,
+    'guide:subcategory_add': 4,
+    'guide:qa_list': 6,
+    'guide:qa_add': 5,
+    'guide:qa_detail': 8,
+    'guide:qa_edit': 7,
+    'guide:qa_history': 8,
+    'guide:robots': 1,
+    'guide:sitemap': 4,
+    'guide:export': 3,  # выгрузка идёт потоком уже после middleware
+    'guide:api_products': 4,
+    'guide:api_subcategories': 5,
+    'guide:api_qa_list': 5,
+    'guide:api_qa_detail': 6,
+    'guide:api_search': 6,
+}
+GUIDE_QUERY_BUDGET_STRICT = config('GUIDE_QUERY_BUDGET_STRICT', default=False, cast=bool)
+# Без бюджета: предупреждение, если запросов больше порога
+GUIDE_QUERY_LOG_THRESHOLD = config('GUIDE_QUERY_LOG_THRESHOLD', default=30, cast=int)
+
+# Заголовок Server-Timing + JSON-строки в лог guide.timing (БД/шаблоны/Markdown/селекторы)
+GUIDE_SERVER_TIMING = config('GUIDE_SERVER_TIMING', default=False, cast=bool)
+
+# Метрики Prometheus на /metrics; файлы процессов суммируются при выдаче
+GUIDE_METRICS = config('GUIDE_METRICS', default=True, cast=bool)
+GUIDE_METRICS_DIR = config('GUIDE_METRICS_DIR', default=str(BASE_DIR / 'metrics'))
+GUIDE_METRICS_FLUSH_SECONDS = config('GUIDE_METRICS_FLUSH_SECONDS', default=5, cast=float)
+GUIDE_METRICS_ALLOWED_IPS = config('GUIDE_METRICS_ALLOWED_IPS', default='127.0.0.1', cast=Csv())
+
+# manage.py test: метрики — во временный каталог (см. guide.testing.GuideTestRunner)
+TEST_RUNNER = 'guide.testing.GuideTestRunner'
+
+# Журнал медленных запросов с планом (0 — выключен); отчёт: manage.py slowqueries
+GUIDE_SLOW_QUERY_MS = config('GUIDE_SLOW_QUERY_MS', default=0, cast=float)
+GUIDE_SLOW_QUERY_LOG = config('GUIDE_SLOW_QUERY_LOG', default=str(BASE_DIR / 'logs' / 'slow_queries.jsonl'))
+GUIDE_SLOW_QUERY_BUFFER = config('GUIDE_SLOW_QUERY_BUFFER', default=500, cast=int)
+GUIDE_SLOW_QUERY_BATCH = config('GUIDE_SLOW_QUERY_BATCH', default=20, cast=int)
+
+# Прогрев воркера при старте (шаблоны, URL, Markdown, первые запросы к БД) — см. guide.warmup
+GUIDE_WARMUP = config('GUIDE_WARMUP', default=True, cast=bool)
+
+# История правок вопросов: полный снимок каждые N ревизий, между ними — сжатые дельты
+GUIDE_REVISION_SNAPSHOT_EVERY = config('GUIDE_REVISION_SNAPSHOT_EVERY', default=20, cast=int)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'guide': {
+            'handlers': ['console'],
+            'level': config('GUIDE_LOG_LEVEL', default='INFO'),
+        },
+    },
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -86,6 +220,26 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
+
+# collectstatic: имена с хэшем + заранее сжатые .gz/.br.
+# Без собранного манифеста (локально/в тестах) можно выключить: DJANGO_STATIC_MANIFEST=False
+STATIC_MANIFEST = config('DJANGO_STATIC_MANIFEST', default=True, cast=bool)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'guide.storage.CompressedManifestStaticFilesStorage'
+            if STATIC_MANIFEST
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
+# Отдавать STATIC_ROOT самим Django (если перед приложением нет nginx)
+SERVE_STATIC = config('DJANGO_SERVE_STATIC', default=False, cast=bool)
+STATIC_MAX_AGE = 60 * 60 * 24 * 365
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
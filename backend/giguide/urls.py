@@ -1,16 +1,27 @@
 # config/urls.py
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from guide.views.static import serve_static
+from guide.views.system import MetricsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', MetricsView.as_view(), name='metrics'),
 
     # все публичные маршруты приложения
     path('', include(('guide.urls', 'guide'), namespace='guide')),
 ]
 
+# раздача собранной статики без nginx (с .br/.gz и кэшем на год)
+if settings.SERVE_STATIC:
+    urlpatterns.insert(0, re_path(
+        r'^%s(?P<path>.*)$' % settings.STATIC_URL.lstrip('/'),
+        serve_static,
+    ))
+
 # раздача MEDIA в режиме DEBUG
 if settings.DEBUG:
     urlpatterns += static(
@@ -9,3 +9,6 @@ class ModelConfig:
     MAX_LENGTH_CAPTION = 255
     MAX_SHORT_QUESTION = 20
     MAX_LENGTH_SHORT_QABLOCK = 20
+    MAX_LENGTH_DIGEST = 64
+    MAX_LENGTH_MEDIA_NAME = 255
+    MAX_LENGTH_SCOPE = 16
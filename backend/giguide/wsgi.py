@@ -1,7 +1,13 @@
 import os
+import time
 
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'giguide.settings')
 
+_started = time.perf_counter()
 application = get_wsgi_application()
+
+from guide.warmup import warm_up_on_startup  # noqa: E402
+
+warm_up_on_startup(started=_started)
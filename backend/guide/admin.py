@@ -1,15 +1,243 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.views.main import ChangeList
+from django.db.models import Q
 
+from guide.utils.pagination import CappedCountPaginator
 from .models import (
     Product,
     Subcategory,
     QAItem,
+    QAStatus,
     QABlock,
-    NavLink
+    QARevision,
+    NavLink,
+    MediaBlob,
 )
 
-admin.site.register(Product)
-admin.site.register(Subcategory)
-admin.site.register(QAItem)
-admin.site.register(QABlock)
-admin.site.register(NavLink)
+
+class ProjectedChangeList(ChangeList):
+    def get_queryset(self, request, exclude_parameters=None):
+        qs = super().get_queryset(request, exclude_parameters)
+        if self.model_admin.list_only:
+            qs = qs.only(*self.model_admin.list_only)
+        return qs
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Список без полного COUNT(*) (ни общего, ни при пагинации дальше лимита),
+    сортировка по первичному ключу вместо Meta.ordering по position (без сортировки в памяти БД)
+    и только нужные списку колонки (list_only).
+    """
+    list_only: tuple[str, ...] = ()
+    show_full_result_count = False
+    paginator = CappedCountPaginator
+    ordering = ('-id',)
+    list_per_page = 50
+
+    def get_changelist(self, request, **kwargs):
+        return ProjectedChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        search_fields = self.get_search_fields(request)
+        prefix_fields = [name[1:] for name in search_fields if name.startswith('^')]
+        cond = Q()
+        if term and prefix_fields:
+            # ^-поля ищем по началу всей строки, а не каждого слова отдельно (так делает Django)
+            for name in prefix_fields:
+                cond |= Q(**{f'{name}__istartswith': term})
+        if term.isdigit() and len(term) <= 18:
+            # число — это id (первичный ключ) или начало текста ^-полей («2FA», «1С»): оба поиска по индексам
+            return queryset.filter(Q(pk=int(term)) | cond), False
+        if cond and len(prefix_fields) == len(search_fields):
+            return queryset.filter(cond), False
+        return super().get_search_results(request, queryset, search_term)
+
+
+@admin.register(Product)
+class ProductAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug', 'position', 'is_active', 'subcategory_count', 'published_qa_count')
+    list_filter = ('is_active',)
+    search_fields = ('name', '=slug')
+    ordering = ('position', 'id')
+
+
+@admin.register(Subcategory)
+class SubcategoryAdmin(LargeTableAdmin):
+    list_display = ('name', 'product_name', 'slug', 'position', 'is_active', 'published_qa_count')
+    list_filter = ('is_active', 'product')
+    list_select_related = ('product',)
+    list_only = (
+        'name', 'slug', 'position', 'is_active', 'published_qa_count', 'product', 'product__name',
+    )
+    search_fields = ('name', '=slug')
+    autocomplete_fields = ('product',)
+
+    def get_queryset(self, request):
+        # __str__ показывает продукт: и в списке, и в ответах автокомплита — одним JOIN
+        return super().get_queryset(request).select_related('product')
+
+    @admin.display(description='Продукт', ordering='product__name')
+    def product_name(self, obj: Subcategory) -> str:
+        return obj.product.name
+
+
+class QABlockInline(admin.StackedInline):
+    model = QABlock
+    extra = 0
+    fields = (
+        'position', 'kind', 'heading_text', 'heading_level', 'heading_anchor',
+        'text_md', 'media_file', 'media_url', 'alt_text', 'caption', 'is_active',
+    )
+    ordering = ('position', 'id')
+
+
+class QAItemActionForm(ActionForm):
+    # id, а не выпадающий список: на больших базах список всех подкатегорий строится на каждой странице
+    target_subcategory = forms.IntegerField(
+        label='Подкатегория (id) для переноса',
+        required=False,
+        min_value=1,
+    )
+
+
+@admin.register(QAItem)
+class QAItemAdmin(LargeTableAdmin):
+    list_display = ('id', 'short_question', 'subcategory_name', 'product_name', 'status', 'is_active', 'updated_at')
+    list_display_links = ('id', 'short_question')
+    list_filter = ('status', 'is_active', 'product')
+    list_select_related = ('subcategory', 'product')
+    list_only = (
+        'question', 'status', 'is_active', 'updated_at',
+        'subcategory', 'subcategory__name', 'product', 'product__name',
+    )
+    # по началу вопроса — индекс idx_qaitems_question_nocase; icontains читал бы всю таблицу
+    search_fields = ('^question',)
+    autocomplete_fields = ('subcategory',)
+    inlines = (QABlockInline,)
+    action_form = QAItemActionForm
+    actions = ('publish', 'unpublish', 'archive', 'activate', 'deactivate', 'move_to_subcategory')
+
+    # ревизия до правки — исходное состояние вопроса без истории (как в QAUpdateView),
+    # после — когда сохранены и блоки из инлайнов
+    def save_model(self, request, obj, form, change):
+        if change:
+            QARevision.objects.record(obj.pk)
+        super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        QARevision.objects.record(form.instance.pk, author=request.user)
+
+    # Действия — одним UPDATE на выделение (QAItemManager), счётчики, поколения и ревизии — один раз на действие
+    def _selected_ids(self, queryset) -> list[int]:
+        return list(queryset.order_by().values_list('pk', flat=True))
+
+    def _set_status(self, request, queryset, status: str) -> None:
+        updated = QAItem.objects.bulk_set_status(self._selected_ids(queryset), status, author=request.user)
+        self.message_user(request, f'Статус «{QAStatus(status).label}»: {updated} вопрос(ов).', messages.SUCCESS)
+
+    @admin.action(description='Опубликовать', permissions=['change'])
+    def publish(self, request, queryset):
+        self._set_status(request, queryset, QAStatus.PUBLISHED)
+
+    @admin.action(description='Вернуть в черновики', permissions=['change'])
+    def unpublish(self, request, queryset):
+        self._set_status(request, queryset, QAStatus.DRAFT)
+
+    @admin.action(description='Перенести в архив', permissions=['change'])
+    def archive(self, request, queryset):
+        self._set_status(request, queryset, QAStatus.ARCHIVED)
+
+    @admin.action(description='Включить', permissions=['change'])
+    def activate(self, request, queryset):
+        updated = QAItem.objects.bulk_set_active(self._selected_ids(queryset), True, author=request.user)
+        self.message_user(request, f'Включено: {updated} вопрос(ов).', messages.SUCCESS)
+
+    @admin.action(description='Выключить', permissions=['change'])
+    def deactivate(self, request, queryset):
+        updated = QAItem.objects.bulk_set_active(self._selected_ids(queryset), False, author=request.user)
+        self.message_user(request, f'Выключено: {updated} вопрос(ов).', messages.SUCCESS)
+
+    @admin.action(description='Перенести в подкатегорию (в конец списка)', permissions=['change'])
+    def move_to_subcategory(self, request, queryset):
+        target_id = request.POST.get('target_subcategory', '').strip()
+        target = (
+            Subcategory.objects.filter(pk=int(target_id)).select_related('product').first()
+            if target_id.isdigit() else None
+        )
+        if target is None:
+            self.message_user(request, 'Укажите id существующей подкатегории.', messages.ERROR)
+            return
+        moved = QAItem.objects.bulk_move(self._selected_ids(queryset), target, author=request.user)
+        self.message_user(request, f'Перенесено в «{target}»: {moved} вопрос(ов).', messages.SUCCESS)
+
+    @admin.display(description='Вопрос')
+    def short_question(self, obj: QAItem) -> str:
+        return obj.question if len(obj.question) <= 80 else obj.question[:80] + '…'
+
+    @admin.display(description='Подкатегория', ordering='subcategory__name')
+    def subcategory_name(self, obj: QAItem) -> str:
+        return obj.subcategory.name
+
+    @admin.display(description='Продукт', ordering='product__name')
+    def product_name(self, obj: QAItem) -> str:
+        return obj.product.name
+
+
+@admin.register(QABlock)
+class QABlockAdmin(LargeTableAdmin):
+    list_display = ('id', 'question_id', 'kind', 'position', 'heading_text', 'is_active')
+    list_filter = ('kind', 'is_active')
+    # heading_level и text_md читает __str__ (подпись чекбокса действия в каждой строке)
+    list_only = ('qa', 'kind', 'position', 'heading_text', 'heading_level', 'text_md', 'is_active')
+    search_fields = ('^heading_text',)  # индекс idx_qablocks_heading_nocase
+    raw_id_fields = ('qa',)
+
+    # блоки входят в состояние вопроса: правка и удаление блока — ревизия вопроса (до и после)
+    def save_model(self, request, obj, form, change):
+        qa_ids = {obj.qa_id, form.initial.get('qa')} - {None}
+        QARevision.objects.record_many(qa_ids)
+        super().save_model(request, obj, form, change)
+        QARevision.objects.record_many(qa_ids, author=request.user)
+
+    def delete_model(self, request, obj):
+        QARevision.objects.record(obj.qa_id)
+        super().delete_model(request, obj)
+        QARevision.objects.record(obj.qa_id, author=request.user)
+
+    def delete_queryset(self, request, queryset):
+        qa_ids = set(queryset.order_by().values_list('qa_id', flat=True))
+        QARevision.objects.record_many(qa_ids)
+        super().delete_queryset(request, queryset)
+        QARevision.objects.record_many(qa_ids, author=request.user)
+
+    def get_search_results(self, request, queryset, search_term):
+        # число — все блоки вопроса (индекс qa_id, position) и сам блок с таким id
+        term = search_term.strip()
+        if term.isdigit():
+            return queryset.filter(qa_id=int(term)) | queryset.filter(pk=int(term)), False
+        return super().get_search_results(request, queryset, search_term)
+
+    @admin.display(description='Вопрос (id)', ordering='qa_id')
+    def question_id(self, obj: QABlock) -> int:
+        # 'qa_id' в list_display Django показал бы как связанный объект — запрос на строку
+        return obj.qa_id
+
+
+@admin.register(NavLink)
+class NavLinkAdmin(admin.ModelAdmin):
+    list_display = ('label', 'placement', 'url', 'position', 'is_active')
+    list_filter = ('placement', 'is_active')
+    search_fields = ('label', 'url')
+    ordering = ('placement', 'position', 'id')
+
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(LargeTableAdmin):
+    list_display = ('name', 'size', 'ref_count', 'created_at')
+    search_fields = ('=digest', '=name')
+    readonly_fields = ('digest', 'name', 'size', 'ref_count', 'created_at')
@@ -0,0 +1,275 @@
+"""
+Read-only JSON API /api/v1/ для внутренних порталов (views/api.py).
+
+Записи собираются из проекций values() — только колонки выбранных полей (?fields=a,b),
+без экземпляров моделей. Списки листаются ключом (?after=<курсор>&limit=n):
+WHERE (position, id) > (последние) ORDER BY position, id LIMIT n+1 — по индексам
+из 0005_hot_path_indexes, без OFFSET. ETag строится из поколений контента (ContentGeneration)
+ещё до основного запроса: на совпавший If-None-Match отвечаем 304, не читая и не сериализуя данные.
+"""
+from __future__ import annotations
+import base64
+import binascii
+import hashlib
+import json
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import Any, Callable
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db.models import Q, QuerySet
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+from guide.cache import TwoTierCache
+from guide.models import GenerationScope, QABlock, QAItem, QAStatus
+from guide.storage import get_qa_media_storage
+
+API_VERSION = 'v1'
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+GLOBAL = (GenerationScope.GLOBAL, 0)
+
+# HTML блоков ответа по вопросу: до следующего изменения вопроса (версия — поколение 'qa')
+api_blocks_cache = TwoTierCache('api-blocks')
+# id найденных вопросов по строке поиска: до любого изменения контента (поколение 'global')
+api_search_cache = TwoTierCache('api-search')
+
+
+class ApiError(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass(frozen=True, slots=True)
+class Field:
+    """Поле ответа: какие колонки values() ему нужны и как получить значение из строки."""
+    columns: tuple[str, ...]
+    build: Callable[[dict], Any]
+
+
+def column(name: str, source: str | None = None) -> Field:
+    return Field((source or name,), itemgetter(source or name))
+
+
+def _product_url(row: dict) -> str:
+    return reverse('guide:product_list', kwargs={'product_slug': row['slug']})
+
+
+def _qa_url(row: dict) -> str:
+    return reverse('guide:qa_detail', kwargs={
+        'product_slug': row['product__slug'], 'sub_slug': row['subcategory__slug'], 'qa_id': row['id'],
+    })
+
+
+PRODUCT_FIELDS = {
+    'id': column('id'),
+    'slug': column('slug'),
+    'name': column('name'),
+    'position': column('position'),
+    'subcategory_count': column('subcategory_count'),
+    'published_qa_count': column('published_qa_count'),
+    'updated_at': column('updated_at'),
+    'url': Field(('slug',), _product_url),
+}
+
+SUBCATEGORY_FIELDS = {
+    'id': column('id'),
+    'slug': column('slug'),
+    'name': column('name'),
+    'position': column('position'),
+    'published_qa_count': column('published_qa_count'),
+    'updated_at': column('updated_at'),
+    'url': Field(
+        ('slug', 'product__slug'),
+        lambda row: reverse('guide:qa_list', kwargs={'product_slug': row['product__slug'], 'sub_slug': row['slug']}),
+    ),
+}
+
+QA_FIELDS = {
+    'id': column('id'),
+    'question': column('question'),
+    'position': column('position'),
+    'updated_at': column('updated_at'),
+    'product': column('product', 'product__slug'),
+    'subcategory': column('subcategory', 'subcategory__slug'),
+    'url': Field(('id', 'product__slug', 'subcategory__slug'), _qa_url),
+}
+
+QA_DETAIL_FIELDS = {
+    **QA_FIELDS,
+    'product_name': column('product_name', 'product__name'),
+    'subcategory_name': column('subcategory_name', 'subcategory__name'),
+    # блоки — отдельным запросом (и из кэша), вьюха кладёт их в строку перед serialize()
+    'blocks': Field(('id',), itemgetter('blocks')),
+}
+
+DEFAULT_FIELDS = {
+    'product': ('id', 'slug', 'name', 'published_qa_count', 'url'),
+    'subcategory': ('id', 'slug', 'name', 'published_qa_count', 'url'),
+    'qa': ('id', 'question', 'url'),
+    'qa_detail': ('id', 'question', 'product', 'subcategory', 'updated_at', 'url', 'blocks'),
+    'search': ('id', 'question', 'product', 'subcategory', 'url'),
+}
+
+
+def published_qas() -> QuerySet:
+    """Вопросы, видимые на портале: опубликованные и активные, в активных подкатегории и продукте."""
+    return QAItem.objects.filter(
+        is_active=True,
+        status=QAStatus.PUBLISHED,
+        subcategory__is_active=True,
+        product__is_active=True,
+    )
+
+
+# --- поля ---
+def parse_fields(value: str | None, spec: dict[str, Field], default: tuple[str, ...]) -> tuple[str, ...]:
+    if not value:
+        return default
+    names = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in names if name not in spec]
+    if unknown:
+        raise ApiError(f'Неизвестные поля: {", ".join(unknown)}; доступны: {", ".join(spec)}')
+    return names or default
+
+
+def columns_for(names: tuple[str, ...], spec: dict[str, Field], extra: tuple[str, ...] = ()) -> list[str]:
+    return list(dict.fromkeys([*extra, *(c for name in names for c in spec[name].columns)]))
+
+
+def serialize(rows: list[dict], names: tuple[str, ...], spec: dict[str, Field]) -> list[dict]:
+    builders = [(name, spec[name].build) for name in names]
+    return [{name: build(row) for name, build in builders} for row in rows]
+
+
+# --- курсоры ---
+def encode_cursor(values: tuple) -> str:
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(value: str | None, size: int) -> tuple | None:
+    if not value:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(value + '=' * (-len(value) % 4)))
+    except (binascii.Error, ValueError):
+        raise ApiError('Некорректный курсор')
+    if not isinstance(values, list) or len(values) != size or not all(isinstance(v, int) for v in values):
+        raise ApiError('Некорректный курсор')
+    return tuple(values)
+
+
+def parse_limit(value: str | None) -> int:
+    if not value:
+        return DEFAULT_LIMIT
+    if not value.isdigit() or not 1 <= int(value) <= MAX_LIMIT:
+        raise ApiError(f'limit — целое от 1 до {MAX_LIMIT}')
+    return int(value)
+
+
+def after_filter(order: tuple[str, ...], values: tuple) -> Q:
+    """(a, b) > (x, y)  ->  a > x OR (a = x AND b > y)."""
+    cond = Q()
+    for i, name in enumerate(order):
+        cond |= Q(**dict(zip(order[:i], values[:i])), **{f'{name}__gt': values[i]})
+    return cond
+
+
+def keyset_page(qs: QuerySet, names: tuple[str, ...], spec: dict[str, Field], *,
+                order: tuple[str, ...], after: str | None, limit: int) -> dict:
+    cursor = decode_cursor(after, len(order))
+    if cursor is not None:
+        qs = qs.filter(after_filter(order, cursor))
+    rows = list(qs.order_by(*order).values(*columns_for(names, spec, order))[:limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        'data': serialize(rows, names, spec),
+        'next': encode_cursor(tuple(rows[-1][name] for name in order)) if more else None,
+    }
+
+
+# --- ETag ---
+def make_etag(generations: dict[tuple[str, int], int], *parts: Any) -> str:
+    """Слабый ETag: поколения областей ответа + всё, что влияет на его форму (путь, поля, курсор)."""
+    key = json.dumps([API_VERSION, sorted(generations.items()), *parts], default=str, ensure_ascii=False)
+    return 'W/"' + hashlib.sha1(key.encode()).hexdigest()[:20] + '"'
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    # сравнение слабое: W/ не учитываем (RFC 9110, If-None-Match)
+    return etag.removeprefix('W/') in {tag.strip().removeprefix('W/') for tag in header.split(',')}
+
+
+def dumps(data: Any) -> bytes:
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+# --- ресурсы, которым мало одной проекции ---
+def _block_html(block: dict) -> str:
+    name = block.get('media_file')
+    block['media_link'] = get_qa_media_storage().url(name) if name else block.get('media_url')
+    return str(render_to_string('partials/_qablock.html', {'block': block})).strip()
+
+
+def qa_blocks(qa_id: int, version: int) -> list[dict]:
+    """Активные блоки ответа с готовым HTML (тот же шаблон, что на странице вопроса)."""
+    def produce() -> list[dict]:
+        rows = (
+            QABlock.objects.filter(qa_id=qa_id, is_active=True).order_by('position', 'id')
+            .values('kind', 'heading_text', 'heading_level', 'heading_anchor', 'text_md',
+                    'media_file', 'media_url', 'alt_text', 'caption')
+        )
+        return [
+            {
+                'kind': row['kind'],
+                'html': _block_html(row),
+                **({'anchor': row['heading_anchor']} if row['heading_anchor'] else {}),
+            }
+            for row in rows
+        ]
+
+    return api_blocks_cache.get_or_set(str(qa_id), produce, version=version)
+
+
+def _casefold(value: str | None) -> str:
+    return (value or '').casefold()
+
+
+def search_ids(query: str, generation: int) -> list[int]:
+    """
+    id опубликованных вопросов, где строка встречается в вопросе или блоках (по возрастанию id).
+    В SQLite LIKE не сворачивает регистр кириллицы — как SearchView, сравниваем в Python,
+    но по проекции нужных колонок. Результат кэшируется до изменения контента.
+    """
+    def produce() -> list[int]:
+        needle = _casefold(query)
+        qas = published_qas()
+        if connection.vendor != 'sqlite':
+            matched = qas.filter(
+                Q(question__icontains=query)
+                | Q(blocks__heading_text__icontains=query)
+                | Q(blocks__text_md__icontains=query)
+                | Q(blocks__caption__icontains=query)
+                | Q(blocks__alt_text__icontains=query)
+            )
+            return list(matched.order_by('id').values_list('id', flat=True).distinct())
+        found = {pk for pk, question in qas.values_list('id', 'question').iterator() if needle in _casefold(question)}
+        blocks = QABlock.objects.filter(qa__in=qas).values_list(
+            'qa_id', 'heading_text', 'text_md', 'caption', 'alt_text',
+        )
+        for qa_id, *texts in blocks.iterator(chunk_size=2000):
+            if qa_id not in found and any(needle in _casefold(text) for text in texts):
+                found.add(qa_id)
+        return sorted(found)
+
+    key = hashlib.sha1(query.encode()).hexdigest()
+    return api_search_cache.get_or_set(key, produce, version=generation)
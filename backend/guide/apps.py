@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class GuideConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'guide'
+
+    def ready(self):
+        from django.conf import settings
+
+        from guide import signals  # noqa: F401
+
+        if settings.GUIDE_SLOW_QUERY_MS > 0:
+            from guide.slow_queries import enable_slow_query_log
+            enable_slow_query_log()
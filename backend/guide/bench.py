@@ -0,0 +1,401 @@
+"""
+Нагрузочные замеры: детерминированный генератор базы знаний и прогон
+вьюх через тестовый клиент (manage.py bench, manage.py loadtest).
+
+Всё выполняется в отдельной тестовой БД (для SQLite — файл в BENCH_DIR),
+рабочая БД и общий кэш не затрагиваются.
+"""
+from __future__ import annotations
+import io
+import logging
+import random
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test import override_settings
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.urls import reverse
+
+from guide.models import (
+    BlockKind,
+    HeadingLevel,
+    LinkPlacement,
+    NavLink,
+    Product,
+    QABlock,
+    QAItem,
+    QAStatus,
+    Subcategory,
+)
+
+BENCH_DIR = Path(settings.BASE_DIR) / 'bench'
+SCALES = {'1k': 1_000, '10k': 10_000, '100k': 100_000}
+BATCH_SIZE = 2_000
+BENCH_USER = 'bench-editor'
+
+NOUNS = [
+    'принтер', 'ноутбук', 'монитор', 'пароль', 'почта', 'календарь', 'сервер', 'диск', 'VPN', 'токен',
+    'сертификат', 'браузер', 'антивирус', 'обновление', 'драйвер', 'профиль', 'доступ', 'заявка',
+    'подпись', 'сеть', 'телефон', 'гарнитура', 'камера', 'архив', 'отчёт', 'шаблон', 'папка', 'портал',
+]
+VERBS = [
+    'настроить', 'подключить', 'восстановить', 'сбросить', 'установить', 'обновить', 'удалить',
+    'перенести', 'проверить', 'включить', 'отключить', 'согласовать', 'запросить', 'открыть',
+]
+ADJECTIVES = [
+    'корпоративный', 'сетевой', 'личный', 'общий', 'резервный', 'удалённый', 'новый', 'служебный',
+    'защищённый', 'временный', 'основной', 'мобильный',
+]
+FILLER = [
+    'если', 'после', 'затем', 'обычно', 'сначала', 'в разделе', 'через', 'для', 'при этом',
+    'в окне', 'на вкладке', 'по ссылке', 'в меню', 'у администратора',
+]
+PRODUCT_NAMES = [
+    'Почта и календарь', 'Рабочее место', 'Удалённый доступ', 'Электронная подпись', 'Телефония',
+    'Документооборот', 'Печать и сканирование', 'Учётные записи', 'Видеосвязь', 'Файловые ресурсы',
+    'Мобильные устройства', 'Корпоративный портал', 'Бухгалтерия', 'Кадровый учёт', 'Закупки',
+]
+
+
+def parse_scale(value: str) -> int:
+    """'1k' / '10k' / '100k' или просто число вопросов."""
+    return SCALES.get(value.lower(), None) or int(value)
+
+
+class KnowledgeBaseGenerator:
+    """Детерминированный (по seed) генератор правдоподобного русского текста и Markdown."""
+
+    def __init__(self, seed: int = 42):
+        self.rng = random.Random(seed)
+
+    def words(self, n: int) -> list[str]:
+        pool = (NOUNS, VERBS, ADJECTIVES, FILLER)
+        return [self.rng.choice(self.rng.choice(pool)) for _ in range(n)]
+
+    def sentence(self, low: int = 6, high: int = 14) -> str:
+        text = ' '.join(self.words(self.rng.randint(low, high)))
+        return text[0].upper() + text[1:] + '.'
+
+    def question(self) -> str:
+        return (
+            f'Как {self.rng.choice(VERBS)} {self.rng.choice(ADJECTIVES)} '
+            f'{self.rng.choice(NOUNS)} {" ".join(self.words(self.rng.randint(1, 4)))}?'
+        )
+
+    def markdown(self) -> str:
+        rng = self.rng
+        parts = [' '.join(self.sentence() for _ in range(rng.randint(1, 3)))]
+        if rng.random() < 0.6:
+            steps = [f'{i}. {self.sentence(3, 8)}' for i in range(1, rng.randint(3, 6))]
+            parts.append('\n'.join(steps))
+        if rng.random() < 0.4:
+            parts.append(f'Важно: **{self.sentence(3, 6)}** Команда: `ipconfig /flushdns`.')
+        if rng.random() < 0.3:
+            parts.append(f'Подробнее — [инструкция](https://example.com/kb/{rng.randint(1, 999)}).')
+        if rng.random() < 0.2:
+            parts.append(f'> {self.sentence()}')
+        return '\n\n'.join(parts)
+
+    def blocks(self, qa: QAItem) -> list[QABlock]:
+        rng = self.rng
+        result = [QABlock(
+            qa=qa, position=1, kind=BlockKind.HEADING, heading_level=HeadingLevel.H2,
+            heading_text=self.sentence(2, 5)[:-1], heading_anchor=f'h-{qa.pk}-1',
+        )]
+        for position in range(2, rng.randint(3, 7)):
+            if rng.random() < 0.1:
+                result.append(QABlock(
+                    qa=qa, position=position, kind=BlockKind.IMAGE,
+                    media_url=f'https://example.com/img/{rng.randint(1, 9999)}.png',
+                    alt_text=self.sentence(2, 4), caption=self.sentence(3, 6),
+                ))
+            else:
+                result.append(QABlock(qa=qa, position=position, kind=BlockKind.TEXT, text_md=self.markdown()))
+        return result
+
+
+def generate_knowledge_base(qas: int, seed: int = 42) -> dict[str, int]:
+    """
+    Продукты -> подкатегории -> вопросы (90% опубликовано) -> 2-6 блоков.
+    bulk_create пачками; счётчики и product_id заполняются сразу, без сигналов.
+    """
+    gen = KnowledgeBaseGenerator(seed)
+    n_products = min(max(qas // 500, 3), 60)
+    subs_per_product = max(2, min(20, qas // (n_products * 25)))
+
+    with transaction.atomic():
+        products = Product.objects.bulk_create([
+            Product(
+                name=f'{PRODUCT_NAMES[i % len(PRODUCT_NAMES)]} {i // len(PRODUCT_NAMES) + 1}',
+                slug=f'product-{i + 1}', position=i + 1,
+            )
+            for i in range(n_products)
+        ])
+        subcategories = Subcategory.objects.bulk_create([
+            Subcategory(
+                product=product, name=gen.sentence(2, 4)[:-1], slug=f'section-{s + 1}', position=s + 1,
+                is_active=gen.rng.random() > 0.05,
+            )
+            for product in products
+            for s in range(subs_per_product)
+        ])
+        NavLink.objects.bulk_create([
+            NavLink(placement=LinkPlacement.HEADER, label=f'Ссылка {i}', url=f'https://example.com/{i}', position=i)
+            for i in range(1, 6)
+        ])
+
+        created_qas = 0
+        created_blocks = 0
+        positions: dict[int, int] = {}
+        while created_qas < qas:
+            batch = []
+            for _ in range(min(BATCH_SIZE, qas - created_qas)):
+                sub = gen.rng.choice(subcategories)
+                positions[sub.pk] = positions.get(sub.pk, 0) + 1
+                batch.append(QAItem(
+                    subcategory=sub, product_id=sub.product_id, question=gen.question(),
+                    position=positions[sub.pk],
+                    status=QAStatus.PUBLISHED if gen.rng.random() < 0.9 else QAStatus.DRAFT,
+                ))
+            batch = QAItem.objects.bulk_create(batch)
+            blocks = [block for qa in batch for block in gen.blocks(qa)]
+            QABlock.objects.bulk_create(blocks, batch_size=BATCH_SIZE)
+            created_qas += len(batch)
+            created_blocks += len(blocks)
+
+    call_command('recount', verbosity=0, stdout=io.StringIO())
+    return {
+        'products': n_products,
+        'subcategories': len(subcategories),
+        'qas': created_qas,
+        'blocks': created_blocks,
+    }
+
+
+# --- запросы для замеров ---
+
+@dataclass(slots=True)
+class BenchRequest:
+    name: str
+    method: str
+    path: str
+    data: dict | None = None
+    staff: bool = False
+
+
+def qa_form_data(qa: QAItem | None, question: str, blocks: list[QABlock]) -> dict:
+    """POST формы вопроса с блоками (QAItemForm + QABlockFormSet с префиксом blocks)."""
+    data = {
+        'question': question,
+        'status': QAStatus.PUBLISHED,
+        'blocks-TOTAL_FORMS': str(len(blocks)),
+        'blocks-INITIAL_FORMS': str(len(blocks) if qa else 0),
+        'blocks-MIN_NUM_FORMS': '1',
+        'blocks-MAX_NUM_FORMS': '1000',
+    }
+    for i, block in enumerate(blocks):
+        prefix = f'blocks-{i}-'
+        if qa:
+            data[prefix + 'id'] = str(block.pk)
+            data[prefix + 'qa'] = str(qa.pk)
+        data[prefix + 'kind'] = block.kind
+        for name in ('heading_text', 'heading_anchor', 'text_md', 'media_url', 'alt_text', 'caption'):
+            data[prefix + name] = getattr(block, name) or ''
+        data[prefix + 'heading_level'] = str(block.heading_level or HeadingLevel.H2)
+    return data
+
+
+def build_requests(seed: int = 42, per_view: int = 20) -> list[BenchRequest]:
+    """Набор URL по всем замеряемым вьюхам: случайные, но воспроизводимые объекты из БД."""
+    rng = random.Random(seed)
+    gen = KnowledgeBaseGenerator(seed)
+    products = list(Product.objects.filter(is_active=True).values_list('slug', flat=True))
+    subs = list(
+        Subcategory.objects.filter(is_active=True).values_list('product__slug', 'slug', 'pk')
+    )
+    qa_ids = list(QAItem.objects.filter(is_active=True, status=QAStatus.PUBLISHED).values_list('pk', flat=True))
+
+    def sample(items):
+        return [rng.choice(items) for _ in range(per_view)] if items else []
+
+    requests = [BenchRequest('home', 'GET', reverse('guide:home')) for _ in range(per_view)]
+    requests += [
+        BenchRequest('product_list', 'GET', reverse('guide:product_list', kwargs={'product_slug': slug}))
+        for slug in sample(products)
+    ]
+    requests += [
+        BenchRequest('qa_list', 'GET', reverse('guide:qa_list', kwargs={'product_slug': p, 'sub_slug': s}))
+        for p, s, _ in sample(subs)
+    ]
+    details = QAItem.objects.select_related('subcategory', 'product').in_bulk(sample(qa_ids))
+    requests += [BenchRequest('qa_detail', 'GET', qa_detail_path(qa)) for qa in details.values()]
+    requests += [
+        BenchRequest('search', 'GET', reverse('guide:search') + '?q=' + rng.choice(NOUNS + VERBS)[:6])
+        for _ in range(per_view)
+    ]
+
+    # сохранения редактора: правка существующего вопроса и создание нового
+    for qa in list(details.values())[:max(1, per_view // 2)]:
+        blocks = list(qa.blocks.order_by('position', 'id'))
+        requests.append(BenchRequest(
+            'qa_edit', 'POST',
+            reverse('guide:qa_edit', kwargs={
+                'product_slug': qa.product.slug, 'sub_slug': qa.subcategory.slug, 'qa_id': qa.pk,
+            }),
+            qa_form_data(qa, qa.question, blocks), staff=True,
+        ))
+    for p, s, _ in sample(subs)[:max(1, per_view // 2)]:
+        blocks = [QABlock(kind=BlockKind.TEXT, text_md=gen.markdown())]
+        requests.append(BenchRequest(
+            'qa_add', 'POST',
+            reverse('guide:qa_add', kwargs={'product_slug': p, 'sub_slug': s}),
+            qa_form_data(None, gen.question(), blocks), staff=True,
+        ))
+    return requests
+
+
+def qa_detail_path(qa: QAItem) -> str:
+    return reverse('guide:qa_detail', kwargs={
+        'product_slug': qa.product.slug, 'sub_slug': qa.subcategory.slug, 'qa_id': qa.pk,
+    })
+
+
+def bench_staff_user():
+    user, _ = get_user_model().objects.get_or_create(
+        username=BENCH_USER, defaults={'is_staff': True},
+    )
+    return user
+
+
+# --- выполнение и статистика ---
+
+class QueryCounter:
+    """Считает SQL-запросы во всех соединениях текущего потока."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def installed(self) -> Iterator['QueryCounter']:
+        conns = list(connections.all())
+        for conn in conns:
+            conn.execute_wrappers.append(self)
+        try:
+            yield self
+        finally:
+            for conn in conns:
+                if self in conn.execute_wrappers:
+                    conn.execute_wrappers.remove(self)
+
+
+@dataclass(slots=True)
+class Sample:
+    seconds: float
+    queries: int
+    status: int
+
+
+def perform(client, request: BenchRequest, counter: QueryCounter | None = None) -> Sample:
+    before = counter.count if counter else 0
+    started = time.perf_counter()
+    if request.method == 'POST':
+        response = client.post(request.path, request.data)
+    else:
+        response = client.get(request.path)
+    elapsed = time.perf_counter() - started
+    return Sample(elapsed, (counter.count - before) if counter else 0, response.status_code)
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Перцентиль с линейной интерполяцией (как numpy по умолчанию)."""
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q
+    low = int(pos)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (pos - low)
+
+
+@dataclass
+class LatencyStats:
+    samples: list[Sample] = field(default_factory=list)
+
+    def summary(self) -> dict:
+        times = sorted(s.seconds * 1000 for s in self.samples)
+        queries = [s.queries for s in self.samples]
+        return {
+            'count': len(times),
+            'mean_ms': round(statistics.fmean(times), 3) if times else 0.0,
+            'p50_ms': round(percentile(times, 0.50), 3),
+            'p90_ms': round(percentile(times, 0.90), 3),
+            'p95_ms': round(percentile(times, 0.95), 3),
+            'p99_ms': round(percentile(times, 0.99), 3),
+            'max_ms': round(times[-1], 3) if times else 0.0,
+            'queries_median': statistics.median(queries) if queries else 0,
+            'queries_max': max(queries) if queries else 0,
+            'errors': sum(1 for s in self.samples if s.status >= 400),
+        }
+
+
+# --- окружение ---
+
+def bench_db_name(qas: int) -> str:
+    return str(BENCH_DIR / f'bench-{qas}.sqlite3')
+
+
+@contextmanager
+def bench_environment(qas: int, *, keepdb: bool = False, verbosity: int = 0):
+    """
+    Отдельная тестовая БД (SQLite — файл bench/bench-<N>.sqlite3, чтобы было похоже на прод
+    и можно было переиспользовать с keepdb), кэш в памяти и статика без манифеста.
+    """
+    default = connections['default'].settings_dict
+    if default['ENGINE'] == 'django.db.backends.sqlite3':
+        BENCH_DIR.mkdir(parents=True, exist_ok=True)
+        default.setdefault('TEST', {})['NAME'] = bench_db_name(qas)
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=verbosity, interactive=False, keepdb=keepdb)
+    metrics_dir = tempfile.TemporaryDirectory(prefix='giguide-bench-metrics-')
+    overrides = override_settings(
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        STORAGES={
+            **settings.STORAGES,
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        },
+        GUIDE_METRICS_DIR=metrics_dir.name,
+        GUIDE_QUERY_BUDGET_STRICT=False,
+    )
+    overrides.enable()
+    # число запросов замер считает сам — предупреждения о бюджетах на каждый POST только шумят
+    queries_logger = logging.getLogger('guide.queries')
+    old_level = queries_logger.level
+    queries_logger.setLevel(logging.ERROR)
+    try:
+        yield
+    finally:
+        queries_logger.setLevel(old_level)
+        overrides.disable()
+        metrics_dir.cleanup()
+        teardown_databases(old_config, verbosity=verbosity, keepdb=keepdb)
+        teardown_test_environment()
+
+
+def ensure_knowledge_base(qas: int, seed: int) -> dict[str, int] | None:
+    """Генерирует данные, если БД пустая (при keepdb повторный запуск берёт готовые)."""
+    if QAItem.objects.exists():
+        return None
+    return generate_knowledge_base(qas, seed)
@@ -0,0 +1,184 @@
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+from guide.metrics import CACHE_REQUESTS
+from guide.models import ContentGeneration
+from guide.routers import pin_primary
+from guide.utils.timing import timed
+
+_MISSING = object()
+_epoch: int | None = None
+
+
+def content_epoch() -> int:
+    """
+    Эпоха БД (ContentGeneration.objects.epoch), читается один раз за жизнь процесса.
+    Входит в ключи: общий кэш переживает пересоздание БД, а номера поколений в ней начинаются заново.
+    """
+    global _epoch
+    if _epoch is None:
+        with pin_primary():
+            _epoch = ContentGeneration.objects.epoch()
+    return _epoch
+
+
+class LocalLRU:
+    """Небольшой LRU в памяти процесса (потокобезопасный, с TTL на запись)."""
+
+    def __init__(self, max_entries: int = 512, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return _MISSING
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class TwoTierCache:
+    """
+    Двухуровневый кэш: LRU процесса -> общий бэкенд Django (файлы/memcached).
+    Ключи версионируются: при изменении данных меняется версия, старые ключи просто устаревают.
+    get_or_set() не даёт нескольким воркерам/потокам одновременно считать одно и то же значение.
+    timeout как у кэшей Django: по умолчанию — TIMEOUT бэкенда, None — хранить без срока.
+    """
+
+    def __init__(
+        self,
+        prefix: str,
+        *,
+        alias: str = 'default',
+        timeout: int | None = DEFAULT_TIMEOUT,
+        lock_timeout: float = 10.0,
+    ):
+        self.prefix = prefix
+        self.alias = alias
+        self.timeout = timeout
+        self.lock_timeout = lock_timeout
+        self.local = LocalLRU(
+            max_entries=settings.GUIDE_LOCAL_CACHE_MAX_ENTRIES,
+            ttl=settings.GUIDE_LOCAL_CACHE_TTL,
+        )
+        self._key_locks: dict[str, threading.Lock] = {}
+        self._key_locks_guard = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def make_key(self, name: str, version: Any = None) -> str:
+        base = f'{self.prefix}:e{content_epoch()}:{name}'
+        return f'{base}:v{version}' if version is not None else base
+
+    def get(self, name: str, version: Any = None, default: Any = None) -> Any:
+        key = self.make_key(name, version)
+        value = self.local.get(key)
+        if value is not _MISSING:
+            CACHE_REQUESTS.inc(cache=self.prefix, result='local')
+            return value
+        with timed('cache'):
+            value = self.shared.get(key, _MISSING)
+        if value is _MISSING:
+            CACHE_REQUESTS.inc(cache=self.prefix, result='miss')
+            return default
+        CACHE_REQUESTS.inc(cache=self.prefix, result='shared')
+        self.local.set(key, value)
+        return value
+
+    def set(self, name: str, value: Any, version: Any = None, timeout: int | None = DEFAULT_TIMEOUT) -> None:
+        key = self.make_key(name, version)
+        self._store(name, key, value, version, timeout)
+        self.local.set(key, value)
+
+    def get_or_set(
+        self,
+        name: str,
+        producer: Callable[[], Any],
+        version: Any = None,
+        timeout: int | None = DEFAULT_TIMEOUT,
+    ) -> Any:
+        value = self.get(name, version, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        key = self.make_key(name, version)
+        # single-flight внутри процесса: остальные потоки ждут первый
+        with self._lock_for(key):
+            value = self.get(name, version, _MISSING)
+            if value is not _MISSING:
+                return value
+            value, fresh = self._produce_shared(name, key, producer, version, timeout)
+            if fresh:
+                self.local.set(key, value)
+            return value
+
+    def _produce_shared(
+        self, name: str, key: str, producer: Callable[[], Any], version: Any, timeout: int | None,
+    ) -> tuple[Any, bool]:
+        """
+        Защита от dogpile между воркерами: считает тот, кто первым взял lock-ключ.
+        Остальные не ждут его (запрос не висит в sleep): отдают значение прошлой версии,
+        а если его нет — считают сами. Возвращает (значение, свежее ли оно).
+        """
+        if not self.shared.add(f'{key}:lock', 1, int(self.lock_timeout) + 1):
+            stale = self.shared.get(self._stale_key(name), _MISSING) if version is not None else _MISSING
+            if stale is not _MISSING:
+                CACHE_REQUESTS.inc(cache=self.prefix, result='stale')
+                return stale, False
+        value = producer()
+        self._store(name, key, value, version, timeout)
+        # lock-ключ не удаляем: get+delete не атомарны и могли бы снять чужую блокировку.
+        # Он истекает сам, а пока значение этой версии лежит в кэше, блокировка не нужна.
+        return value, True
+
+    def _stale_key(self, name: str) -> str:
+        return f'{self.prefix}:e{content_epoch()}:{name}:latest'
+
+    def _store(self, name: str, key: str, value: Any, version: Any, timeout: int | None) -> None:
+        entries = {key: value}
+        if version is not None:
+            # последнее посчитанное значение (любой версии) — для тех, кто не взял lock
+            entries[self._stale_key(name)] = value
+        # DEFAULT_TIMEOUT — «как настроено для кэша», None — явная просьба хранить без срока
+        with timed('cache'):
+            self.shared.set_many(entries, self.timeout if timeout is DEFAULT_TIMEOUT else timeout)
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._key_locks_guard:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                if len(self._key_locks) > self.local.max_entries:
+                    self._key_locks = {k: v for k, v in self._key_locks.items() if v.locked()}
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+
+# Готовый HTML статьи (блоки ответа) для QaDetailView
+qa_article_cache = TwoTierCache('qa-article')
@@ -0,0 +1,176 @@
+"""
+Потоковая выгрузка базы знаний в JSONL (manage.py export_guide и /export/guide.jsonl).
+
+Порядок: все продукты, затем подкатегории, затем вопросы с блоками — тот же формат
+записей, что принимает import_guide. Каждая секция читается страницами по первичному
+ключу (WHERE id > последний ORDER BY id LIMIT n): память не зависит от размера базы,
+курсор БД не держится открытым между страницами, а продолжить выгрузку можно с любой
+строки — у каждой записи есть поле "cursor" вида "qa:123".
+"""
+from __future__ import annotations
+import json
+import zlib
+from collections import defaultdict
+from typing import AsyncIterator, Iterator
+
+from asgiref.sync import sync_to_async
+
+from guide.models import Product, QABlock, QAItem, Subcategory
+
+SECTIONS = ('product', 'subcategory', 'qa')
+PAGE_SIZE = 500
+GZIP_CHUNK = 64 * 1024
+
+BLOCK_FIELDS = (
+    'kind', 'heading_text', 'heading_level', 'heading_anchor', 'text_md',
+    'media_file', 'media_url', 'alt_text', 'caption', 'is_active',
+)
+
+
+class ExportCursorError(ValueError):
+    pass
+
+
+def parse_cursor(value: str | None) -> tuple[int, int]:
+    """'qa:123' -> (индекс секции, последний выгруженный id); пустой курсор — с начала."""
+    if not value:
+        return 0, 0
+    section, _, last_id = value.partition(':')
+    if section not in SECTIONS or not last_id.isdigit():
+        raise ExportCursorError(f'Некорректный курсор: {value!r}, ожидается <{"|".join(SECTIONS)}>:<id>')
+    return SECTIONS.index(section), int(last_id)
+
+
+def _dates(obj) -> dict:
+    return {
+        'created_at': obj.created_at.isoformat(),
+        'updated_at': obj.updated_at.isoformat(),
+    }
+
+
+def _product_records(after: int, size: int) -> list[dict]:
+    rows = Product.objects.filter(pk__gt=after).order_by('pk')[:size]
+    return [
+        {
+            'type': 'product', 'cursor': f'product:{p.pk}', 'id': p.pk, 'slug': p.slug, 'name': p.name,
+            'position': p.position, 'is_active': p.is_active, **_dates(p),
+        }
+        for p in rows
+    ]
+
+
+def _subcategory_records(after: int, size: int) -> list[dict]:
+    rows = (
+        Subcategory.objects.filter(pk__gt=after).order_by('pk')
+        .select_related('product')
+        .only('product', 'slug', 'name', 'position', 'is_active', 'created_at', 'updated_at', 'product__slug')
+    )[:size]
+    return [
+        {
+            'type': 'subcategory', 'cursor': f'subcategory:{s.pk}', 'id': s.pk, 'product': s.product.slug,
+            'slug': s.slug, 'name': s.name, 'position': s.position, 'is_active': s.is_active, **_dates(s),
+        }
+        for s in rows
+    ]
+
+
+def _qa_records(after: int, size: int) -> list[dict]:
+    qas = list(
+        QAItem.objects.filter(pk__gt=after).order_by('pk')
+        .select_related('product', 'subcategory')
+        .only(
+            'product', 'subcategory', 'question', 'status', 'position', 'is_active', 'created_at', 'updated_at',
+            'product__slug', 'subcategory__slug',
+        )[:size]
+    )
+    blocks = defaultdict(list)
+    if qas:
+        rows = (
+            QABlock.objects.filter(qa_id__in=[qa.pk for qa in qas])
+            .order_by('qa_id', 'position', 'id')
+            .values_list('qa_id', *BLOCK_FIELDS)
+        )
+        for qa_id, *values in rows:
+            blocks[qa_id].append({k: v for k, v in zip(BLOCK_FIELDS, values) if v not in (None, '')})
+    return [
+        {
+            'type': 'qa', 'cursor': f'qa:{qa.pk}', 'id': qa.pk,
+            'product': qa.product.slug, 'subcategory': qa.subcategory.slug,
+            'question': qa.question, 'status': qa.status, 'position': qa.position, 'is_active': qa.is_active,
+            **_dates(qa), 'blocks': blocks[qa.pk],
+        }
+        for qa in qas
+    ]
+
+
+PAGE_READERS = (_product_records, _subcategory_records, _qa_records)
+
+
+def export_pages(cursor: str | None = None, page_size: int = PAGE_SIZE) -> Iterator[list[dict]]:
+    """Страницы записей начиная после cursor."""
+    start, after = parse_cursor(cursor)
+    for index in range(start, len(SECTIONS)):
+        read = PAGE_READERS[index]
+        last = after if index == start else 0
+        while True:
+            page = read(last, page_size)
+            if not page:
+                break
+            yield page
+            last = page[-1]['id']
+
+
+def export_lines(cursor: str | None = None, page_size: int = PAGE_SIZE) -> Iterator[bytes]:
+    """По строке JSON (bytes, с переводом строки) на запись."""
+    for page in export_pages(cursor, page_size):
+        for record in page:
+            yield json.dumps(record, ensure_ascii=False).encode() + b'\n'
+
+
+async def aexport_lines(cursor: str | None = None, page_size: int = PAGE_SIZE) -> AsyncIterator[bytes]:
+    """
+    То же для ASGI: каждая страница читается в потоке, цикл событий не блокируется,
+    а StreamingHttpResponse не собирает синхронный итератор в список целиком.
+    """
+    pages = export_pages(cursor, page_size)
+    next_page = sync_to_async(lambda: next(pages, None), thread_sensitive=True)
+    while (page := await next_page()) is not None:
+        for record in page:
+            yield json.dumps(record, ensure_ascii=False).encode() + b'\n'
+
+
+class GzipStream:
+    """Сжатие gzip на лету: строки копятся до GZIP_CHUNK и отдаются сжатыми кусками."""
+
+    def __init__(self, level: int = 6):
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        self.buffer: list[bytes] = []
+        self.buffered = 0
+
+    def feed(self, data: bytes) -> bytes:
+        self.buffer.append(data)
+        self.buffered += len(data)
+        if self.buffered < GZIP_CHUNK:
+            return b''
+        chunk = self.compressor.compress(b''.join(self.buffer))
+        self.buffer, self.buffered = [], 0
+        return chunk
+
+    def finish(self) -> bytes:
+        return self.compressor.compress(b''.join(self.buffer)) + self.compressor.flush()
+
+
+def gzip_lines(lines: Iterator[bytes]) -> Iterator[bytes]:
+    stream = GzipStream()
+    for line in lines:
+        if chunk := stream.feed(line):
+            yield chunk
+    yield stream.finish()
+
+
+async def agzip_lines(lines: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    stream = GzipStream()
+    async for line in lines:
+        if chunk := stream.feed(line):
+            yield chunk
+    yield stream.finish()
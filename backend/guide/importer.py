@@ -0,0 +1,558 @@
+"""
+Массовый импорт базы знаний (manage.py import_guide).
+
+Источники:
+  * JSONL (можно .jsonl.gz) — по объекту на строку: {"type": "product" | "subcategory" | "qa", ...};
+    тот же формат, что выгружает export_guide;
+  * дерево Markdown: <корень>/<продукт>/<подкатегория>/<вопрос>.md с front-matter
+    (строки "ключ: значение" между "---"), необязательный _index.md задаёт name каталога.
+
+Записи читаются потоково и обрабатываются пачками: медиа копируются параллельно
+до транзакции, затем продукты, подкатегории, вопросы и блоки создаются через
+bulk_create в одной транзакции на пачку. Slug'и и позиции распределяются в памяти,
+без save() и запросов на каждую строку. В памяти живут только пачка и справочники
+продукт/подкатегория -> id. Поколения контента затронутых областей поднимаются в транзакции
+пачки (bump_many), счётчики пересчитываются один раз в конце (recount).
+"""
+from __future__ import annotations
+import gzip
+import io
+import json
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from django.core.files import File
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import Max
+from django.utils.text import slugify
+
+from giguide.variables import ModelConfig
+from guide.models import (
+    BlockKind,
+    ContentGeneration,
+    GenerationScope,
+    HeadingLevel,
+    MediaBlob,
+    Product,
+    QABlock,
+    QAItem,
+    QARevision,
+    QAStatus,
+    Subcategory,
+)
+from guide.storage import qa_media_storage
+from guide.utils.slug import slugify_value
+
+VIDEO_SUFFIXES = ('.mp4', '.webm', '.mov')
+INDEX_FILE = '_index.md'
+MAX_ERRORS = 100
+
+_HEADING = re.compile(r'^(#{1,4})\s+(.+?)\s*#*\s*$')
+_MEDIA_LINE = re.compile(r'^!\[(?P<alt>[^\]]*)\]\((?P<src>[^\s)]+)(?:\s+"(?P<caption>[^"]*)")?\)$')
+_FENCE = re.compile(r'^\s*(```|~~~)')
+
+
+class ImportRecordError(ValueError):
+    """Запись не прошла проверку и пропускается (остальные импортируются)."""
+
+
+# --- чтение источников ---
+
+def read_front_matter(text: str) -> tuple[dict[str, str], str]:
+    """Front-matter вида "ключ: значение" между строками "---" и тело без него."""
+    if not text.startswith('---'):
+        return {}, text
+    lines = text.splitlines()
+    for end in range(1, len(lines)):
+        if lines[end].strip() == '---':
+            meta = {}
+            for line in lines[1:end]:
+                key, sep, value = line.partition(':')
+                if sep and key.strip():
+                    meta[key.strip().lower()] = value.strip().strip('"\'')
+            return meta, '\n'.join(lines[end + 1:])
+    return {}, text
+
+
+def markdown_blocks(body: str, base: Path) -> tuple[str | None, list[dict]]:
+    """
+    Тело статьи -> (вопрос из "# ...", если он первый, блоки).
+    "##".."####" — заголовки, строка из одной картинки ![alt](путь "подпись") — медиа-блок,
+    всё остальное (включая fenced code) — текстовые блоки.
+    """
+    question = None
+    blocks: list[dict] = []
+    text: list[str] = []
+    in_fence = False
+
+    def flush_text():
+        md = '\n'.join(text).strip()
+        if md:
+            blocks.append({'kind': BlockKind.TEXT, 'text_md': md})
+        text.clear()
+
+    for line in body.splitlines():
+        if _FENCE.match(line):
+            in_fence = not in_fence
+            text.append(line)
+            continue
+        if in_fence:
+            text.append(line)
+            continue
+        heading = _HEADING.match(line)
+        if heading:
+            level = len(heading.group(1))
+            if level == 1 and question is None and not blocks and not ''.join(text).strip():
+                question = heading.group(2)
+                continue
+            flush_text()
+            blocks.append({
+                'kind': BlockKind.HEADING,
+                'heading_text': heading.group(2),
+                'heading_level': max(level, HeadingLevel.H2),
+            })
+            continue
+        media = _MEDIA_LINE.match(line.strip())
+        if media:
+            flush_text()
+            src = media.group('src')
+            suffix = Path(src.split('?', 1)[0]).suffix.lower()
+            block = {
+                'kind': BlockKind.GIF if suffix == '.gif' else BlockKind.VIDEO if suffix in VIDEO_SUFFIXES else BlockKind.IMAGE,
+                'alt_text': media.group('alt') or None,
+                'caption': media.group('caption') or None,
+            }
+            if src.startswith(('http://', 'https://')):
+                block['media_url'] = src
+            else:
+                block['media_path'] = str((base / src).resolve())
+            blocks.append(block)
+            continue
+        text.append(line)
+    flush_text()
+    return question, blocks
+
+
+def _directory_name(directory: Path) -> str:
+    index = directory / INDEX_FILE
+    if index.is_file():
+        meta, _ = read_front_matter(index.read_text(encoding='utf-8'))
+        if meta.get('name'):
+            return meta['name']
+    return directory.name
+
+
+def _subdirectories(directory: Path) -> list[Path]:
+    return sorted(p for p in directory.iterdir() if p.is_dir() and not p.name.startswith(('.', '_')))
+
+
+def iter_markdown_tree(root: Path) -> Iterator[dict]:
+    """Статьи дерева по одной (каталоги и файлы в алфавитном порядке)."""
+    for product_dir in _subdirectories(root):
+        product_name = _directory_name(product_dir)
+        yield {'type': 'product', 'slug': product_dir.name, 'name': product_name, '_source': str(product_dir)}
+        for sub_dir in _subdirectories(product_dir):
+            sub_name = _directory_name(sub_dir)
+            for path in sorted(sub_dir.glob('*.md')):
+                if path.name.startswith('_'):
+                    continue
+                meta, body = read_front_matter(path.read_text(encoding='utf-8'))
+                question, blocks = markdown_blocks(body, path.parent)
+                yield {
+                    'type': 'qa',
+                    'product': meta.get('product', product_dir.name),
+                    'product_name': meta.get('product_name', product_name),
+                    'subcategory': meta.get('subcategory', sub_dir.name),
+                    'subcategory_name': meta.get('subcategory_name', sub_name),
+                    'question': meta.get('question') or question or path.stem,
+                    'status': meta.get('status'),
+                    'is_active': meta.get('is_active', 'true').lower() not in ('false', 'no', '0'),
+                    'blocks': blocks,
+                    '_source': str(path),
+                }
+
+
+def iter_jsonl(path: Path, media_root: Path | None = None) -> Iterator[dict]:
+    """Строки JSONL (или .jsonl.gz); media_file блоков ищутся относительно media_root."""
+    media_root = media_root or path.parent
+    opener = gzip.open if path.suffix == '.gz' else open
+    with opener(path, 'rt', encoding='utf-8') as fh:
+        for number, line in enumerate(fh, 1):
+            if not line.strip():
+                continue
+            source = f'{path.name}:{number}'
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                yield {'_source': source, '_error': f'некорректный JSON: {exc}'}
+                continue
+            if not isinstance(record, dict):
+                yield {'_source': source, '_error': 'ожидался JSON-объект'}
+                continue
+            for block in record.get('blocks') or ():
+                if isinstance(block, dict) and block.get('media_file') and not block.get('media_path'):
+                    block['media_path'] = str(media_root / block['media_file'])
+            record['_source'] = source
+            yield record
+
+
+# --- проверка записей ---
+
+def _text(value, limit: int | None = None, what: str = '') -> str | None:
+    if value is None or value == '':
+        return None
+    value = str(value).strip()
+    if limit and len(value) > limit:
+        raise ImportRecordError(f'{what}: длиннее {limit} символов')
+    return value or None
+
+
+def _slug(value, fallback) -> str:
+    return slugify_value(str(value or fallback))[:ModelConfig.MAX_LENGTH_SLUG]
+
+
+def _position(value) -> int | None:
+    """Позиция из записи (как в выгрузке export_guide); None — следующая свободная."""
+    if value is None or value == '':
+        return None
+    try:
+        position = int(value)
+    except (TypeError, ValueError):
+        raise ImportRecordError(f'некорректный position: {value!r}')
+    if position < 1:
+        raise ImportRecordError(f'position должен быть больше нуля: {position}')
+    return position
+
+
+def normalize_block(block: dict) -> dict:
+    if not isinstance(block, dict):
+        raise ImportRecordError('блок должен быть объектом')
+    kind = block.get('kind')
+    if kind not in BlockKind.values:
+        raise ImportRecordError(f'неизвестный тип блока: {kind!r}')
+    result = {'kind': kind, 'is_active': bool(block.get('is_active', True))}
+    if kind == BlockKind.HEADING:
+        result['heading_text'] = _text(block.get('heading_text'), ModelConfig.MAX_LENGTH_HEADING, 'heading_text')
+        if not result['heading_text']:
+            raise ImportRecordError('у заголовка нет heading_text')
+        level = int(block.get('heading_level') or HeadingLevel.H2)
+        if level not in HeadingLevel.values:
+            raise ImportRecordError(f'недопустимый heading_level: {level}')
+        result['heading_level'] = level
+        result['heading_anchor'] = _text(block.get('heading_anchor'), ModelConfig.MAX_LENGTH_HEADING_ANCHOR, 'heading_anchor')
+    elif kind == BlockKind.TEXT:
+        result['text_md'] = _text(block.get('text_md'))
+        if not result['text_md']:
+            raise ImportRecordError('у текстового блока нет text_md')
+    else:
+        result['media_url'] = _text(block.get('media_url'))
+        result['media_path'] = block.get('media_path')
+        if not result['media_url'] and not result['media_path']:
+            raise ImportRecordError('у медиа-блока нет media_url или файла')
+        result['alt_text'] = _text(block.get('alt_text'), ModelConfig.MAX_LENGTH_ALT_TEXT, 'alt_text')
+        result['caption'] = _text(block.get('caption'), ModelConfig.MAX_LENGTH_CAPTION, 'caption')
+    return result
+
+
+def normalize_record(record: dict, default_status: str = QAStatus.DRAFT) -> dict:
+    """Запись источника -> проверенный словарь с ключами product/subcategory (slug) и полями модели."""
+    if '_error' in record:
+        raise ImportRecordError(record['_error'])
+    kind = record.get('type', 'qa')
+    if kind == 'product':
+        name = _text(record.get('name'), ModelConfig.MAX_LENGTH_NAME, 'name')
+        if not name and not record.get('slug'):
+            raise ImportRecordError('у продукта нет ни slug, ни name')
+        return {
+            'type': kind,
+            'product': _slug(record.get('slug'), name),
+            'product_name': name or record['slug'],
+            'position': _position(record.get('position')),
+            'is_active': bool(record.get('is_active', True)),
+        }
+    if kind not in ('subcategory', 'qa'):
+        raise ImportRecordError(f'неизвестный type: {kind!r}')
+
+    product_name = _text(record.get('product_name'), ModelConfig.MAX_LENGTH_NAME, 'product_name')
+    if not record.get('product') and not product_name:
+        raise ImportRecordError('не указан продукт')
+    result = {
+        'type': kind,
+        'product': _slug(record.get('product'), product_name),
+        'product_name': product_name or str(record['product']),
+    }
+    if kind == 'subcategory':
+        sub_name = _text(record.get('name'), ModelConfig.MAX_LENGTH_NAME, 'name')
+        sub_slug = record.get('slug')
+        result['position'] = _position(record.get('position'))
+        result['is_active'] = bool(record.get('is_active', True))
+    else:
+        sub_name = _text(record.get('subcategory_name'), ModelConfig.MAX_LENGTH_NAME, 'subcategory_name')
+        sub_slug = record.get('subcategory')
+    if not sub_slug and not sub_name:
+        raise ImportRecordError('не указана подкатегория')
+    result['subcategory'] = _slug(sub_slug, sub_name)
+    result['subcategory_name'] = sub_name or str(sub_slug)
+    if kind == 'subcategory':
+        return result
+
+    question = _text(record.get('question'))
+    if not question:
+        raise ImportRecordError('пустой question')
+    status = record.get('status') or default_status
+    if status not in QAStatus.values:
+        raise ImportRecordError(f'неизвестный status: {status!r}')
+    blocks = record.get('blocks') or []
+    if not isinstance(blocks, list):
+        raise ImportRecordError('blocks должен быть списком')
+    result.update(
+        question=question,
+        status=status,
+        position=_position(record.get('position')),
+        is_active=bool(record.get('is_active', True)),
+        blocks=[normalize_block(b) for b in blocks],
+    )
+    return result
+
+
+def store_media_file(path: str) -> str:
+    """Кладёт файл в хранилище медиа (по хэшу содержимого) и возвращает имя блоба."""
+    source = Path(path)
+    with source.open('rb') as fh:
+        return qa_media_storage.save(f'qa/import/{slugify(source.stem) or "file"}{source.suffix.lower()}', File(fh))
+
+
+# --- импорт ---
+
+@dataclass
+class ImportStats:
+    products: int = 0
+    subcategories: int = 0
+    qas: int = 0
+    blocks: int = 0
+    media: int = 0
+    skipped: int = 0
+    errors: list[str] = field(default_factory=list)
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self) -> float:
+        return self.qas / self.elapsed if self.elapsed else 0.0
+
+
+class GuideImporter:
+    def __init__(
+        self,
+        *,
+        batch_size: int = 500,
+        media_workers: int = 4,
+        default_status: str = QAStatus.DRAFT,
+        progress: Callable[[ImportStats], None] | None = None,
+    ):
+        self.batch_size = batch_size
+        self.media_workers = media_workers
+        self.default_status = default_status
+        self.progress = progress
+        self.stats = ImportStats()
+
+        # справочники и следующие свободные позиции — по строке на продукт/подкатегорию
+        self.products: dict[str, int] = dict(Product.objects.values_list('slug', 'pk'))
+        self.subcategories: dict[tuple[int, str], int] = {
+            (product_id, slug): pk for pk, product_id, slug in Subcategory.objects.values_list('pk', 'product_id', 'slug')
+        }
+        self.next_product_position = (Product.objects.aggregate(m=Max('position'))['m'] or 0) + 1
+        self.next_sub_position = self._next_positions(Subcategory.objects, 'product_id')
+        self.next_qa_position = self._next_positions(QAItem.objects, 'subcategory_id')
+
+    @staticmethod
+    def _next_positions(manager, scope: str) -> dict[int, int]:
+        rows = manager.order_by().values(scope).annotate(m=Max('position')).values_list(scope, 'm')
+        return {key: (m or 0) + 1 for key, m in rows}
+
+    def run(self, records: Iterable[dict]) -> ImportStats:
+        chunk: list[dict] = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= self.batch_size:
+                self._import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._import_chunk(chunk)
+
+        if self.stats.qas or self.stats.subcategories or self.stats.products:
+            # recount сам поднимает поколения строк, чьи счётчики поменялись
+            call_command('recount', stdout=io.StringIO())
+        return self.stats
+
+    def _skip(self, record: dict, error: Exception) -> None:
+        self.stats.skipped += 1
+        if len(self.stats.errors) < MAX_ERRORS:
+            self.stats.errors.append(f'{record.get("_source", "?")}: {error}')
+
+    def _import_chunk(self, records: list[dict]) -> None:
+        valid = []
+        for record in records:
+            try:
+                valid.append((record, normalize_record(record, self.default_status)))
+            except (ImportRecordError, TypeError, ValueError) as exc:
+                self._skip(record, exc)
+
+        # файлы копируются до транзакции: блокировка записи в БД не ждёт диск
+        stored = self._store_media({
+            block['media_path']
+            for _, item in valid if item['type'] == 'qa'
+            for block in item['blocks'] if block.get('media_path')
+        })
+        items = []
+        for record, item in valid:
+            missing = [
+                b['media_path'] for b in item.get('blocks', ())
+                if b.get('media_path') and b['media_path'] not in stored
+            ]
+            if missing:
+                self._skip(record, ImportRecordError(f'не удалось скопировать медиа: {missing[0]}'))
+            else:
+                items.append(item)
+
+        with transaction.atomic():
+            scopes = [
+                *self._create_products(items),
+                *self._create_subcategories(items),
+                *self._create_qas([item for item in items if item['type'] == 'qa'], stored),
+            ]
+            # сигналы при bulk_create не срабатывают — поколения затронутых областей поднимаем сами,
+            # в той же транзакции, что и данные пачки
+            if scopes:
+                ContentGeneration.objects.bump_many([*scopes, (GenerationScope.NAV, 0)])
+
+        if self.progress:
+            self.progress(self.stats)
+
+    def _store_media(self, paths: set[str]) -> dict[str, str]:
+        if not paths:
+            return {}
+        stored = {}
+        with ThreadPoolExecutor(max_workers=self.media_workers) as pool:
+            futures = {path: pool.submit(store_media_file, path) for path in sorted(paths)}
+        for path, future in futures.items():
+            try:
+                stored[path] = future.result()
+            except OSError:
+                continue
+        self.stats.media += len(stored)
+        return stored
+
+    def _create_products(self, items: list[dict]) -> list[tuple[str, int]]:
+        pending: dict[str, Product] = {}
+        for item in items:
+            slug = item['product']
+            if slug in self.products or slug in pending:
+                continue
+            explicit = item['type'] == 'product'
+            position = (explicit and item['position']) or self.next_product_position
+            self.next_product_position = max(self.next_product_position, position + 1)
+            pending[slug] = Product(
+                name=item['product_name'][:ModelConfig.MAX_LENGTH_NAME],
+                slug=slug,
+                position=position,
+                is_active=item['is_active'] if explicit else True,
+            )
+        created = Product.objects.bulk_create(pending.values())
+        for product in created:
+            self.products[product.slug] = product.pk
+        self.stats.products += len(pending)
+        return [scope for product in created for scope in product.content_scopes()]
+
+    def _create_subcategories(self, items: list[dict]) -> list[tuple[str, int]]:
+        pending: dict[tuple[int, str], Subcategory] = {}
+        for item in items:
+            if item['type'] == 'product':
+                continue
+            product_id = self.products[item['product']]
+            key = (product_id, item['subcategory'])
+            if key in self.subcategories or key in pending:
+                continue
+            # позиция и флаг — только из записи самой подкатегории, не из вопроса, который её создал
+            explicit = item['type'] == 'subcategory'
+            next_position = self.next_sub_position.get(product_id, 1)
+            position = (explicit and item['position']) or next_position
+            self.next_sub_position[product_id] = max(next_position, position + 1)
+            pending[key] = Subcategory(
+                product_id=product_id,
+                name=item['subcategory_name'][:ModelConfig.MAX_LENGTH_NAME],
+                slug=item['subcategory'],
+                position=position,
+                is_active=item['is_active'] if explicit else True,
+            )
+        created = Subcategory.objects.bulk_create(pending.values())
+        for sub in created:
+            self.subcategories[(sub.product_id, sub.slug)] = sub.pk
+        self.stats.subcategories += len(pending)
+        return [scope for sub in created for scope in sub.content_scopes()]
+
+    def _create_qas(self, items: list[dict], stored: dict[str, str]) -> list[tuple[str, int]]:
+        qas = []
+        for item in items:
+            product_id = self.products[item['product']]
+            sub_id = self.subcategories[(product_id, item['subcategory'])]
+            next_position = self.next_qa_position.get(sub_id, 1)
+            position = item['position'] or next_position
+            self.next_qa_position[sub_id] = max(next_position, position + 1)
+            qas.append(QAItem(
+                subcategory_id=sub_id,
+                product_id=product_id,
+                question=item['question'],
+                status=item['status'],
+                is_active=item['is_active'],
+                position=position,
+            ))
+        qas = QAItem.objects.bulk_create(qas)
+
+        blocks = []
+        media_refs: Counter[str] = Counter()
+        for qa, item in zip(qas, items):
+            for position, data in enumerate(item['blocks'], 1):
+                block = QABlock(qa_id=qa.pk, position=position, kind=data['kind'], is_active=data['is_active'])
+                if data['kind'] == BlockKind.HEADING:
+                    block.heading_text = data['heading_text']
+                    block.heading_level = data['heading_level']
+                    # как в QABlock.save()
+                    block.heading_anchor = data['heading_anchor'] or (
+                        slugify(data['heading_text']) or f'h{data["heading_level"]}-{position}'
+                    )[:220]
+                elif data['kind'] == BlockKind.TEXT:
+                    block.text_md = data['text_md']
+                else:
+                    block.media_url = data['media_url']
+                    block.alt_text = data['alt_text']
+                    block.caption = data['caption']
+                    if data['media_path']:
+                        block.media_file = stored[data['media_path']]
+                        media_refs[stored[data['media_path']]] += 1
+                blocks.append(block)
+        QABlock.objects.bulk_create(blocks, batch_size=self.batch_size)
+        MediaBlob.objects.retain_many(media_refs)
+        # первая ревизия — снимок импортированного состояния, как при создании вопроса в QACreateView
+        QARevision.objects.record_many([qa.pk for qa in qas])
+
+        self.stats.qas += len(qas)
+        self.stats.blocks += len(blocks)
+        return [scope for qa in qas for scope in qa.content_scopes()]
+
+
+def iter_source(source: Path, fmt: str = 'auto', media_root: Path | None = None) -> Iterator[dict]:
+    if fmt == 'auto':
+        fmt = 'markdown' if source.is_dir() else 'jsonl'
+    if fmt == 'markdown':
+        return iter_markdown_tree(source)
+    return iter_jsonl(source, media_root)
@@ -0,0 +1,126 @@
+from __future__ import annotations
+import json
+import platform
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from guide.bench import (
+    BENCH_DIR,
+    LatencyStats,
+    QueryCounter,
+    bench_environment,
+    bench_staff_user,
+    build_requests,
+    ensure_knowledge_base,
+    parse_scale,
+    perform,
+)
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер вьюх (главная, списки, вопрос, поиск, сохранение редактором) на синтетической базе '
+        '1k/10k/100k вопросов: перцентили задержки и число запросов, результат — JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', default='1k', help='1k, 10k, 100k или число вопросов')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--repeat', type=int, default=20, help='Запросов на каждую вьюху')
+        parser.add_argument('--warmup', type=int, default=3, help='Непосчитанных прогревочных запросов на вьюху')
+        parser.add_argument('--keepdb', action='store_true', help='Не удалять сгенерированную БД (повторный запуск быстрее)')
+        parser.add_argument('--output', help='Куда сохранить JSON (по умолчанию bench/results/...)')
+        parser.add_argument('--compare', help='JSON предыдущего прогона для сравнения p50/p99')
+
+    def handle(self, *args, **opts):
+        try:
+            qas = parse_scale(opts['scale'])
+        except ValueError:
+            raise CommandError(f'Непонятный масштаб: {opts["scale"]}')
+        baseline = self._load(opts['compare']) if opts['compare'] else None
+
+        with bench_environment(qas, keepdb=opts['keepdb']):
+            started = time.perf_counter()
+            generated = ensure_knowledge_base(qas, opts['seed'])
+            if generated:
+                self.stdout.write(f'Сгенерировано за {time.perf_counter() - started:.1f} с: {generated}')
+
+            requests = build_requests(opts['seed'], per_view=opts['repeat'] + opts['warmup'])
+            anonymous, staff = Client(), Client()
+            staff.force_login(bench_staff_user())
+
+            stats: dict[str, LatencyStats] = defaultdict(LatencyStats)
+            seen: dict[str, int] = defaultdict(int)
+            with QueryCounter().installed() as counter:
+                for request in requests:
+                    sample = perform(staff if request.staff else anonymous, request, counter)
+                    seen[request.name] += 1
+                    if seen[request.name] > opts['warmup']:
+                        stats[request.name].samples.append(sample)
+
+        results = {name: s.summary() for name, s in stats.items()}
+        report = {
+            'meta': {
+                'scale': qas,
+                'seed': opts['seed'],
+                'repeat': opts['repeat'],
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'git': _git_revision(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'db_engine': settings.DATABASES['default']['ENGINE'],
+            },
+            'results': results,
+        }
+        output = Path(opts['output'] or BENCH_DIR / 'results' / f'bench-{qas}-{datetime.now():%Y%m%d-%H%M%S}.json')
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+
+        self._print(results, baseline)
+        self.stdout.write(self.style.SUCCESS(f'Результат: {output}'))
+
+    @staticmethod
+    def _load(path: str) -> dict:
+        try:
+            return json.loads(Path(path).read_text(encoding='utf-8'))['results']
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f'Не удалось прочитать {path}: {exc}')
+
+    def _print(self, results: dict, baseline: dict | None) -> None:
+        self.stdout.write(
+            f'{"вьюха":<14} {"p50 мс":>9} {"p90 мс":>9} {"p99 мс":>9} {"запросов":>9} {"ошибок":>7}'
+            + (f' {"Δp50":>8} {"Δp99":>8}' if baseline else '')
+        )
+        for name, r in results.items():
+            line = (
+                f'{name:<14} {r["p50_ms"]:>9.2f} {r["p90_ms"]:>9.2f} {r["p99_ms"]:>9.2f} '
+                f'{r["queries_median"]:>9} {r["errors"]:>7}'
+            )
+            old = (baseline or {}).get(name)
+            if old:
+                line += f' {_delta(old["p50_ms"], r["p50_ms"]):>8} {_delta(old["p99_ms"], r["p99_ms"]):>8}'
+            self.stdout.write(line)
+
+
+def _delta(old: float, new: float) -> str:
+    if not old:
+        return '—'
+    return f'{(new - old) / old * 100:+.0f}%'
@@ -0,0 +1,185 @@
+from __future__ import annotations
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+from django.test import Client
+
+from guide.bench import (
+    BENCH_DIR,
+    BenchRequest,
+    LatencyStats,
+    bench_environment,
+    bench_staff_user,
+    build_requests,
+    ensure_knowledge_base,
+    parse_scale,
+    perform,
+)
+from guide.management.commands.loadtest import DEFAULT_MIX, OPERATIONS, LoadRun, classify_error, parse_mix
+
+# Факторы профиля sqlite-prod; каждый вариант замера — базовый профиль 'sqlite' плюс один фактор
+FACTORS = ('pragmas', 'persistent', 'immediate')
+
+
+def variant_settings(factors: tuple[str, ...]) -> dict:
+    """Настройки соединения 'default' для набора факторов sqlite-prod поверх профиля 'sqlite'."""
+    pragmas = settings.SQLITE_PROD_PRAGMAS
+    options = {}
+    if 'pragmas' in factors:
+        options['init_command'] = ''.join(f'PRAGMA {k}={v};' for k, v in pragmas.items())
+        options['timeout'] = pragmas['busy_timeout'] / 1000
+    if 'immediate' in factors:
+        options['transaction_mode'] = 'IMMEDIATE'
+    return {
+        'OPTIONS': options,
+        'CONN_MAX_AGE': 600 if 'persistent' in factors else 0,
+        'CONN_HEALTH_CHECKS': 'persistent' in factors,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Вклад каждой настройки профиля "sqlite-prod" (прагмы/WAL, постоянные соединения, '
+        'IMMEDIATE-транзакции): потоки (как воркеры WSGI) гоняют настоящие вьюхи на базе из guide.bench, '
+        'варианты отличаются от профиля "sqlite" ровно одним фактором.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', default='1k', help='1k, 10k, 100k или число вопросов')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5.0, help='Длительность каждого варианта')
+        parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Веса операций, по умолчанию {DEFAULT_MIX}')
+        parser.add_argument('--keepdb', action='store_true')
+        parser.add_argument('--output', help='Куда сохранить JSON (по умолчанию bench/results/...)')
+
+    def handle(self, *args, **opts):
+        try:
+            qas = parse_scale(opts['scale'])
+        except ValueError:
+            raise CommandError(f'Непонятный масштаб: {opts["scale"]}')
+        mix = parse_mix(opts['mix'])
+        if not mix:
+            raise CommandError('Пустая смесь операций')
+
+        variants = {'sqlite': ()}
+        variants.update({f'+{factor}': (factor,) for factor in FACTORS})
+        variants['sqlite-prod'] = FACTORS
+
+        with bench_environment(qas, keepdb=opts['keepdb']):
+            if connections['default'].vendor != 'sqlite':
+                raise CommandError('Команда сравнивает настройки SQLite')
+            generated = ensure_knowledge_base(qas, opts['seed'])
+            if generated:
+                self.stdout.write(f'Сгенерировано: {generated}')
+            pools: dict[str, list[BenchRequest]] = defaultdict(list)
+            for request in build_requests(opts['seed'], per_view=100):
+                pools[request.name].append(request)
+            staff_user = bench_staff_user()
+
+            db = connections['default'].settings_dict
+            original = {key: db.get(key) for key in ('OPTIONS', 'CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+            results = {}
+            try:
+                for name, factors in variants.items():
+                    self._configure(db, factors)
+                    results[name] = self._run(pools, mix, staff_user, factors, opts)
+            finally:
+                connections.close_all()
+                db.update(original)
+                self._reset_journal()
+
+        self._print(results)
+        report = {
+            'meta': {
+                'scale': qas,
+                'seed': opts['seed'],
+                'workers': opts['workers'],
+                'seconds': opts['seconds'],
+                'mix': mix,
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+            },
+            'variants': {name: {**r, 'elapsed': round(r['elapsed'], 3)} for name, r in results.items()},
+        }
+        path = Path(opts['output'] or BENCH_DIR / 'results' / f'bench_sqlite-{qas}-{datetime.now():%Y%m%d-%H%M%S}.json')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(f'Результат: {path}'))
+
+    @staticmethod
+    def _configure(db: dict, factors: tuple[str, ...]) -> None:
+        # соединения всех потоков создаются из этого же словаря настроек
+        connections.close_all()
+        db.update(variant_settings(factors))
+        if 'pragmas' not in factors:
+            Command._reset_journal()
+
+    @staticmethod
+    def _reset_journal() -> None:
+        # journal_mode=WAL сохраняется в файле БД: без фактора прагм возвращаем журнал по умолчанию
+        with connections['default'].cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=DELETE')
+        connections.close_all()
+
+    def _run(self, pools, mix, staff_user, factors: tuple[str, ...], opts) -> dict:
+        run = LoadRun()
+        persistent = 'persistent' in factors
+        deadline = time.perf_counter() + opts['seconds']
+
+        def worker(index: int) -> None:
+            rng = random.Random(opts['seed'] + index)
+            anonymous, staff = Client(), Client()
+            staff.force_login(staff_user)
+            try:
+                while time.perf_counter() < deadline:
+                    op = rng.choices(list(mix), weights=list(mix.values()))[0]
+                    request = rng.choice(pools[OPERATIONS[op]])
+                    try:
+                        run.record(op, perform(staff if request.staff else anonymous, request))
+                    except Exception as exc:
+                        run.record(op, error=classify_error(exc))
+                        close_old_connections()
+                    if not persistent:
+                        # тестовый клиент не закрывает соединение в конце запроса, как это делает
+                        # обработчик при CONN_MAX_AGE=0, — закрываем сами
+                        connections['default'].close()
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(opts['workers'])]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        reads = [s for op, stats in run.stats.items() if op not in ('edit', 'add') for s in stats.samples]
+        writes = [s for op in ('edit', 'add') for s in run.stats[op].samples]
+        return {
+            'elapsed': elapsed,
+            'reads': len(reads),
+            'writes': len(writes),
+            'p99_ms': LatencyStats(reads + writes).summary()['p99_ms'],
+            'locked': run.errors['db_locked'],
+            'errors': sum(run.errors.values()),
+        }
+
+    def _print(self, results: dict) -> None:
+        self.stdout.write('')
+        self.stdout.write(
+            f'{"вариант":<12} {"чтений/с":>10} {"записей/с":>10} {"p99 мс":>9} {"locked":>8} {"сбоев":>7}'
+        )
+        for name, r in results.items():
+            self.stdout.write(
+                f'{name:<12} {r["reads"] / r["elapsed"]:>10.1f} {r["writes"] / r["elapsed"]:>10.1f} '
+                f'{r["p99_ms"]:>9.2f} {r["locked"]:>8} {r["errors"]:>7}'
+            )
@@ -0,0 +1,63 @@
+import os
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from guide.static_site import StaticSiteBuilder
+
+
+def default_host() -> str:
+    for host in settings.ALLOWED_HOSTS:
+        if host and host != '*' and not host.startswith('.'):
+            return host
+    return 'localhost'
+
+
+class Command(BaseCommand):
+    help = (
+        'Собирает статическую копию публичных страниц портала (главная, продукты, списки и страницы '
+        'вопросов, sitemap) для раздачи через nginx. Пересобираются только изменившиеся страницы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=str(Path(settings.BASE_DIR) / 'static_site'))
+        parser.add_argument('--base-url', help='Адрес сайта для ссылок в sitemap, например https://guide.example.ru')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Процессов рендеринга')
+        parser.add_argument('--batch-size', type=int, default=50, help='Страниц на одно задание процесса')
+        parser.add_argument('--force', action='store_true', help='Пересобрать всё (например, после смены шаблонов)')
+
+    def handle(self, *args, **opts):
+        host, secure = default_host(), False
+        if opts['base_url']:
+            parts = urlsplit(opts['base_url'])
+            if parts.scheme not in ('http', 'https') or not parts.netloc:
+                raise CommandError(f'Некорректный --base-url: {opts["base_url"]}')
+            host, secure = parts.netloc, parts.scheme == 'https'
+
+        builder = StaticSiteBuilder(
+            Path(opts['output']),
+            host=host,
+            secure=secure,
+            workers=max(opts['workers'], 1),
+            batch_size=max(opts['batch_size'], 1),
+            force=opts['force'],
+            progress=self._progress if opts['verbosity'] >= 2 else None,
+        )
+        started = time.perf_counter()
+        result = builder.build()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Страниц {result.total}: пересобрано {result.rendered}, без изменений {result.unchanged}, '
+            f'удалено {result.removed} за {elapsed:.1f} с -> {opts["output"]}'
+        ))
+        if result.failed:
+            for url, error in result.failed[:50]:
+                self.stderr.write(f'  {url}: {error}')
+            raise CommandError(f'Не удалось отрендерить страниц: {len(result.failed)}')
+
+    def _progress(self, done: int, total: int) -> None:
+        self.stdout.write(f'{done}/{total}')
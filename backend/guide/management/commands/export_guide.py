@@ -0,0 +1,49 @@
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from guide.exporter import PAGE_SIZE, ExportCursorError, export_lines, gzip_lines, parse_cursor
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковая выгрузка всей базы знаний в JSONL (продукты, подкатегории, вопросы с блоками) '
+        'с постоянным расходом памяти; формат совместим с import_guide.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', help='Файл (по умолчанию stdout); .gz включает сжатие')
+        parser.add_argument('--gzip', action='store_true', help='Сжимать gzip на лету')
+        parser.add_argument('--after', help='Продолжить после курсора, например qa:12345 (поле cursor записи)')
+        parser.add_argument('--page-size', type=int, default=PAGE_SIZE)
+
+    def handle(self, *args, **opts):
+        try:
+            parse_cursor(opts['after'])
+        except ExportCursorError as exc:
+            raise CommandError(str(exc))
+        if opts['page_size'] < 1:
+            raise CommandError('--page-size должен быть больше нуля')
+
+        output = opts['output']
+        compress = opts['gzip'] or bool(output and output.endswith('.gz'))
+        chunks = export_lines(opts['after'], opts['page_size'])
+        if compress:
+            chunks = gzip_lines(chunks)
+
+        if output:
+            path = Path(output)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # при продолжении по курсору дописываем в тот же файл (gzip допускает склейку потоков)
+            with path.open('ab' if opts['after'] else 'wb') as fh:
+                written = sum(fh.write(chunk) for chunk in chunks)
+            self.stderr.write(self.style.SUCCESS(f'Записано {written} байт в {path}'))
+        elif compress:
+            # сжатый поток — только байтами в настоящий stdout (export_guide --gzip > guide.jsonl.gz)
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk.decode(), ending='')
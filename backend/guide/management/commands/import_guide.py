@@ -0,0 +1,59 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from guide.importer import GuideImporter, ImportStats, iter_source
+from guide.models import QAStatus
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковый импорт вопросов из JSONL (.jsonl/.jsonl.gz) или дерева Markdown '
+        '<продукт>/<подкатегория>/<вопрос>.md: пачки bulk_create в транзакциях, '
+        'параллельное копирование медиа, прогресс и скорость.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Файл JSONL или каталог с Markdown')
+        parser.add_argument('--format', choices=('auto', 'jsonl', 'markdown'), default='auto')
+        parser.add_argument('--batch-size', type=int, default=500, help='Записей в одной транзакции')
+        parser.add_argument('--media-workers', type=int, default=4, help='Потоков для копирования медиа')
+        parser.add_argument('--media-root', help='Откуда брать media_file из JSONL (по умолчанию — каталог файла)')
+        parser.add_argument(
+            '--status', choices=QAStatus.values, default=QAStatus.DRAFT,
+            help='Статус вопросов, у которых он не указан',
+        )
+
+    def handle(self, *args, **opts):
+        source = Path(opts['source'])
+        if not source.exists():
+            raise CommandError(f'Не найден источник: {source}')
+        if opts['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+
+        importer = GuideImporter(
+            batch_size=opts['batch_size'],
+            media_workers=max(opts['media_workers'], 1),
+            default_status=opts['status'],
+            progress=self._progress if opts['verbosity'] >= 1 else None,
+        )
+        records = iter_source(
+            source, opts['format'], Path(opts['media_root']) if opts['media_root'] else None,
+        )
+        stats = importer.run(records)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано за {stats.elapsed:.1f} с: продуктов {stats.products}, '
+            f'подкатегорий {stats.subcategories}, вопросов {stats.qas} ({stats.rate:.0f}/с), '
+            f'блоков {stats.blocks}, медиафайлов {stats.media}'
+        ))
+        if stats.skipped:
+            self.stdout.write(self.style.WARNING(f'Пропущено записей: {stats.skipped}'))
+            for error in stats.errors:
+                self.stdout.write(f'  {error}')
+
+    def _progress(self, stats: ImportStats) -> None:
+        self.stdout.write(
+            f'вопросов {stats.qas} ({stats.rate:.0f}/с), блоков {stats.blocks}, '
+            f'медиа {stats.media}, пропущено {stats.skipped}'
+        )
@@ -0,0 +1,237 @@
+from __future__ import annotations
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connections
+from django.test import AsyncClient, Client
+
+from guide.bench import (
+    BENCH_DIR,
+    BenchRequest,
+    LatencyStats,
+    Sample,
+    bench_environment,
+    bench_staff_user,
+    build_requests,
+    ensure_knowledge_base,
+    parse_scale,
+    perform,
+)
+
+# имена операций смеси -> имена запросов из guide.bench.build_requests
+OPERATIONS = {
+    'home': 'home',
+    'list': 'qa_list',
+    'product': 'product_list',
+    'detail': 'qa_detail',
+    'search': 'search',
+    'edit': 'qa_edit',
+    'add': 'qa_add',
+}
+DEFAULT_MIX = 'detail=50,list=15,home=10,search=15,edit=7,add=3'
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise CommandError(f'Неизвестная операция "{name}", доступны: {", ".join(OPERATIONS)}')
+        try:
+            mix[name] = int(weight or 1)
+        except ValueError:
+            raise CommandError(f'Вес операции должен быть целым: {part}')
+    return {name: w for name, w in mix.items() if w > 0}
+
+
+def classify_error(exc: BaseException) -> str:
+    message = str(exc).lower()
+    if isinstance(exc, OperationalError) and 'locked' in message:
+        return 'db_locked'
+    if 'timeout' in message or 'timed out' in message:
+        return 'timeout'
+    return type(exc).__name__
+
+
+class LoadRun:
+    """Общие для всех воркеров результаты (под блокировкой)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats: dict[str, LatencyStats] = defaultdict(LatencyStats)
+        self.errors: Counter[str] = Counter()
+        self.failed_ops: Counter[str] = Counter()
+
+    def record(self, op: str, sample: Sample | None = None, error: str | None = None) -> None:
+        with self.lock:
+            if sample is not None:
+                self.stats[op].samples.append(sample)
+                if sample.status >= 500:
+                    self.errors[f'http_{sample.status}'] += 1
+            if error is not None:
+                self.errors[error] += 1
+                self.failed_ops[op] += 1
+
+
+class Command(BaseCommand):
+    help = (
+        'Конкурентная нагрузка на приложение внутри процесса (потоки через WSGI-обработчик '
+        'или задачи asyncio через ASGI) по смеси чтений/записей: пропускная способность, '
+        'p50/p95/p99 и ошибки блокировок БД.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', default='1k', help='1k, 10k, 100k или число вопросов')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--mode', choices=('wsgi', 'asgi'), default='wsgi')
+        parser.add_argument('--workers', type=int, default=8, help='Потоков (wsgi) или одновременных задач (asgi)')
+        parser.add_argument('--seconds', type=float, default=10.0)
+        parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Веса операций, по умолчанию {DEFAULT_MIX}')
+        parser.add_argument('--keepdb', action='store_true')
+        parser.add_argument('--output', help='Сохранить результат в JSON')
+
+    def handle(self, *args, **opts):
+        try:
+            qas = parse_scale(opts['scale'])
+        except ValueError:
+            raise CommandError(f'Непонятный масштаб: {opts["scale"]}')
+        mix = parse_mix(opts['mix'])
+        if not mix:
+            raise CommandError('Пустая смесь операций')
+
+        with bench_environment(qas, keepdb=opts['keepdb']):
+            generated = ensure_knowledge_base(qas, opts['seed'])
+            if generated:
+                self.stdout.write(f'Сгенерировано: {generated}')
+            pools: dict[str, list[BenchRequest]] = defaultdict(list)
+            for request in build_requests(opts['seed'], per_view=100):
+                pools[request.name].append(request)
+            staff_user = bench_staff_user()
+            # соединение главного потока держит файл; воркеры открывают свои
+            connections.close_all()
+
+            run = LoadRun()
+            started = time.perf_counter()
+            if opts['mode'] == 'wsgi':
+                self._run_threads(run, pools, mix, staff_user, opts)
+            else:
+                asyncio.run(self._run_tasks(run, pools, mix, staff_user, opts))
+            elapsed = time.perf_counter() - started
+
+        report = self._report(run, elapsed, opts)
+        if opts['output']:
+            path = Path(opts['output'])
+        else:
+            path = BENCH_DIR / 'results' / f'loadtest-{qas}-{opts["mode"]}-{datetime.now():%Y%m%d-%H%M%S}.json'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(f'Результат: {path}'))
+
+    # --- WSGI: потоки, у каждого свой клиент и своё соединение с БД ---
+    def _run_threads(self, run: LoadRun, pools, mix, staff_user, opts) -> None:
+        deadline = time.perf_counter() + opts['seconds']
+
+        def worker(index: int) -> None:
+            rng = random.Random(opts['seed'] + index)
+            anonymous, staff = Client(), Client()
+            staff.force_login(staff_user)
+            try:
+                while time.perf_counter() < deadline:
+                    op = rng.choices(list(mix), weights=list(mix.values()))[0]
+                    request = rng.choice(pools[OPERATIONS[op]])
+                    try:
+                        run.record(op, perform(staff if request.staff else anonymous, request))
+                    except Exception as exc:
+                        run.record(op, error=classify_error(exc))
+                        close_old_connections()
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(opts['workers'])]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    # --- ASGI: задачи в одном цикле событий, как в воркере uvicorn ---
+    async def _run_tasks(self, run: LoadRun, pools, mix, staff_user, opts) -> None:
+        deadline = time.perf_counter() + opts['seconds']
+        staff_cookies = Client()
+        await asyncio.to_thread(staff_cookies.force_login, staff_user)
+
+        async def worker(index: int) -> None:
+            rng = random.Random(opts['seed'] + index)
+            anonymous, staff = AsyncClient(), AsyncClient()
+            staff.cookies = staff_cookies.cookies
+            while time.perf_counter() < deadline:
+                op = rng.choices(list(mix), weights=list(mix.values()))[0]
+                request = rng.choice(pools[OPERATIONS[op]])
+                client = staff if request.staff else anonymous
+                began = time.perf_counter()
+                try:
+                    if request.method == 'POST':
+                        response = await client.post(request.path, request.data)
+                    else:
+                        response = await client.get(request.path)
+                except Exception as exc:
+                    run.record(op, error=classify_error(exc))
+                    continue
+                run.record(op, Sample(time.perf_counter() - began, 0, response.status_code))
+
+        await asyncio.gather(*(worker(i) for i in range(opts['workers'])))
+
+    def _report(self, run: LoadRun, elapsed: float, opts) -> dict:
+        results = {op: stats.summary() for op, stats in run.stats.items()}
+        total = sum(r['count'] for r in results.values())
+        overall = LatencyStats([s for stats in run.stats.values() for s in stats.samples]).summary()
+
+        self.stdout.write(
+            f'{opts["mode"]}, {opts["workers"]} воркеров, {elapsed:.1f} с, '
+            f'БД: {settings.DATABASES["default"]["ENGINE"].rsplit(".", 1)[-1]}'
+        )
+        self.stdout.write(
+            f'{"операция":<10} {"запросов":>9} {"в сек":>8} {"p50 мс":>9} {"p95 мс":>9} {"p99 мс":>9} {"сбоев":>7}'
+        )
+        for op in sorted(set(results) | set(run.failed_ops)):
+            r = results.get(op) or LatencyStats().summary()
+            self.stdout.write(
+                f'{op:<10} {r["count"]:>9} {r["count"] / elapsed:>8.1f} '
+                f'{r["p50_ms"]:>9.2f} {r["p95_ms"]:>9.2f} {r["p99_ms"]:>9.2f} {run.failed_ops[op]:>7}'
+            )
+        self.stdout.write(
+            f'{"всего":<10} {total:>9} {total / elapsed:>8.1f} '
+            f'{overall["p50_ms"]:>9.2f} {overall["p95_ms"]:>9.2f} {overall["p99_ms"]:>9.2f}'
+        )
+        if run.errors:
+            self.stdout.write(self.style.WARNING(
+                'Ошибки: ' + ', '.join(f'{name}={count}' for name, count in run.errors.most_common())
+            ))
+        else:
+            self.stdout.write('Ошибок нет.')
+
+        return {
+            'meta': {
+                'mode': opts['mode'],
+                'workers': opts['workers'],
+                'seconds': round(elapsed, 3),
+                'mix': parse_mix(opts['mix']),
+                'scale': opts['scale'],
+                'seed': opts['seed'],
+                'db_engine': settings.DATABASES['default']['ENGINE'],
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+            },
+            'throughput_rps': round(total / elapsed, 2) if elapsed else 0.0,
+            'overall': overall,
+            'operations': results,
+            'errors': dict(run.errors),
+            'failed_by_operation': dict(run.failed_ops),
+        }
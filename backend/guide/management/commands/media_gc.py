@@ -0,0 +1,161 @@
+from __future__ import annotations
+import os
+import time
+from pathlib import Path
+from typing import Iterator
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from guide.models import MediaBlob, QABlock
+from guide.routers import pin_primary
+from guide.storage import qa_media_storage
+
+QUARANTINE_DIR = '_quarantine'
+MEDIA_SUBDIR = 'qa'
+
+
+def iter_files(root: Path) -> Iterator[os.DirEntry]:
+    """Ленивый обход дерева через os.scandir (без построения списка всех файлов)."""
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(Path(entry.path))
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry
+        except FileNotFoundError:
+            continue
+
+
+def referenced_media_names(chunk_size: int = 2000) -> set[str]:
+    """
+    Множество используемых путей: блобы — по MediaBlob.ref_count (счётчик меняется в одной
+    транзакции с блоком), прочие файлы (загруженные до дедупликации) — по ссылкам из QABlock.
+    """
+    blobs = MediaBlob.objects.filter(ref_count__gt=0).values_list('name', flat=True)
+    legacy = (
+        QABlock.objects
+        .exclude(Q(media_file__isnull=True) | Q(media_file=''))
+        .exclude(media_file__startswith=f'{qa_media_storage.blob_prefix}/')
+        .values_list('media_file', flat=True)
+    )
+    return {*blobs.iterator(chunk_size=chunk_size), *legacy.iterator(chunk_size=chunk_size)}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сборка мусора в MEDIA_ROOT/qa: файлы без ссылок из QABlock переносятся в карантин, '
+        'а пролежавшие в карантине дольше --retention-days удаляются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Сколько файлов переносить/удалять за один проход')
+        parser.add_argument('--max-files', type=int, default=0, help='Ограничение на число файлов за запуск (0 — без ограничения)')
+        parser.add_argument('--min-age-hours', type=float, default=24, help='Не трогать файлы моложе N часов (незавершённые загрузки)')
+        parser.add_argument('--retention-days', type=float, default=7, help='Сколько дней файл лежит в карантине до удаления')
+        parser.add_argument('--dry-run', action='store_true', help='Только показать, что будет сделано')
+
+    def handle(self, *args, **opts):
+        # ссылки — только из основной БД: реплика может ещё не знать о свежих блоках,
+        # и их файлы ушли бы в карантин, а потом были бы удалены
+        with pin_primary():
+            self._collect(opts)
+
+    def _collect(self, opts) -> None:
+        media_root = Path(settings.MEDIA_ROOT)
+        self.root = media_root / MEDIA_SUBDIR
+        self.quarantine = media_root / QUARANTINE_DIR
+        self.dry_run = opts['dry_run']
+        self.verbosity = opts['verbosity']
+        self.batch_size = max(1, opts['batch_size'])
+
+        referenced = referenced_media_names()
+        self.stdout.write(f'Ссылок на медиа в БД: {len(referenced)}')
+
+        purged, restored = self._purge_quarantine(referenced, opts['retention_days'])
+        quarantined = self._quarantine_orphans(referenced, opts['min_age_hours'], opts['max_files'])
+
+        prefix = '[dry-run] ' if self.dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}В карантин: {quarantined}, удалено: {purged}, восстановлено: {restored}'
+        ))
+
+    # --- этап 1: новые сироты -> карантин ---
+    def _quarantine_orphans(self, referenced: set[str], min_age_hours: float, max_files: int) -> int:
+        if not self.root.is_dir():
+            return 0
+        threshold = time.time() - min_age_hours * 3600
+        total = 0
+        batch: list[str] = []
+        for entry in iter_files(self.root):
+            name = Path(entry.path).relative_to(self.root.parent).as_posix()
+            if name in referenced or entry.stat().st_mtime > threshold:
+                continue
+            batch.append(name)
+            if len(batch) >= self.batch_size:
+                total += self._move_to_quarantine(batch)
+                batch = []
+            if max_files and total + len(batch) >= max_files:
+                break
+        if batch:
+            total += self._move_to_quarantine(batch)
+        return total
+
+    def _move_to_quarantine(self, names: list[str]) -> int:
+        now = time.time()
+        for name in names:
+            if self.verbosity > 1:
+                self.stdout.write(f'  карантин: {name}')
+            if self.dry_run:
+                continue
+            target = self.quarantine / name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(self.root.parent / name, target)
+            # mtime в карантине = время переноса, по нему считаем срок хранения
+            os.utime(target, (now, now))
+        if self.verbosity > 0:
+            self.stdout.write(f'Перенесено в карантин: {len(names)}')
+        return len(names)
+
+    # --- этап 2: карантин -> удаление (или возврат, если файл снова нужен) ---
+    def _purge_quarantine(self, referenced: set[str], retention_days: float) -> tuple[int, int]:
+        if not self.quarantine.is_dir():
+            return 0, 0
+        threshold = time.time() - retention_days * 86400
+        purged = restored = 0
+        batch: list[str] = []
+        for entry in iter_files(self.quarantine):
+            name = Path(entry.path).relative_to(self.quarantine).as_posix()
+            if name in referenced:
+                if not self.dry_run:
+                    target = self.root.parent / name
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(entry.path, target)
+                restored += 1
+                continue
+            if entry.stat().st_mtime > threshold:
+                continue
+            batch.append(name)
+            if len(batch) >= self.batch_size:
+                purged += self._delete_batch(batch)
+                batch = []
+        if batch:
+            purged += self._delete_batch(batch)
+        return purged, restored
+
+    def _delete_batch(self, names: list[str]) -> int:
+        if not self.dry_run:
+            for name in names:
+                try:
+                    os.unlink(self.quarantine / name)
+                except FileNotFoundError:
+                    pass
+            MediaBlob.objects.filter(name__in=names, ref_count=0).delete()
+        if self.verbosity > 0:
+            self.stdout.write(f'Удалено из карантина: {len(names)}')
+        return len(names)
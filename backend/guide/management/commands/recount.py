@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+
+from guide.models import ContentGeneration, GenerationScope, Product, Subcategory
+
+
+def _diverged(qs, actual: dict, *fields: str) -> list[tuple]:
+    """Строки (fields), хранящие значение, отличное от фактического."""
+    cond = Q()
+    for name in actual:
+        cond |= ~Q(**{name: F(f'actual_{name}')})
+    return list(
+        qs.annotate(**{f'actual_{name}': expr for name, expr in actual.items()}).filter(cond).values_list(*fields)
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счётчики (Subcategory.published_qa_count, '
+        'Product.subcategory_count/published_qa_count) по фактическим данным — два UPDATE на всю таблицу.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Только показать, сколько строк разошлось')
+
+    def handle(self, *args, **opts):
+        with transaction.atomic():
+            # фактические счётчики продуктов считаются по вопросам, а не по счётчикам подкатегорий,
+            # поэтому --dry-run сравнивает их с теми же значениями, что записал бы пересчёт
+            subs = _diverged(Subcategory.objects.all(), Subcategory.objects.actual_counts(), 'pk', 'product_id')
+            if subs and not opts['dry_run']:
+                Subcategory.objects.recount()
+            products = _diverged(Product.objects.all(), Product.objects.actual_counts(), 'pk')
+            if products and not opts['dry_run']:
+                Product.objects.recount()
+            if (subs or products) and not opts['dry_run']:
+                # счётчики выводятся в карточках продуктов и подкатегорий: закэшированные страницы устарели
+                ContentGeneration.objects.bump_many([
+                    *((GenerationScope.SUBCATEGORY, pk) for pk, _ in subs),
+                    *((GenerationScope.PRODUCT, pk) for pk in {product_id for _, product_id in subs}),
+                    *((GenerationScope.PRODUCT, pk) for pk, in products),
+                    (GenerationScope.NAV, 0),
+                ])
+
+        verb = 'Разошлось' if opts['dry_run'] else 'Исправлено'
+        self.stdout.write(self.style.SUCCESS(f'{verb}: подкатегорий {len(subs)}, продуктов {len(products)}'))
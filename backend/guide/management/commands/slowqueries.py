@@ -0,0 +1,68 @@
+from __future__ import annotations
+import json
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from guide.slow_queries import normalize_sql
+
+
+class Command(BaseCommand):
+    help = 'Отчёт по журналу медленных запросов: группировка по нормализованному SQL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=settings.GUIDE_SLOW_QUERY_LOG)
+        parser.add_argument('--limit', type=int, default=15, help='Сколько групп показать')
+        parser.add_argument('--sort', choices=('total', 'count', 'max'), default='total')
+        parser.add_argument('--since', help='Только записи не старше даты ISO (2026-10-01 или 2026-10-01T12:00)')
+        parser.add_argument('--no-plan', action='store_true', help='Не печатать план самого медленного запроса')
+
+    def handle(self, *args, **opts):
+        path = Path(opts['file'])
+        if not path.exists():
+            raise CommandError(f'Журнал не найден: {path} (включите GUIDE_SLOW_QUERY_MS > 0)')
+
+        groups: dict[str, dict] = defaultdict(lambda: {'count': 0, 'total': 0.0, 'worst': None, 'callers': Counter()})
+        with path.open(encoding='utf-8') as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if opts['since'] and entry.get('ts', '') < opts['since']:
+                    continue
+                group = groups[normalize_sql(entry['sql'])]
+                group['count'] += 1
+                group['total'] += entry['ms']
+                group['callers'][entry.get('caller') or '?'] += 1
+                if group['worst'] is None or entry['ms'] > group['worst']['ms']:
+                    group['worst'] = entry
+
+        if not groups:
+            self.stdout.write('Медленных запросов нет.')
+            return
+
+        sort_key = {
+            'total': lambda item: item[1]['total'],
+            'count': lambda item: item[1]['count'],
+            'max': lambda item: item[1]['worst']['ms'],
+        }[opts['sort']]
+        ranked = sorted(groups.items(), key=sort_key, reverse=True)[:opts['limit']]
+
+        for n, (sql, group) in enumerate(ranked, 1):
+            worst = group['worst']
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'#{n}  count={group["count"]}  total={group["total"]:.0f}ms  '
+                f'avg={group["total"] / group["count"]:.1f}ms  max={worst["ms"]:.1f}ms'
+            ))
+            self.stdout.write(f'  {sql}')
+            for caller, count in group['callers'].most_common(3):
+                self.stdout.write(f'  ← {caller} ({count})')
+            if not opts['no_plan'] and worst.get('plan'):
+                plan = worst['plan'] if isinstance(worst['plan'], list) else [worst['plan']]
+                self.stdout.write(f'  params: {worst.get("params")}')
+                for row in plan:
+                    self.stdout.write(f'    {row}')
+            self.stdout.write('')
@@ -0,0 +1,43 @@
+from __future__ import annotations
+import os
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from guide.routers import PRIMARY, replica_aliases
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную SQLite-БД в файлы реплик (DJANGO_DB_REPLICAS) через backup API — '
+        'для локальной проверки маршрутизации чтений.'
+    )
+
+    def handle(self, *args, **opts):
+        primary = connections[PRIMARY].settings_dict
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('sync_replicas работает только с SQLite; реплики других СУБД настраиваются репликацией.')
+
+        aliases = replica_aliases()
+        if not aliases:
+            raise CommandError('Реплики не настроены: задайте DJANGO_DB_REPLICAS=/path/r1.sqlite3,...')
+
+        source = sqlite3.connect(str(primary['NAME']))
+        try:
+            for alias in aliases:
+                target_name = str(connections[alias].settings_dict['NAME'])
+                connections[alias].close()
+                # пишем во временный файл и подменяем атомарно, чтобы читатели не видели полкопии
+                tmp_name = f'{target_name}.tmp'
+                target = sqlite3.connect(tmp_name)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                os.replace(tmp_name, target_name)
+                self.stdout.write(f'{alias}: {target_name}')
+        finally:
+            source.close()
+
+        self.stdout.write(self.style.SUCCESS(f'Синхронизировано реплик: {len(aliases)}'))
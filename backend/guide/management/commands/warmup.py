@@ -0,0 +1,14 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from guide.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = 'Выполняет прогрев воркера (как при старте ASGI/WSGI) и печатает время каждого шага.'
+
+    def handle(self, *args, **opts):
+        report = warm_up(started=time.perf_counter())
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
@@ -0,0 +1,238 @@
+"""
+Минимальный реестр метрик в формате Prometheus.
+
+Каждый процесс (воркер gunicorn/uvicorn) копит значения в памяти, а фоновый поток
+раз в GUIDE_METRICS_FLUSH_SECONDS сбрасывает их в свой файл metrics-<pid>-<boot id>.json
+в GUIDE_METRICS_DIR (случайный boot id: переиспользованный PID не подхватит чужие счётчики).
+Эндпоинт /metrics суммирует файлы живых процессов: свой файл процесс удаляет при выходе,
+а файл, который давно не обновлялся (воркер убит), пропускается и удаляется.
+"""
+from __future__ import annotations
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from uuid import uuid4
+
+from django.conf import settings
+
+# файл старше max(STALE_MIN_SECONDS, STALE_FLUSHES сбросов) считается файлом умершего процесса
+STALE_MIN_SECONDS = 30.0
+STALE_FLUSHES = 10
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+LabelsKey = tuple[tuple[str, str], ...]
+
+
+def _labels_key(labels: dict[str, str]) -> LabelsKey:
+    # в памяти — кортеж пар (дёшево на каждом запросе), в JSON-строку ключ превращается только при сбросе
+    return tuple(sorted(labels.items()))
+
+
+def _encode_key(key: LabelsKey) -> str:
+    return json.dumps(dict(key), sort_keys=True, ensure_ascii=False)
+
+
+class Metric:
+    kind = ''
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.values: dict[LabelsKey, object] = {}
+        # своя блокировка у каждой метрики: счётчики разных метрик не ждут друг друга
+        self.lock = threading.Lock()
+
+    def snapshot(self) -> dict[str, object]:
+        with self.lock:
+            items = [(key, list(value) if isinstance(value, list) else value) for key, value in self.values.items()]
+        return {_encode_key(key): value for key, value in items}
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = _labels_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+        REGISTRY.ensure_flusher()
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = buckets
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _labels_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            # [счётчики по корзинам (+Inf последней)..., сумма, количество]
+            data = self.values.get(key)
+            if data is None:
+                data = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            data[index] += 1
+            data[-2] += value
+            data[-1] += 1
+        REGISTRY.ensure_flusher()
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+        self.lock = threading.Lock()
+        self._boot_id: str | None = None
+        self._stop = threading.Event()
+        self._flusher: threading.Thread | None = None
+        atexit.register(self.close)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    # --- сброс на диск (агрегация между процессами) ---
+    @staticmethod
+    def directory() -> Path:
+        return Path(settings.GUIDE_METRICS_DIR)
+
+    def path(self) -> Path:
+        return self.directory() / f'metrics-{self._boot_id}.json'
+
+    def ensure_flusher(self) -> None:
+        """Запускает фоновый сброс при первом обновлении метрик в процессе (запрос на диск не ждёт)."""
+        if self._boot_id is not None:
+            return
+        with self.lock:
+            if self._boot_id is not None:
+                return
+            self._boot_id = f'{os.getpid()}-{uuid4().hex[:12]}'
+            self._stop = threading.Event()
+            self._flusher = threading.Thread(
+                target=self._flush_loop, args=(self._stop,), name='guide-metrics-flush', daemon=True,
+            )
+            self._flusher.start()
+
+    def _flush_loop(self, stop: threading.Event) -> None:
+        while not stop.wait(settings.GUIDE_METRICS_FLUSH_SECONDS):
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def _after_fork(self) -> None:
+        # дочерний процесс не наследует значения, файл и поток родителя
+        self.lock = threading.Lock()
+        self._boot_id = None
+        self._flusher = None
+        for metric in self.metrics.values():
+            metric.lock = threading.Lock()
+            metric.values.clear()
+
+    def close(self) -> None:
+        """Остановка сброса и удаление своего файла (atexit): мёртвый воркер не попадёт в сумму."""
+        with self.lock:
+            boot_id, flusher = self._boot_id, self._flusher
+            self._stop.set()
+            self._boot_id = self._flusher = None
+        if flusher is not None and flusher is not threading.current_thread():
+            flusher.join(timeout=1.0)
+        if boot_id is not None:
+            (self.directory() / f'metrics-{boot_id}.json').unlink(missing_ok=True)
+
+    def flush(self) -> None:
+        self.ensure_flusher()
+        with self.lock:
+            target = self.path()
+        snapshot = {name: metric.snapshot() for name, metric in self.metrics.items()}
+        directory = self.directory()
+        directory.mkdir(parents=True, exist_ok=True)
+        tmp = directory / f'{target.stem}.{threading.get_ident()}.tmp'
+        tmp.write_text(json.dumps(snapshot), encoding='utf-8')
+        os.replace(tmp, target)
+
+    def collect(self) -> dict[str, dict[str, object]]:
+        """Сумма по живым процессам (включая текущий — он сбрасывается перед чтением)."""
+        self.flush()
+        stale_before = time.time() - max(STALE_MIN_SECONDS, STALE_FLUSHES * settings.GUIDE_METRICS_FLUSH_SECONDS)
+        merged: dict[str, dict[str, object]] = {name: {} for name in self.metrics}
+        for path in self.directory().glob('metrics-*.json'):
+            try:
+                if path.stat().st_mtime < stale_before:
+                    path.unlink(missing_ok=True)
+                    continue
+                data = json.loads(path.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                continue
+            for name, values in data.items():
+                if name not in merged:
+                    continue
+                target = merged[name]
+                for key, value in values.items():
+                    if isinstance(value, list):
+                        prev = target.get(key)
+                        target[key] = value if prev is None else [a + b for a, b in zip(prev, value)]
+                    else:
+                        target[key] = target.get(key, 0.0) + value
+        return merged
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for name, values in self.collect().items():
+            metric = self.metrics[name]
+            lines.append(f'# HELP {name} {metric.help_text}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for key, value in sorted(values.items()):
+                labels = json.loads(key)
+                if isinstance(metric, Histogram):
+                    cumulative = 0
+                    bounds = [*(repr(b) for b in metric.buckets), '+Inf']
+                    for bound, count in zip(bounds, value[:-2]):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{_format_labels({**labels, "le": bound})} {cumulative}')
+                    lines.append(f'{name}_sum{_format_labels(labels)} {value[-2]}')
+                    lines.append(f'{name}_count{_format_labels(labels)} {value[-1]}')
+                else:
+                    lines.append(f'{name}{_format_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ''
+    parts = []
+    for k, v in labels.items():
+        escaped = str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{k}="{escaped}"')
+    return '{' + ','.join(parts) + '}'
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    'giguide_request_duration_seconds', 'Время обработки запроса по имени маршрута',
+))
+REQUESTS = REGISTRY.register(Counter(
+    'giguide_requests_total', 'Количество запросов по имени маршрута и коду ответа',
+))
+DB_QUERIES = REGISTRY.register(Counter(
+    'giguide_db_queries_total', 'Количество SQL-запросов по имени маршрута',
+))
+DB_SECONDS = REGISTRY.register(Counter(
+    'giguide_db_query_seconds_total', 'Суммарное время SQL-запросов по имени маршрута',
+))
+MARKDOWN_RENDERS = REGISTRY.register(Counter(
+    'giguide_markdown_renders_total', 'Количество рендеров Markdown',
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    'giguide_cache_requests_total', 'Обращения к двухуровневому кэшу (result: local/shared/miss/stale)',
+))
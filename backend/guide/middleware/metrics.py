@@ -0,0 +1,51 @@
+from __future__ import annotations
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from guide.metrics import DB_QUERIES, DB_SECONDS, REQUEST_LATENCY, REQUESTS
+from guide.middleware.queries import current_query_stats
+
+
+class MetricsMiddleware:
+    """
+    Латентность и число запросов к БД по имени маршрута в реестр guide.metrics.
+    Должен стоять ПОСЛЕ QueryCountMiddleware (берёт из него счётчики БД).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.GUIDE_METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self._record(request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def _record(request, response, duration: float) -> None:
+        match = getattr(request, 'resolver_match', None)
+        # имя маршрута, а не путь: иначе метки разрастаются на каждый вопрос
+        view = match.view_name if match else 'unmatched'
+        REQUEST_LATENCY.observe(duration, view=view)
+        REQUESTS.inc(view=view, status=str(response.status_code))
+        stats = current_query_stats()
+        if stats is not None:
+            DB_QUERIES.inc(stats.count, view=view)
+            DB_SECONDS.inc(stats.duration, view=view)
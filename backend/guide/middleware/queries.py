@@ -0,0 +1,119 @@
+from __future__ import annotations
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('guide.queries')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Вьюха сделала больше запросов, чем разрешено в GUIDE_QUERY_BUDGETS."""
+
+
+@dataclass(slots=True)
+class QueryStats:
+    count: int = 0
+    duration: float = 0.0  # секунды
+
+
+# Статистика текущего запроса; ContextVar переживает sync_to_async, поэтому
+# считаются и запросы async-вьюх, выполненные в потоках.
+_current_stats: ContextVar[QueryStats | None] = ContextVar('guide_query_stats', default=None)
+
+
+def current_query_stats() -> QueryStats | None:
+    return _current_stats.get()
+
+
+def _count_query(execute, sql, params, many, context):
+    stats = _current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.count += 1
+        stats.duration += time.perf_counter() - started
+
+
+def install_query_counter(connection) -> None:
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    install_query_counter(connection)
+
+
+connection_created.connect(_on_connection_created, dispatch_uid='guide-query-counter')
+
+
+class QueryCountMiddleware:
+    """
+    Считает запросы к БД и их суммарное время на каждый HTTP-запрос.
+    Превышение бюджета вьюхи (GUIDE_QUERY_BUDGETS, по имени маршрута) пишется в лог,
+    а при GUIDE_QUERY_BUDGET_STRICT=True (в тестах) — роняет запрос.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        for conn in connections.all(initialized_only=True):
+            install_query_counter(conn)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        self._check(request, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        self._check(request, stats)
+        return response
+
+    @staticmethod
+    def _check(request, stats: QueryStats) -> None:
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else request.path
+        budget = settings.GUIDE_QUERY_BUDGETS.get(view_name)
+
+        if budget is not None and stats.count > budget:
+            message = (
+                f'query budget exceeded: {view_name} {request.path} '
+                f'queries={stats.count} budget={budget} db_ms={stats.duration * 1000:.1f}'
+            )
+            if settings.GUIDE_QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        elif stats.count > settings.GUIDE_QUERY_LOG_THRESHOLD:
+            logger.warning(
+                'many queries: %s %s queries=%d db_ms=%.1f',
+                view_name, request.path, stats.count, stats.duration * 1000,
+            )
+        else:
+            logger.debug(
+                'queries: %s %s queries=%d db_ms=%.1f',
+                view_name, request.path, stats.count, stats.duration * 1000,
+            )
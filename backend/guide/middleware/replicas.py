@@ -0,0 +1,53 @@
+from __future__ import annotations
+from contextlib import nullcontext
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from guide.routers import pin_primary
+
+STICKY_COOKIE = 'giguide_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class PrimaryStickinessMiddleware:
+    """
+    Read-your-writes: после изменяющего запроса редактор ещё DB_REPLICA_STICKY_SECONDS
+    читает из основной БД (по cookie), пока реплики не догонят.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with self._pin(request):
+            response = self.get_response(request)
+        return self._mark(request, response)
+
+    async def __acall__(self, request):
+        with self._pin(request):
+            response = await self.get_response(request)
+        return self._mark(request, response)
+
+    @staticmethod
+    def _pin(request):
+        if request.method not in SAFE_METHODS or STICKY_COOKIE in request.COOKIES:
+            return pin_primary()
+        return nullcontext()
+
+    @staticmethod
+    def _mark(request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                STICKY_COOKIE, '1',
+                max_age=settings.DB_REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
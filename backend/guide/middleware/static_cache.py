@@ -0,0 +1,27 @@
+from __future__ import annotations
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from django.utils.deprecation import MiddlewareMixin
+
+# style.3f2a9c1b7e4d.css — имя с хэшем от ManifestStaticFilesStorage
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[\w.]+$')
+
+
+class StaticCacheControlMiddleware(MiddlewareMixin):
+    """
+    Неизменяемые ресурсы (статика с хэшем в имени и медиа-блобы по sha256)
+    отдаём с кэшированием на год: повторные просмотры не делают запросов за ними.
+    """
+
+    def process_response(self, request, response):
+        if response.status_code == 200 and self._is_immutable(request.path):
+            patch_cache_control(response, public=True, max_age=settings.STATIC_MAX_AGE, immutable=True)
+        return response
+
+    @staticmethod
+    def _is_immutable(path: str) -> bool:
+        if path.startswith(f'{settings.MEDIA_URL}qa/blobs/'):
+            return True
+        return path.startswith(settings.STATIC_URL) and bool(HASHED_NAME_RE.search(path))
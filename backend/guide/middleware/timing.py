@@ -0,0 +1,76 @@
+from __future__ import annotations
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from guide.middleware.queries import current_query_stats
+from guide.utils.timing import Timings, collect_timings
+
+logger = logging.getLogger('guide.timing')
+
+
+class ServerTimingMiddleware:
+    """
+    Разбивка времени запроса: БД (из QueryCountMiddleware), общий кэш, шаблоны, Markdown, селекторы;
+    app — всё время запроса, кроме БД. Отдаётся заголовком Server-Timing и строкой JSON в лог guide.timing.
+    Должен стоять ПОСЛЕ QueryCountMiddleware, чтобы видеть счётчики БД текущего запроса.
+    Выключен (GUIDE_SERVER_TIMING=False) — удаляется из цепочки целиком.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.GUIDE_SERVER_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with collect_timings() as timings:
+            response = self.get_response(request)
+        return self._emit(request, response, timings, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with collect_timings() as timings:
+            response = await self.get_response(request)
+        return self._emit(request, response, timings, time.perf_counter() - started)
+
+    @staticmethod
+    def _emit(request, response, timings: Timings, total: float):
+        sections = {name: (dur, calls) for name, (dur, calls) in timings.sections.items()}
+        stats = current_query_stats()
+        if stats is not None:
+            sections['db'] = (stats.duration, stats.count)
+        app = max(total - (stats.duration if stats is not None else 0.0), 0.0)
+
+        header = [
+            f'{name};dur={dur * 1000:.1f};desc="{calls}x"'
+            for name, (dur, calls) in sections.items()
+        ]
+        header.append(f'app;dur={app * 1000:.1f}')
+        header.append(f'total;dur={total * 1000:.1f}')
+        response.headers['Server-Timing'] = ', '.join(header)
+
+        match = getattr(request, 'resolver_match', None)
+        logger.info(json.dumps({
+            'event': 'timing',
+            'view': match.view_name if match else None,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'app_ms': round(app * 1000, 2),
+            'sections': {
+                name: {'ms': round(dur * 1000, 2), 'calls': calls}
+                for name, (dur, calls) in sections.items()
+            },
+        }, ensure_ascii=False))
+        return response
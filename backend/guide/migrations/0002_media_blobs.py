@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:00
+
+import guide.models
+import guide.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guide', '0001_init_guide_schema'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(db_index=True, max_length=64)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('ref_count', models.PositiveIntegerField(db_index=True, default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='qablock',
+            name='media_file',
+            field=models.FileField(blank=True, help_text='Загруженный файл (изображение/GIF/видео)', null=True, storage=guide.storage.get_qa_media_storage, upload_to=guide.models.qa_media_upload_to),
+        ),
+    ]
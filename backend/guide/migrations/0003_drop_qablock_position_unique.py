@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Расхождение модели и схемы, унаследованное от 0001: в QABlock.Meta уникальность (qa, position)
+    давно закомментирована — позиции сдвигаются UPDATE position = position ± 1 (BaseModel)
+    и временно совпадают, — а ограничение в схеме оставалось. Убираем его и из схемы.
+    """
+
+    dependencies = [
+        ('guide', '0002_media_blobs'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='qablock',
+            name='uq_qablock_qa_position',
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guide', '0003_drop_qablock_position_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentGeneration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('global', 'Весь портал'), ('product', 'Продукт'), ('subcategory', 'Подкатегория'), ('qa', 'Вопрос'), ('nav', 'Навигация')], max_length=16)),
+                ('key', models.BigIntegerField(default=0)),
+                ('value', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('scope', 'key'), name='uq_content_generation_scope_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guide', '0004_content_generations'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='qaitem',
+            name='status',
+            field=models.CharField(choices=[('draft', 'Черновик'), ('published', 'Опубликовано'), ('archived', 'Архив')], default='draft', max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name='navlink',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['position', 'id'], name='idx_navlink_active_pos'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['position', 'id'], name='idx_products_active_pos'),
+        ),
+        migrations.AddIndex(
+            model_name='qaitem',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['subcategory', 'position', 'id'], name='idx_qaitems_active_subcat_pos'),
+        ),
+        migrations.AddIndex(
+            model_name='qaitem',
+            index=models.Index(condition=models.Q(('is_active', True), ('status', 'published')), fields=['subcategory', 'position', 'id'], name='idx_qaitems_pub_subcat_pos'),
+        ),
+        migrations.AddIndex(
+            model_name='qaitem',
+            index=models.Index(condition=models.Q(('is_active', True), ('status', 'published')), fields=['position', 'id'], name='idx_qaitems_pub_pos'),
+        ),
+        migrations.AddIndex(
+            model_name='subcategory',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['product', 'position', 'id'], name='idx_subcats_active_prod_pos'),
+        ),
+    ]
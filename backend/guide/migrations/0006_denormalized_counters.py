@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:40
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Product = apps.get_model('guide', 'Product')
+    Subcategory = apps.get_model('guide', 'Subcategory')
+    QAItem = apps.get_model('guide', 'QAItem')
+
+    def scalar(qs, group_by, aggregate):
+        sub = qs.order_by().values(group_by).annotate(v=aggregate).values('v')
+        return Coalesce(Subquery(sub, output_field=IntegerField()), 0)
+
+    Subcategory.objects.update(published_qa_count=scalar(
+        QAItem.objects.filter(subcategory=OuterRef('pk'), is_active=True, status='published'),
+        'subcategory', Count('pk'),
+    ))
+    active_subs = Subcategory.objects.filter(product=OuterRef('pk'), is_active=True)
+    Product.objects.update(
+        subcategory_count=scalar(active_subs, 'product', Count('pk')),
+        published_qa_count=scalar(active_subs, 'product', Sum('published_qa_count')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guide', '0005_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='published_qa_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='subcategory_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='subcategory',
+            name='published_qa_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
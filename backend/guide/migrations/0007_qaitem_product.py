@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_product(apps, schema_editor):
+    QAItem = apps.get_model('guide', 'QAItem')
+    Subcategory = apps.get_model('guide', 'Subcategory')
+    QAItem.objects.update(product_id=Subquery(
+        Subcategory.objects.filter(pk=OuterRef('subcategory_id')).values('product_id')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guide', '0006_denormalized_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='qaitem',
+            name='product',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='qa_items', to='guide.product'),
+        ),
+        migrations.RunPython(fill_product, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='qaitem',
+            name='product',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='qa_items', to='guide.product'),
+        ),
+    ]
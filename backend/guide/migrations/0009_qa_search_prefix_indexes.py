@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:40
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('guide', '0008_qarevision'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='qablock',
+            index=models.Index(django.db.models.functions.comparison.Collate('heading_text', 'NOCASE'), name='idx_qablocks_heading_nocase'),
+        ),
+        migrations.AddIndex(
+            model_name='qaitem',
+            index=models.Index(django.db.models.functions.comparison.Collate('question', 'NOCASE'), name='idx_qaitems_question_nocase'),
+        ),
+    ]
@@ -1,12 +1,18 @@
-from uuid import uuid4
+import secrets
+from collections import defaultdict
 from pathlib import Path
 
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import models, transaction
-from django.db.models import F, Q
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Collate, Greatest
+from django.utils import timezone
 from django.utils.text import slugify
 
 from giguide.variables import ModelConfig
+from guide import revisions
+from guide.storage import get_qa_media_storage, qa_media_storage
 
 
 class BaseModel(models.Model):
@@ -16,6 +22,9 @@ class BaseModel(models.Model):
     position = models.PositiveIntegerField(default=1, help_text='Порядок отображения')
     is_active = models.BooleanField(default=True, help_text='Активен ли объект')
 
+    # Денормализованные счётчики: меняются только F()-обновлениями, обычный save() их не перезаписывает
+    counter_fields: tuple[str, ...] = ()
+
     class Meta:
         abstract = True
         ordering = ['position', 'id']
@@ -29,6 +38,17 @@ class BaseModel(models.Model):
         """
         return {}
 
+    # === ПОКОЛЕНИЯ КОНТЕНТА ===
+    def content_scopes(self) -> list[tuple[str, int]]:
+        """
+        Области (scope, id), чьё «поколение контента» меняется вместе с объектом.
+        Глобальное поколение увеличивается всегда, его сюда добавлять не нужно.
+        """
+        return []
+
+    def bump_content_generation(self) -> None:
+        ContentGeneration.objects.bump(self.content_scopes())
+
     # === ОСНОВНАЯ ЛОГИКА ПОЗИЦИЙ (вставка/перемещение) ===
     def _ensure_position_on_create(self):
         scope = self.position_scope_filter()
@@ -43,6 +63,8 @@ class BaseModel(models.Model):
             self.__class__.objects.select_for_update().filter(
                 Q(**scope) & Q(position__gte=self.position)
             ).update(position=F('position') + 1)
+            # update() не шлёт сигналов — поколение соседей поднимаем сами
+            self.bump_content_generation()
 
     def _ensure_position_on_update(self, old_position: int):
         """Пересчёт при изменении позиции существующей записи."""
@@ -71,6 +93,7 @@ class BaseModel(models.Model):
                 ).update(position=F('position') + 1)
 
             self.position = new_position
+            self.bump_content_generation()
 
     def save(self, *args, **kwargs):
         is_create = self._state.adding
@@ -82,16 +105,193 @@ class BaseModel(models.Model):
         old = self.__class__.objects.only('position').get(pk=self.pk)
         if old.position != (self.position or 1):
             self._ensure_position_on_update(old.position)
+        if self.counter_fields and kwargs.get('update_fields') is None:
+            # иначе устаревшее значение счётчика из памяти затрёт параллельные +1/-1
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.counter_fields
+            ]
         return super().save(*args, **kwargs)
 
 
+def _shifted(field: str, delta: int):
+    """F(field) + delta, но не ниже нуля (до `recount` счётчик мог разойтись с данными)."""
+    return Greatest(F(field) + delta, Value(0))
+
+
+def _scalar(qs, group_by: str, aggregate):
+    """Коррелированный подзапрос «агрегат по родителю», 0 если строк нет."""
+    return Coalesce(
+        Subquery(qs.order_by().values(group_by).annotate(v=aggregate).values('v'), output_field=IntegerField()),
+        0,
+    )
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class GenerationScope(models.TextChoices):
+    GLOBAL = 'global', 'Весь портал'
+    PRODUCT = 'product', 'Продукт'
+    SUBCATEGORY = 'subcategory', 'Подкатегория'
+    QA = 'qa', 'Вопрос'
+    NAV = 'nav', 'Навигация'
+
+
+# Ключ строки эпохи БД в области GLOBAL (у счётчика GLOBAL ключ 0; bump() её не трогает)
+EPOCH_KEY = -1
+
+
+class ContentGenerationManager(models.Manager):
+    def bump(self, scopes: list[tuple[str, int]]) -> None:
+        """
+        +1 к поколению каждой области и к глобальному.
+        Выполняется в текущей транзакции: откат изменения откатывает и счётчики.
+        """
+        for scope, key in [(GenerationScope.GLOBAL, 0), *dict.fromkeys(scopes)]:
+            if key is None:
+                continue
+            updated = self.filter(scope=scope, key=key).update(value=F('value') + 1)
+            if not updated:
+                try:
+                    with transaction.atomic():
+                        self.create(scope=scope, key=key, value=1)
+                except IntegrityError:
+                    self.filter(scope=scope, key=key).update(value=F('value') + 1)
+
+    def bump_many(self, scopes: list[tuple[str, int]], chunk_size: int = 500) -> None:
+        """
+        bump() для массовых изменений: по одному UPDATE ... WHERE key IN (...) на тип области
+        (и пачку ключей) плюс INSERT недостающих строк — вместо пары запросов на каждую область.
+        """
+        keys_by_scope: dict[str, set[int]] = defaultdict(set)
+        keys_by_scope[GenerationScope.GLOBAL].add(0)
+        for scope, key in scopes:
+            if key is not None:
+                keys_by_scope[scope].add(key)
+        for scope, keys in keys_by_scope.items():
+            for chunk in _chunks(sorted(keys), chunk_size):
+                self.filter(scope=scope, key__in=chunk).update(value=F('value') + 1)
+                existing = set(self.filter(scope=scope, key__in=chunk).values_list('key', flat=True))
+                self.bulk_create(
+                    [ContentGeneration(scope=scope, key=key, value=1) for key in chunk if key not in existing],
+                    ignore_conflicts=True,
+                )
+
+    def epoch(self) -> int:
+        """
+        Случайный идентификатор экземпляра БД (строка GLOBAL с ключом EPOCH_KEY): счётчики
+        пересозданной БД начинаются заново, а эпоха — другая, поэтому старые ключи кэша не совпадут.
+        """
+        value = self.current(GenerationScope.GLOBAL, EPOCH_KEY)
+        if value:
+            return value
+        value = secrets.randbits(62) or 1
+        try:
+            with transaction.atomic():
+                self.create(scope=GenerationScope.GLOBAL, key=EPOCH_KEY, value=value)
+        except IntegrityError:
+            return self.current(GenerationScope.GLOBAL, EPOCH_KEY)
+        return value
+
+    def current(self, scope: str, key: int = 0) -> int:
+        """Текущее поколение области — одно чтение по уникальному индексу."""
+        return self.filter(scope=scope, key=key).values_list('value', flat=True).first() or 0
+
+    def current_many(self, scopes: list[tuple[str, int]]) -> dict[tuple[str, int], int]:
+        if not scopes:
+            return {}
+        cond = Q()
+        for scope, key in scopes:
+            cond |= Q(scope=scope, key=key)
+        found = {(s, k): v for s, k, v in self.filter(cond).values_list('scope', 'key', 'value')}
+        return {pair: found.get(pair, 0) for pair in scopes}
+
+
+class ContentGeneration(models.Model):
+    """
+    Монотонный счётчик изменений контента по области.
+    Кэши и предрасчитанные артефакты сверяют с ним свою версию вместо TTL.
+    """
+    scope = models.CharField(max_length=ModelConfig.MAX_LENGTH_SCOPE, choices=GenerationScope.choices)
+    key = models.BigIntegerField(default=0)
+    value = models.PositiveBigIntegerField(default=0)
+
+    objects = ContentGenerationManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='uq_content_generation_scope_key'),
+        ]
+
+    def __str__(self):
+        return f'{self.scope}:{self.key} = {self.value}'
+
+
+class ProductManager(models.Manager):
+    def shift_counters(self, product_id: int | None, *, subcategories: int = 0, published_qas: int = 0) -> None:
+        """Атомарно сдвигает счётчики продукта (одним UPDATE ... SET x = x + delta)."""
+        changes = {}
+        if subcategories:
+            changes['subcategory_count'] = _shifted('subcategory_count', subcategories)
+        if published_qas:
+            changes['published_qa_count'] = _shifted('published_qa_count', published_qas)
+        if product_id is not None and changes:
+            self.filter(pk=product_id).update(**changes)
+
+    def actual_counts(self) -> dict:
+        """
+        Фактические значения счётчиков — по самим вопросам активных подкатегорий,
+        а не по их (возможно, ещё не пересчитанным) published_qa_count.
+        """
+        return {
+            'subcategory_count': _scalar(
+                Subcategory.objects.filter(product=OuterRef('pk'), is_active=True), 'product', Count('pk'),
+            ),
+            'published_qa_count': _scalar(
+                QAItem.objects.filter(
+                    subcategory__product=OuterRef('pk'), subcategory__is_active=True,
+                    is_active=True, status=QAStatus.PUBLISHED,
+                ),
+                'subcategory__product', Count('pk'),
+            ),
+        }
+
+    def recount(self, ids=None) -> int:
+        """Пересчёт счётчиков одним UPDATE — всех продуктов или только ids."""
+        qs = self.all() if ids is None else self.filter(pk__in=ids)
+        return qs.update(**self.actual_counts())
+
+
 class Product(BaseModel):
     name = models.CharField(max_length=ModelConfig.MAX_LENGTH_NAME)
     slug = models.SlugField(max_length=ModelConfig.MAX_LENGTH_SLUG)
+    # активные подкатегории и опубликованные вопросы в них (поддерживаются Subcategory/QAItem)
+    subcategory_count = models.PositiveIntegerField(default=0, editable=False)
+    published_qa_count = models.PositiveIntegerField(default=0, editable=False)
+
+    counter_fields = ('subcategory_count', 'published_qa_count')
+
+    objects = ProductManager()
+
+    class Meta(BaseModel.Meta):
+        indexes = [
+            # главная и sitemap: активные продукты по порядку (поиск по slug — индекс SlugField)
+            models.Index(
+                fields=['position', 'id'],
+                name='idx_products_active_pos',
+                condition=Q(is_active=True),
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    def content_scopes(self) -> list[tuple[str, int]]:
+        return [(GenerationScope.PRODUCT, self.pk)]
+
     def save(self, *args, **kwargs):
         if not self.slug:
             base_slug = slugify(self.name)
@@ -104,6 +304,31 @@ class Product(BaseModel):
         super().save(*args, **kwargs)
 
 
+class SubcategoryManager(models.Manager):
+    def shift_published_qas(self, subcategory_id: int | None, delta: int) -> None:
+        """±delta опубликованных вопросов подкатегории и, если она активна, её продукта."""
+        if subcategory_id is None or not delta:
+            return
+        self.filter(pk=subcategory_id).update(published_qa_count=_shifted('published_qa_count', delta))
+        Product.objects.filter(
+            subcategories__pk=subcategory_id,
+            subcategories__is_active=True,
+        ).update(published_qa_count=_shifted('published_qa_count', delta))
+
+    def actual_counts(self) -> dict:
+        return {
+            'published_qa_count': _scalar(
+                QAItem.objects.filter(subcategory=OuterRef('pk'), is_active=True, status=QAStatus.PUBLISHED),
+                'subcategory', Count('pk'),
+            ),
+        }
+
+    def recount(self, ids=None) -> int:
+        """Пересчёт published_qa_count одним UPDATE — всех подкатегорий или только ids."""
+        qs = self.all() if ids is None else self.filter(pk__in=ids)
+        return qs.update(**self.actual_counts())
+
+
 class Subcategory(BaseModel):
     product = models.ForeignKey(
         Product,
@@ -112,6 +337,12 @@ class Subcategory(BaseModel):
     )
     name = models.CharField(max_length=ModelConfig.MAX_LENGTH_NAME)
     slug = models.SlugField(max_length=ModelConfig.MAX_LENGTH_SLUG)
+    # активные опубликованные вопросы (поддерживается QAItem, чинится `manage.py recount`)
+    published_qa_count = models.PositiveIntegerField(default=0, editable=False)
+
+    counter_fields = ('published_qa_count',)
+
+    objects = SubcategoryManager()
 
     class Meta(BaseModel.Meta):
         constraints = [
@@ -120,6 +351,14 @@ class Subcategory(BaseModel):
                 name='uq_subcategory_product_slug',
             ),
         ]
+        indexes = [
+            # подкатегории продукта по порядку: список продукта, карточки, sitemap
+            models.Index(
+                fields=['product', 'position', 'id'],
+                name='idx_subcats_active_prod_pos',
+                condition=Q(is_active=True),
+            ),
+        ]
 
     def __str__(self):
         return f'{self.product.name} / {self.name}'
@@ -133,11 +372,42 @@ class Subcategory(BaseModel):
                 slug = f"{base_slug}-{counter}"
                 counter += 1
             self.slug = slug
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            old = None
+            if not self._state.adding:
+                old = Subcategory.objects.filter(pk=self.pk).values('product_id', 'is_active').first()
+            super().save(*args, **kwargs)
+            if old and old['product_id'] != self.product_id:
+                # перенос в другой продукт: денормализованный QAItem.product_id едет следом
+                qa_ids = list(QAItem.objects.filter(subcategory_id=self.pk).values_list('pk', flat=True))
+                QAItem.objects.filter(pk__in=qa_ids).update(product_id=self.product_id)
+                # новые области поднял post_save; старый продукт и перенесённые вопросы (update() без сигналов) — тут
+                ContentGeneration.objects.bump_many([
+                    (GenerationScope.PRODUCT, old['product_id']),
+                    *((GenerationScope.QA, pk) for pk in qa_ids),
+                ])
+            self._update_product_counters(old)
+
+    def _update_product_counters(self, old: dict | None) -> None:
+        """Переносит подкатегорию и её вопросы в счётчиках продукта при создании/переносе/(де)активации."""
+        old_product = old['product_id'] if old and old['is_active'] else None
+        new_product = self.product_id if self.is_active else None
+        if old_product == new_product:
+            return
+        # свежее значение из БД: в памяти счётчик мог устареть
+        qas = Subcategory.objects.filter(pk=self.pk).values_list('published_qa_count', flat=True).first() or 0
+        Product.objects.shift_counters(old_product, subcategories=-1, published_qas=-qas)
+        Product.objects.shift_counters(new_product, subcategories=1, published_qas=qas)
 
     def position_scope_filter(self) -> dict:
         return {'product': self.product}
 
+    def content_scopes(self) -> list[tuple[str, int]]:
+        return [
+            (GenerationScope.SUBCATEGORY, self.pk),
+            (GenerationScope.PRODUCT, self.product_id),
+        ]
+
 
 class QAStatus(models.TextChoices):
     DRAFT = 'draft', 'Черновик'
@@ -145,34 +415,187 @@ class QAStatus(models.TextChoices):
     ARCHIVED = 'archived', 'Архив'
 
 
+class QAItemManager(models.Manager):
+    """
+    Массовые изменения вопросов (действия админки): один UPDATE на всё выделение,
+    затем один пересчёт затронутых счётчиков и поколений — а не save() и сигналы на каждую строку.
+    Ревизии истории правок — QARevision.objects.record_many() до изменения (исходное состояние
+    вопросов без истории, как в QAUpdateView) и после него, от имени author.
+    """
+    # параметров в одном CASE ... WHEN pk = %s THEN %s (лимит SQLite — 32766)
+    MOVE_CHUNK = 1000
+
+    def bulk_set_status(self, ids, status: str, author=None) -> int:
+        return self._bulk_update(ids, author, status=status)
+
+    def bulk_set_active(self, ids, is_active: bool, author=None) -> int:
+        return self._bulk_update(ids, author, is_active=is_active)
+
+    def _bulk_update(self, ids, author=None, **values) -> int:
+        with transaction.atomic():
+            rows = list(self.filter(pk__in=ids).values_list('pk', 'subcategory_id', 'product_id'))
+            if not rows:
+                return 0
+            pks = [pk for pk, _, _ in rows]
+            QARevision.objects.record_many(pks)
+            # updated_at вручную: update() не трогает auto_now
+            updated = self.filter(pk__in=pks).update(**values, updated_at=timezone.now())
+            self._after_bulk_change(rows, author=author)
+        return updated
+
+    def bulk_move(self, ids, subcategory: 'Subcategory', author=None) -> int:
+        """
+        Переносит вопросы в подкатегорию, в конец её списка с сохранением прежнего порядка:
+        позиции max+1, max+2, ... проставляются одним UPDATE ... SET position = CASE ...
+        """
+        with transaction.atomic():
+            # блокировка хвоста целевой подкатегории, как в BaseModel._ensure_position_on_create
+            last = (
+                self.select_for_update().filter(subcategory=subcategory)
+                .order_by('-position').values_list('position', flat=True).first() or 0
+            )
+            rows = list(
+                self.filter(pk__in=ids).exclude(subcategory=subcategory)
+                .order_by('subcategory__position', 'subcategory_id', 'position', 'id')
+                .values_list('pk', 'subcategory_id', 'product_id')
+            )
+            if not rows:
+                return 0
+            QARevision.objects.record_many([pk for pk, _, _ in rows])
+            now = timezone.now()
+            for offset, chunk in enumerate(_chunks(rows, self.MOVE_CHUNK)):
+                base = last + 1 + offset * self.MOVE_CHUNK
+                self.filter(pk__in=[pk for pk, _, _ in chunk]).update(
+                    subcategory_id=subcategory.pk,
+                    product_id=subcategory.product_id,
+                    position=Case(
+                        *(When(pk=pk, then=Value(base + i)) for i, (pk, _, _) in enumerate(chunk)),
+                        output_field=models.PositiveIntegerField(),
+                    ),
+                    updated_at=now,
+                )
+            self._after_bulk_change(rows, target=subcategory, author=author)
+        return len(rows)
+
+    def _after_bulk_change(
+        self, rows: list[tuple[int, int, int]], target: 'Subcategory | None' = None, author=None,
+    ) -> None:
+        """Ревизии, пересчёт счётчиков затронутых подкатегорий/продуктов и поколений — один раз на действие."""
+        QARevision.objects.record_many([pk for pk, _, _ in rows], author=author)
+        subcategories = {sub for _, sub, _ in rows}
+        products = {product for _, _, product in rows}
+        if target is not None:
+            subcategories.add(target.pk)
+            products.add(target.product_id)
+        Subcategory.objects.recount(subcategories)
+        Product.objects.recount(products)
+        ContentGeneration.objects.bump_many([
+            *((GenerationScope.QA, pk) for pk, _, _ in rows),
+            *((GenerationScope.SUBCATEGORY, sub) for sub in subcategories),
+            *((GenerationScope.PRODUCT, product) for product in products),
+        ])
+
+
 class QAItem(BaseModel):
     subcategory = models.ForeignKey(
         Subcategory,
         on_delete=models.CASCADE,
         related_name='qa_items',
     )
+    # копия subcategory.product_id: фильтры и сортировки по продукту без цепочки JOIN
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='qa_items',
+        editable=False,
+    )
     question = models.TextField()
     status = models.CharField(
         max_length=ModelConfig.MAX_LENGTH_STATUS,
         choices=QAStatus.choices,
         default=QAStatus.DRAFT,
-        db_index=True,
     )
 
+    objects = QAItemManager()
+
     class Meta(BaseModel.Meta):
         indexes = [
             models.Index(
                 fields=['subcategory', 'position'],
                 name='idx_qaitems_subcat_pos',
             ),
+            # список вопросов подкатегории
+            models.Index(
+                fields=['subcategory', 'position', 'id'],
+                name='idx_qaitems_active_subcat_pos',
+                condition=Q(is_active=True),
+            ),
+            # опубликованные вопросы: карточки продукта, быстрые вопросы, sitemap
+            models.Index(
+                fields=['subcategory', 'position', 'id'],
+                name='idx_qaitems_pub_subcat_pos',
+                condition=Q(is_active=True, status=QAStatus.PUBLISHED),
+            ),
+            models.Index(
+                fields=['position', 'id'],
+                name='idx_qaitems_pub_pos',
+                condition=Q(is_active=True, status=QAStatus.PUBLISHED),
+            ),
+            # поиск в админке по началу вопроса (^question): LIKE 'текст%' в SQLite идёт по индексу NOCASE
+            models.Index(Collate('question', 'NOCASE'), name='idx_qaitems_question_nocase'),
         ]
 
     def __str__(self):
         return self.question[:ModelConfig.MAX_SHORT_QUESTION]
 
+    @property
+    def is_counted(self) -> bool:
+        """Учитывается ли вопрос в published_qa_count подкатегории/продукта."""
+        return self.is_active and self.status == QAStatus.PUBLISHED
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            old = None
+            if not self._state.adding:
+                old = QAItem.objects.filter(pk=self.pk).values(
+                    'subcategory_id', 'product_id', 'status', 'is_active',
+                ).first()
+            self.product_id = self._resolve_product_id(old)
+            super().save(*args, **kwargs)
+
+            old_sub = None
+            if old and old['is_active'] and old['status'] == QAStatus.PUBLISHED:
+                old_sub = old['subcategory_id']
+            new_sub = self.subcategory_id if self.is_counted else None
+            if old_sub != new_sub:
+                Subcategory.objects.shift_published_qas(old_sub, -1)
+                Subcategory.objects.shift_published_qas(new_sub, 1)
+            if old and old['subcategory_id'] != self.subcategory_id:
+                # перенос: новые области поднимет post_save, старые подкатегория и продукт — тут
+                ContentGeneration.objects.bump([
+                    (GenerationScope.SUBCATEGORY, old['subcategory_id']),
+                    (GenerationScope.PRODUCT, old['product_id']),
+                ])
+
+    def _resolve_product_id(self, old: dict | None) -> int | None:
+        """product_id по текущей подкатегории: из БД, если подкатегория не менялась, иначе из неё самой."""
+        if old and old['subcategory_id'] == self.subcategory_id:
+            return old['product_id']
+        field = self._meta.get_field('subcategory')
+        if field.is_cached(self) and self.subcategory is not None and self.subcategory.pk == self.subcategory_id:
+            return self.subcategory.product_id
+        return Subcategory.objects.filter(pk=self.subcategory_id).values_list('product_id', flat=True).first()
+
     def position_scope_filter(self) -> dict:
         return {'subcategory': self.subcategory}
 
+    def content_scopes(self) -> list[tuple[str, int]]:
+        return [
+            (GenerationScope.QA, self.pk),
+            (GenerationScope.SUBCATEGORY, self.subcategory_id),
+            (GenerationScope.PRODUCT, self.product_id),
+        ]
+
 
 class BlockKind(models.TextChoices):
     HEADING = 'heading', 'Заголовок'
@@ -189,10 +612,67 @@ class HeadingLevel(models.IntegerChoices):
 
 
 def qa_media_upload_to(instance: 'QABlock', filename: str) -> str:
+    # итоговый путь выбирает хранилище по хэшу содержимого, отсюда берётся только расширение
     stem = Path(filename).stem
     ext = Path(filename).suffix.lower()
     safe = slugify(stem) or 'file'
-    return f'qa/{instance.qa_id}/{uuid4().hex}_{safe}{ext}'
+    return f'qa/{instance.qa_id}/{safe}{ext}'
+
+
+class MediaBlobManager(models.Manager):
+    def retain(self, name: str | None) -> None:
+        """+1 ссылка на блоб (строка создаётся при первой ссылке)."""
+        if not qa_media_storage.is_blob(name):
+            return
+        blob, created = self.get_or_create(
+            name=name,
+            defaults={
+                'digest': qa_media_storage.digest_from_name(name),
+                'size': qa_media_storage.size(name) if qa_media_storage.exists(name) else 0,
+                'ref_count': 1,
+            },
+        )
+        if not created:
+            self.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+
+    def retain_many(self, counts: dict[str, int]) -> None:
+        """retain() для пачки имён (массовый импорт): один INSERT новых строк и UPDATE на каждое имя."""
+        counts = {name: n for name, n in counts.items() if qa_media_storage.is_blob(name) and n > 0}
+        if not counts:
+            return
+        self.bulk_create(
+            [
+                MediaBlob(
+                    name=name,
+                    digest=qa_media_storage.digest_from_name(name),
+                    size=qa_media_storage.size(name) if qa_media_storage.exists(name) else 0,
+                )
+                for name in counts
+            ],
+            ignore_conflicts=True,
+        )
+        for name, n in counts.items():
+            self.filter(name=name).update(ref_count=F('ref_count') + n)
+
+    def release(self, name: str | None) -> None:
+        """-1 ссылка на блоб. Сам файл удаляет сборщик мусора, когда ссылок не осталось."""
+        if not qa_media_storage.is_blob(name):
+            return
+        self.filter(name=name, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+
+
+class MediaBlob(models.Model):
+    """Уникальный медиафайл в хранилище, адресуемом по содержимому, со счётчиком ссылок из QABlock."""
+    digest = models.CharField(max_length=ModelConfig.MAX_LENGTH_DIGEST, db_index=True)
+    name = models.CharField(max_length=ModelConfig.MAX_LENGTH_MEDIA_NAME, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = MediaBlobManager()
+
+    def __str__(self):
+        return f'{self.name} ({self.ref_count})'
 
 
 class QABlock(BaseModel):
@@ -236,6 +716,7 @@ class QABlock(BaseModel):
     # --- Медиа ---
     media_file = models.FileField(
         upload_to=qa_media_upload_to,
+        storage=get_qa_media_storage,
         blank=True,
         null=True,
         help_text='Загруженный файл (изображение/GIF/видео)',
@@ -297,6 +778,8 @@ class QABlock(BaseModel):
                 fields=['qa', 'position'],
                 name='idx_qablocks_qa_pos',
             ),
+            # поиск в админке по началу заголовка (^heading_text)
+            models.Index(Collate('heading_text', 'NOCASE'), name='idx_qablocks_heading_nocase'),
         ]
 
     def __str__(self):
@@ -311,9 +794,20 @@ class QABlock(BaseModel):
                 f'(text {self.text_md[:ModelConfig.MAX_LENGTH_SHORT_QABLOCK]})')
         return f'{self.qa_id}#{self.position} ({self.kind})'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # запоминаем исходный файл, чтобы при сохранении пересчитать ссылки на блобы
+        if 'media_file' in instance.__dict__:
+            instance._loaded_media_name = instance.media_file.name or None
+        return instance
+
     def position_scope_filter(self) -> dict:
         return {'qa': self.qa}
 
+    def content_scopes(self) -> list[tuple[str, int]]:
+        return [(GenerationScope.QA, self.qa_id)]
+
     @property
     def media_link(self) -> str | None:
         if self.media_file:
@@ -355,6 +849,176 @@ class QABlock(BaseModel):
             self.heading_anchor = base[:220]
         super().save(*args, **kwargs)
 
+        # счётчики ссылок на блобы: новый файл +1, заменённый/очищенный -1
+        old_name = getattr(self, '_loaded_media_name', None)
+        new_name = self.media_file.name or None
+        if new_name != old_name:
+            MediaBlob.objects.retain(new_name)
+            MediaBlob.objects.release(old_name)
+            self._loaded_media_name = new_name
+
+
+class QARevisionManager(models.Manager):
+    # вопросов в одном WHERE qa_id IN (...) при record_many()
+    REVISION_CHUNK = 500
+
+    def current_state(self, qa_id: int) -> dict | None:
+        """Состояние вопроса из БД в формате guide.revisions (две проекции values())."""
+        state = QAItem.objects.filter(pk=qa_id).values(*revisions.QUESTION_FIELDS).first()
+        if state is None:
+            return None
+        state['blocks'] = list(
+            QABlock.objects.filter(qa_id=qa_id).order_by('position', 'id').values(*revisions.BLOCK_FIELDS)
+        )
+        return state
+
+    def _chain(self, qa_id: int, number: int | None = None) -> list['QARevision']:
+        """
+        Ревизии от ближайшего полного снимка до number (или до последней):
+        не больше GUIDE_REVISION_SNAPSHOT_EVERY строк, сколько бы правок ни было.
+        """
+        qs = self.filter(qa_id=qa_id)
+        if number is not None:
+            qs = qs.filter(number__lte=number)
+        snapshot = qs.filter(is_snapshot=True).order_by('-number').values_list('number', flat=True).first()
+        if snapshot is None:
+            return []
+        return list(qs.filter(number__gte=snapshot).order_by('number').only('number', 'is_snapshot', 'payload'))
+
+    @staticmethod
+    def _replay(chain: list['QARevision']):
+        """(номер, токены) каждой ревизии цепочки по порядку."""
+        tokens = None
+        for revision in chain:
+            data = revisions.unpack(revision.payload)
+            tokens = data if revision.is_snapshot else revisions.apply_delta(tokens, data)
+            yield revision.number, tokens
+
+    def states(self, qa_id: int, numbers) -> dict[int, dict]:
+        """Состояния ревизий numbers; номера из одной цепочки восстанавливаются за один проход."""
+        wanted = set(numbers)
+        result = {}
+        while wanted:
+            top = max(wanted)
+            chain = self._chain(qa_id, top)
+            if not chain or chain[-1].number != top:
+                wanted.discard(top)
+                continue
+            for number, tokens in self._replay(chain):
+                if number in wanted:
+                    result[number] = revisions.tokens_state(tokens)
+                    wanted.discard(number)
+            wanted = {n for n in wanted if n < chain[0].number}
+        return result
+
+    def record(self, qa_id: int, author=None) -> 'QARevision | None':
+        """
+        Записывает текущее состояние вопроса, если оно отличается от последней ревизии:
+        дельтой к ней, а полным снимком — первую ревизию, каждую N-ю и когда дельта не меньше снимка.
+        """
+        # без точки сохранения: внутри транзакции правки, действия или импорта ошибка откатывает их целиком
+        with transaction.atomic(savepoint=False):
+            # строка вопроса под блокировкой: параллельные правки не получат один номер ревизии
+            if not QAItem.objects.select_for_update().filter(pk=qa_id).exists():
+                return None
+            revision = self._next_revision(
+                qa_id, revisions.state_tokens(self.current_state(qa_id)), self._chain(qa_id), author,
+            )
+            if revision is not None:
+                revision.save()
+            return revision
+
+    def record_many(self, qa_ids, author=None) -> int:
+        """
+        record() для выделения (массовые действия, импорт): состояния, блоки и цепочки —
+        по одному запросу на пачку из REVISION_CHUNK вопросов, новые ревизии — одним bulk_create.
+        """
+        created = 0
+        with transaction.atomic(savepoint=False):
+            for chunk in _chunks(sorted(set(qa_ids)), self.REVISION_CHUNK):
+                states = {
+                    row.pop('id'): {**row, 'blocks': []}
+                    for row in QAItem.objects.select_for_update().filter(pk__in=chunk)
+                    .values('id', *revisions.QUESTION_FIELDS)
+                }
+                if not states:
+                    continue
+                blocks = (
+                    QABlock.objects.filter(qa_id__in=states).order_by('qa_id', 'position', 'id')
+                    .values('qa_id', *revisions.BLOCK_FIELDS)
+                )
+                for block in blocks:
+                    states[block.pop('qa_id')]['blocks'].append(block)
+                # цепочка каждого вопроса — от его последнего снимка, все цепочки пачки одним запросом
+                last_snapshot = (
+                    self.filter(qa_id=OuterRef('qa_id'), is_snapshot=True).order_by('-number').values('number')[:1]
+                )
+                chains = defaultdict(list)
+                for revision in (
+                    self.filter(qa_id__in=states, number__gte=Subquery(last_snapshot))
+                    .order_by('qa_id', 'number').only('qa_id', 'number', 'is_snapshot', 'payload')
+                ):
+                    chains[revision.qa_id].append(revision)
+                pending = [
+                    revision for qa_id, state in states.items()
+                    if (revision := self._next_revision(
+                        qa_id, revisions.state_tokens(state), chains[qa_id], author,
+                    )) is not None
+                ]
+                self.bulk_create(pending)
+                created += len(pending)
+        return created
+
+    def _next_revision(self, qa_id: int, tokens, chain: list['QARevision'], author) -> 'QARevision | None':
+        """Несохранённая ревизия состояния tokens после цепочки chain; None — состояние не изменилось."""
+        payload = revisions.pack(tokens)
+        is_snapshot = True
+        if chain:
+            *_, (_, previous) = self._replay(chain)
+            if previous == tokens:
+                return None
+            if len(chain) < settings.GUIDE_REVISION_SNAPSHOT_EVERY:
+                delta = revisions.pack(revisions.make_delta(previous, tokens))
+                if len(delta) < len(payload):
+                    payload, is_snapshot = delta, False
+        return self.model(
+            qa_id=qa_id,
+            number=chain[-1].number + 1 if chain else 1,
+            is_snapshot=is_snapshot,
+            payload=payload,
+            size=len(payload),
+            author=author if author is not None and author.is_authenticated else None,
+        )
+
+
+class QARevision(models.Model):
+    """Ревизия вопроса: полный снимок или сжатая дельта к предыдущей (формат — guide.revisions)."""
+    qa = models.ForeignKey(QAItem, on_delete=models.CASCADE, related_name='revisions')
+    number = models.PositiveIntegerField()
+    is_snapshot = models.BooleanField(default=False)
+    payload = models.BinaryField()
+    # длина payload: список истории без чтения самих данных
+    size = models.PositiveIntegerField(default=0)
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = QARevisionManager()
+
+    class Meta:
+        constraints = [
+            # он же индекс цепочки: WHERE qa_id = ? AND number BETWEEN ...
+            models.UniqueConstraint(fields=['qa', 'number'], name='uq_qa_revision_number'),
+        ]
+
+    def __str__(self):
+        return f'{self.qa_id} #{self.number}'
+
 
 class LinkPlacement(models.TextChoices):
     HEADER = 'header', 'Шапка'
@@ -394,6 +1058,12 @@ class NavLink(BaseModel):
         ]
         indexes = [
             models.Index(fields=['placement', 'position'], name='idx_navlink_place_pos'),
+            # меню шапки: все активные ссылки по порядку
+            models.Index(
+                fields=['position', 'id'],
+                name='idx_navlink_active_pos',
+                condition=Q(is_active=True),
+            ),
         ]
 
     def __str__(self):
@@ -403,6 +1073,9 @@ class NavLink(BaseModel):
     def position_scope_filter(self) -> dict:
         return {'placement': self.placement}
 
+    def content_scopes(self) -> list[tuple[str, int]]:
+        return [(GenerationScope.NAV, 0)]
+
     # Базовая защита: разрешаем только http/https
     def clean(self):
         super().clean()
@@ -0,0 +1,117 @@
+"""
+Кодек истории правок вопроса (QARevision).
+
+Состояние вопроса (вопрос, статус, активность и список блоков) раскладывается в список
+токенов — JSON-строк: заголовок вопроса, затем на каждый блок его поля и строки text_md
+по одной. Ревизия хранит либо полный снимок (список токенов), либо дельту к предыдущей
+ревизии — только изменённые участки списка (опкоды difflib). И то и другое сжато zlib,
+так что правка одной строки в длинном ответе занимает десятки байт.
+"""
+from __future__ import annotations
+import difflib
+import json
+import zlib
+
+QUESTION_FIELDS = ('question', 'status', 'is_active')
+BLOCK_FIELDS = (
+    'kind', 'heading_text', 'heading_level', 'heading_anchor', 'text_md',
+    'media_file', 'media_url', 'alt_text', 'caption', 'is_active',
+)
+LEVEL = 9
+
+Tokens = list[str]
+Delta = list[list]  # [[начало, конец, [новые токены]], ...] по токенам предыдущей ревизии
+
+
+def _dump(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+
+
+def state_tokens(state: dict) -> Tokens:
+    """{'question': ..., 'blocks': [{...}, ...]} -> токены; text_md — построчно."""
+    tokens = [_dump({name: state.get(name) for name in QUESTION_FIELDS})]
+    for block in state['blocks']:
+        meta = {name: block.get(name) for name in BLOCK_FIELDS if name != 'text_md'}
+        text = block.get('text_md')
+        lines = text.split('\n') if text is not None else []
+        meta['text_lines'] = len(lines) if text is not None else None
+        tokens.append(_dump(meta))
+        tokens.extend(_dump(line) for line in lines)
+    return tokens
+
+
+def tokens_state(tokens: Tokens) -> dict:
+    state = json.loads(tokens[0])
+    blocks = []
+    index = 1
+    while index < len(tokens):
+        block = json.loads(tokens[index])
+        count = block.pop('text_lines')
+        lines = [json.loads(token) for token in tokens[index + 1:index + 1 + (count or 0)]]
+        block['text_md'] = '\n'.join(lines) if count is not None else None
+        blocks.append(block)
+        index += 1 + (count or 0)
+    state['blocks'] = blocks
+    return state
+
+
+def make_delta(old: Tokens, new: Tokens) -> Delta:
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    return [[i1, i2, new[j1:j2]] for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+
+
+def apply_delta(old: Tokens, delta: Delta) -> Tokens:
+    result: Tokens = []
+    position = 0
+    for start, end, inserted in delta:
+        result.extend(old[position:start])
+        result.extend(inserted)
+        position = end
+    result.extend(old[position:])
+    return result
+
+
+def pack(value) -> bytes:
+    return zlib.compress(_dump(value).encode(), LEVEL)
+
+
+def unpack(payload: bytes):
+    return json.loads(zlib.decompress(payload))
+
+
+def display_lines(state: dict) -> list[str]:
+    """Текстовое представление состояния для diff на странице истории."""
+    lines = [
+        f'Вопрос: {state["question"]}',
+        f'Статус: {state["status"]}, активен: {"да" if state["is_active"] else "нет"}',
+    ]
+    for number, block in enumerate(state['blocks'], 1):
+        lines.append('')
+        lines.append(f'## Блок {number}: {block["kind"]}' + ('' if block.get('is_active', True) else ' (выключен)'))
+        for name in BLOCK_FIELDS:
+            value = block.get(name)
+            if name in ('kind', 'is_active', 'heading_anchor') or value in (None, ''):
+                continue
+            if name == 'text_md':
+                lines.extend(str(value).split('\n'))
+            else:
+                lines.append(f'{name}: {value}')
+    return lines
+
+
+def diff_rows(old: dict | None, new: dict, context: int = 3) -> list[tuple[str, str]]:
+    """Строки unified diff как (класс, текст): 'add' / 'del' / 'hunk' / ''."""
+    rows = []
+    diff = difflib.unified_diff(display_lines(old) if old else [], display_lines(new), lineterm='', n=context)
+    for line in diff:
+        if line.startswith(('---', '+++')):
+            continue
+        if line.startswith('@@'):
+            rows.append(('hunk', line))
+        elif line.startswith('+'):
+            rows.append(('add', line[1:]))
+        elif line.startswith('-'):
+            rows.append(('del', line[1:]))
+        else:
+            rows.append(('', line[1:]))
+    return rows
@@ -0,0 +1,81 @@
+from __future__ import annotations
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+PRIMARY = 'default'
+
+# Приложение, чьи модели можно читать из реплик (публичный контент справочника)
+REPLICA_APPS = frozenset({'guide'})
+
+# «Прилипание» к основной БД: админские вьюхи, запросы после сохранения, транзакции
+_primary_pinned: ContextVar[bool] = ContextVar('primary_pinned', default=False)
+# Явное разрешение читать из реплик: публичные вьюхи чтения (UseReplicaDBMixin)
+_replica_reads: ContextVar[bool] = ContextVar('replica_reads', default=False)
+
+
+@contextmanager
+def pin_primary():
+    """Все чтения внутри блока идут в основную БД (read-your-writes)."""
+    token = _primary_pinned.set(True)
+    try:
+        yield
+    finally:
+        _primary_pinned.reset(token)
+
+
+def is_primary_pinned() -> bool:
+    return _primary_pinned.get()
+
+
+@contextmanager
+def replica_reads():
+    """Чтения контента справочника внутри блока могут идти в реплику (если нет pin_primary())."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def replica_aliases() -> list[str]:
+    return [alias for alias in settings.DATABASES if alias != PRIMARY]
+
+
+class ReplicaRouter:
+    """
+    По умолчанию всё читается из основной БД: сессии, пользователи, админка, команды, сигналы.
+    В случайную реплику идут только чтения моделей REPLICA_APPS внутри replica_reads(),
+    и то пока не открыт transaction.atomic() и не действует pin_primary(). Запись — в основную БД.
+    """
+
+    def __init__(self):
+        self.replicas = replica_aliases()
+
+    def db_for_read(self, model, **hints):
+        if (
+            not self.replicas
+            or not _replica_reads.get()
+            or model._meta.app_label not in REPLICA_APPS
+            or is_primary_pinned()
+            or connections[PRIMARY].in_atomic_block
+        ):
+            return PRIMARY
+        # связанные объекты читаем оттуда же, откуда загружен исходный
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # реплики — копии основной БД, связи между ними допустимы
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
@@ -1,12 +1,15 @@
 from random import sample
 
 from dataclasses import dataclass
-from typing import List, Dict, Tuple
+from typing import List, Dict
 from django.db import models
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from django.urls import reverse
 
 from guide import models as m
 from guide.utils.links import product_url, qa_item_url
+from guide.utils.timing import timed_selector
 
 
 # --- вспомогательное определение "опубликованного" статуса ---
@@ -16,6 +19,9 @@ def _published_q_filter() -> dict:
     if hasattr(m, 'QAStatus'):
         candidates = [getattr(m.QAStatus, name, None) for name in ('PUBLISHED', 'PUBLIC', 'ACTIVE')]
         values = [v for v in candidates if v]
+        if len(values) == 1:
+            # равенство, а не IN: иначе SQLite не применит частичный индекс WHERE status = 'published'
+            return {status_field: values[0]}
         if values:
             return {f'{status_field}__in': values}
         # иначе хотя бы исключим DRAFT
@@ -47,30 +53,7 @@ class QuickFaqGroup:
     items: List[QuickFaqItem]
 
 
-# --- утилита извлечения "родительского" продукта из QAItem ---
-def _resolve_product_from_subcategory(subcategory) -> Tuple[str | None, str | None]:
-    """
-    Возвращает (product_name, product_slug) из связей subcategory.
-    Поддерживает цепочки: subcategory.product ИЛИ subcategory.category.product.
-    """
-    if subcategory is None:
-        return None, None
-
-    # прямой FK: Subcategory.product
-    prod = getattr(subcategory, 'product', None)
-    if prod is not None:
-        return getattr(prod, 'name', None), getattr(prod, 'slug', None)
-
-    # цепочка через category: Subcategory.category.product
-    category = getattr(subcategory, 'category', None)
-    if category is not None:
-        prod2 = getattr(category, 'product', None)
-        if prod2 is not None:
-            return getattr(prod2, 'name', None), getattr(prod2, 'slug', None)
-
-    return None, None
-
-
+@timed_selector
 def quick_faq_groups(
     max_products: int = 8,
     per_product: int = 4,
@@ -86,8 +69,8 @@ def quick_faq_groups(
     elif pub:
         qs = qs.filter(**pub)
 
-    # Нам нужны связи до subcategory и, по возможности, product/category
-    qs = qs.select_related('subcategory')
+    # subcategory и product (денормализованный FK) — прямыми JOIN, без запроса на каждую строку
+    qs = qs.select_related('subcategory', 'product')
 
     groups: Dict[str, QuickFaqGroup] = {}
     # Пройдёмся по самым свежим/верхним по position
@@ -100,7 +83,7 @@ def quick_faq_groups(
 
     for qa in qs.iterator():
         sub = getattr(qa, 'subcategory', None)
-        product_name, product_slug = _resolve_product_from_subcategory(sub)
+        product_name, product_slug = qa.product.name, qa.product.slug
         if not product_name or not product_slug:
             continue
 
@@ -141,6 +124,7 @@ def quick_faq_groups(
     return result
 
 
+@timed_selector
 def build_quick_faqs_for_product(
     product: m.Product,
     *,
@@ -158,13 +142,28 @@ def build_quick_faqs_for_product(
     ).order_by('position', 'id')
     subcats = list(subcats_qs[:max_subcats])
 
+    # Первые max_items_per_card вопросов каждой подкатегории — одним запросом (ROW_NUMBER),
+    # а не запросом на каждую карточку
+    qas_qs = m.QAItem.objects.filter(
+        subcategory__in=[sub.pk for sub in subcats],
+        status=m.QAStatus.PUBLISHED,
+        is_active=True,
+    ).annotate(
+        row_number=Window(
+            RowNumber(),
+            partition_by=[F('subcategory_id')],
+            order_by=[F('position').asc(), F('id').asc()],
+        )
+    ).filter(row_number__lte=max_items_per_card).order_by()
+    # внешний ORDER BY не нужен: окно уже идёт по индексу, а вопросы карточки всё равно перемешиваются
+
+    qas_by_sub: Dict[int, list] = {}
+    for qa in qas_qs:
+        qas_by_sub.setdefault(qa.subcategory_id, []).append(qa)
+
     cards: list[dict] = []
     for sub in subcats:
-        qas_qs = m.QAItem.objects.filter(
-            subcategory=sub, status=m.QAStatus.PUBLISHED, is_active=True
-        ).order_by('position', 'id')
-
-        qas = list(qas_qs[:max_items_per_card])
+        qas = qas_by_sub.get(sub.pk, [])
         if len(qas) > 1:
             qas = sample(qas, k=min(max_items_per_card, len(qas)))
 
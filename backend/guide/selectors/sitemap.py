@@ -0,0 +1,51 @@
+from __future__ import annotations
+from django.urls import reverse
+
+from guide import models as m
+from guide.utils.timing import timed_selector
+
+
+@timed_selector
+def sitemap_entries() -> list[dict]:
+    """Все публичные страницы: продукты, подкатегории и опубликованные вопросы (3 запроса)."""
+    entries = [{'loc': reverse('guide:home'), 'lastmod': None}]
+
+    for slug, updated_at in (
+        m.Product.objects.filter(is_active=True)
+        .order_by('position', 'id')
+        .values_list('slug', 'updated_at')
+    ):
+        entries.append({
+            'loc': reverse('guide:product_list', kwargs={'product_slug': slug}),
+            'lastmod': updated_at,
+        })
+
+    for product_slug, sub_slug, updated_at in (
+        m.Subcategory.objects.filter(is_active=True, product__is_active=True)
+        .order_by('product_id', 'position', 'id')  # порядок индекса, без сортировки
+        .values_list('product__slug', 'slug', 'updated_at')
+    ):
+        entries.append({
+            'loc': reverse('guide:qa_list', kwargs={'product_slug': product_slug, 'sub_slug': sub_slug}),
+            'lastmod': updated_at,
+        })
+
+    for qa_id, product_slug, sub_slug, updated_at in (
+        m.QAItem.objects.filter(
+            is_active=True,
+            status=m.QAStatus.PUBLISHED,
+            subcategory__is_active=True,
+            product__is_active=True,
+        )
+        .order_by('subcategory_id', 'position', 'id')
+        .values_list('id', 'product__slug', 'subcategory__slug', 'updated_at')
+    ):
+        entries.append({
+            'loc': reverse('guide:qa_detail', kwargs={
+                'product_slug': product_slug,
+                'sub_slug': sub_slug,
+                'qa_id': qa_id,
+            }),
+            'lastmod': updated_at,
+        })
+    return entries
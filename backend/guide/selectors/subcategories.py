@@ -18,3 +18,8 @@ def subcategories_by_product_slug(product_slug: str) -> QuerySet:
 
     # 3) Иначе — пусто
     return Subcategory.objects.none()
+
+
+def subcategories_for_product(product) -> QuerySet:
+    """Активные подкатегории уже загруженного продукта — без JOIN по slug, сразу в порядке индекса."""
+    return m.Subcategory.objects.filter(product=product, is_active=True).order_by('position', 'id')
@@ -0,0 +1,89 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from guide.models import (
+    ContentGeneration,
+    MediaBlob,
+    NavLink,
+    Product,
+    QABlock,
+    QAItem,
+    Subcategory,
+)
+
+# Модели, изменение которых меняет поколение контента (см. BaseModel.content_scopes)
+CONTENT_MODELS = (Product, Subcategory, QAItem, QABlock, NavLink)
+
+
+@receiver(post_delete, sender=QABlock)
+def release_block_media(sender, instance: QABlock, **kwargs):
+    # срабатывает и при каскадном удалении (удалили QAItem/подкатегорию/продукт)
+    MediaBlob.objects.release(instance.media_file.name or None)
+
+
+@receiver(post_delete, sender=QAItem)
+def uncount_deleted_qa(sender, instance: QAItem, **kwargs):
+    if instance.is_counted:
+        Subcategory.objects.shift_published_qas(instance.subcategory_id, -1)
+
+
+@receiver(post_delete, sender=Subcategory)
+def uncount_deleted_subcategory(sender, instance: Subcategory, **kwargs):
+    # вопросы подкатегории к этому моменту уже удалены каскадом и вычли себя сами
+    if instance.is_active:
+        Product.objects.shift_counters(instance.product_id, subcategories=-1)
+
+
+def bump_content_generation(sender, instance, **kwargs):
+    ContentGeneration.objects.bump(instance.content_scopes())
+
+
+# Области удаляемых объектов копятся в атрибуте origin (объект или QuerySet, у которого вызван delete()):
+# состояние живёт, пока жив сам origin, и не остаётся в процессе после неудачного удаления
+PENDING_SCOPES_ATTR = '_pending_generation_scopes'
+
+
+def _deleted_directly(sender, origin) -> bool:
+    """
+    Объект удаляется сам (delete() вызван у него или у его QuerySet), а не каскадом.
+    Области каскадных потомков — это само удаляемое поддерево и области удаляемого объекта.
+    """
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return origin is None or origin_model is sender
+
+
+def collect_deleted_scopes(sender, instance, origin=None, **kwargs):
+    # pre_delete приходит для всех объектов до первого post_delete
+    if origin is not None and _deleted_directly(sender, origin):
+        pending = getattr(origin, PENDING_SCOPES_ATTR, None)
+        if pending is None:
+            pending = []
+            setattr(origin, PENDING_SCOPES_ATTR, pending)
+        pending.extend(instance.content_scopes())
+
+
+def bump_deleted_content_generation(sender, instance, origin=None, **kwargs):
+    """
+    Поколения при удалении: одним bump_many на весь delete(), без запросов на каскадных потомков.
+    Поднимает первый post_delete — в транзакции удаления, так что откат удаления откатывает и его.
+    Если удаление упало раньше, накопленное останется на origin, и повторный delete() поднимет
+    те же области ещё раз вместе со своими.
+    """
+    if not _deleted_directly(sender, origin):
+        return
+    if origin is None:
+        ContentGeneration.objects.bump(instance.content_scopes())
+        return
+    pending = getattr(origin, PENDING_SCOPES_ATTR, None)
+    if pending:
+        ContentGeneration.objects.bump_many(pending)
+        pending.clear()
+
+
+for _model in CONTENT_MODELS:
+    post_save.connect(bump_content_generation, sender=_model, dispatch_uid=f'generation-save-{_model.__name__}')
+    pre_delete.connect(collect_deleted_scopes, sender=_model, dispatch_uid=f'generation-collect-{_model.__name__}')
+    post_delete.connect(
+        bump_deleted_content_generation, sender=_model, dispatch_uid=f'generation-delete-{_model.__name__}',
+    )
@@ -0,0 +1,192 @@
+"""
+Журнал медленных SQL-запросов (включается GUIDE_SLOW_QUERY_MS > 0).
+
+Обёртка выполнения запросов замеряет время; всё, что дольше порога, попадает
+в кольцевой буфер процесса вместе с параметрами, местом вызова (вьюха/селектор),
+сокращённым стеком и планом запроса (EXPLAIN QUERY PLAN / EXPLAIN).
+Записи пачками дописываются в GUIDE_SLOW_QUERY_LOG (JSON Lines);
+отчёт по ним — manage.py slowqueries.
+"""
+from __future__ import annotations
+import atexit
+import json
+import logging
+import re
+import sys
+import threading
+import time
+from collections import deque
+from collections.abc import Mapping
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('guide.slow_queries')
+
+GUIDE_DIR = str(Path(__file__).resolve().parent)
+STACK_DEPTH = 8
+MAX_PARAM_LENGTH = 200
+FLUSH_INTERVAL = 10.0  # секунды: редкие записи не должны висеть в памяти до конца пачки
+EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')
+
+_SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+_SQL_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SQL_IN_LIST = re.compile(r'\bIN\s*\((?:\s*\?\s*,?)+\)', re.IGNORECASE)
+_SQL_SPACES = re.compile(r'\s+')
+
+
+def normalize_sql(sql: str) -> str:
+    """Текст запроса без литералов и параметров: одинаковые запросы группируются вместе."""
+    sql = sql.replace('%s', '?')
+    sql = _SQL_STRING.sub('?', sql)
+    sql = _SQL_NUMBER.sub('?', sql)
+    sql = _SQL_IN_LIST.sub('IN (...)', sql)
+    return _SQL_SPACES.sub(' ', sql).strip()
+
+
+class SlowQueryLog:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.recent: deque[dict] = deque(maxlen=settings.GUIDE_SLOW_QUERY_BUFFER)
+        self.pending: list[dict] = []
+        self._last_flush = time.monotonic()
+
+    def add(self, entry: dict) -> None:
+        with self.lock:
+            self.recent.append(entry)
+            self.pending.append(entry)
+            due = (
+                len(self.pending) >= settings.GUIDE_SLOW_QUERY_BATCH
+                or time.monotonic() - self._last_flush >= FLUSH_INTERVAL
+            )
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        with self.lock:
+            batch, self.pending = self.pending, []
+            self._last_flush = time.monotonic()
+        if not batch:
+            return
+        path = Path(settings.GUIDE_SLOW_QUERY_LOG)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open('a', encoding='utf-8') as fh:
+                fh.write(''.join(json.dumps(e, ensure_ascii=False) + '\n' for e in batch))
+        except OSError:
+            logger.exception('не удалось записать журнал медленных запросов: %s', path)
+
+
+_log: SlowQueryLog | None = None
+_log_guard = threading.Lock()
+
+
+def get_slow_query_log() -> SlowQueryLog:
+    global _log
+    if _log is None:
+        with _log_guard:
+            if _log is None:
+                _log = SlowQueryLog()
+                atexit.register(_log.flush)
+    return _log
+
+
+def recent_slow_queries() -> list[dict]:
+    """Последние медленные запросы этого процесса (новые в конце)."""
+    log = get_slow_query_log()
+    with log.lock:
+        return list(log.recent)
+
+
+def _json_param(value):
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = value if isinstance(value, str) else repr(value)
+    return text if len(text) <= MAX_PARAM_LENGTH else text[:MAX_PARAM_LENGTH] + '…'
+
+
+def _json_params(params):
+    """Параметры запроса для журнала: последовательность (%s) или словарь (%(name)s)."""
+    if isinstance(params, Mapping):
+        return {str(name): _json_param(value) for name, value in params.items()}
+    return [_json_param(p) for p in params]
+
+
+def _call_site() -> tuple[str, list[str]]:
+    """Ближайший кадр кода guide (вьюха/селектор/модель) и короткий стек только по guide."""
+    frame = sys._getframe(2)
+    stack = []
+    while frame is not None and len(stack) < STACK_DEPTH:
+        filename = frame.f_code.co_filename
+        if filename.startswith(GUIDE_DIR) and filename != __file__ and '/middleware/' not in filename:
+            relative = filename[len(GUIDE_DIR) + 1:]
+            stack.append(f'{relative}:{frame.f_lineno} {frame.f_code.co_name}')
+        frame = frame.f_back
+    return (stack[0] if stack else ''), stack
+
+
+def _explain(connection, sql: str, params) -> list[str] | str:
+    """План запроса через курсор бэкенда напрямую — мимо execute_wrappers, без рекурсии."""
+    if connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    elif connection.vendor == 'postgresql':
+        prefix = 'EXPLAIN '
+    else:
+        return ''
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(prefix + sql, params)
+        rows = cursor.fetchall()
+    except Exception as exc:  # план — вспомогательная информация, запрос уже выполнен
+        return f'EXPLAIN failed: {exc}'
+    finally:
+        cursor.close()
+    if connection.vendor == 'sqlite':
+        # (id, parent, notused, detail)
+        return [row[-1] for row in rows]
+    return [row[0] for row in rows]
+
+
+def _record_slow_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration_ms = (time.perf_counter() - started) * 1000
+    if duration_ms < settings.GUIDE_SLOW_QUERY_MS:
+        return result
+
+    connection = context['connection']
+    caller, stack = _call_site()
+    plan = []
+    if not many and sql.lstrip()[:6].upper().startswith(EXPLAINABLE):
+        plan = _explain(connection, sql, params)
+    get_slow_query_log().add({
+        'ts': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'alias': connection.alias,
+        'ms': round(duration_ms, 2),
+        'sql': sql,
+        'params': None if many or params is None else _json_params(params),
+        'many': bool(many),
+        'caller': caller,
+        'stack': stack,
+        'plan': plan,
+    })
+    return result
+
+
+def install_slow_query_log(connection) -> None:
+    if _record_slow_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_slow_query)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    install_slow_query_log(connection)
+
+
+def enable_slow_query_log() -> None:
+    """Вызывается из GuideConfig.ready(), если журнал включён."""
+    connection_created.connect(_on_connection_created, dispatch_uid='guide-slow-query-log')
+    for conn in connections.all(initialized_only=True):
+        install_slow_query_log(conn)
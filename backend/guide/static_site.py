@@ -0,0 +1,287 @@
+"""
+Статическая копия портала для nginx (manage.py build_static_site): резерв и офлайн-офисы.
+
+Каждая публичная страница guide/urls.py рендерится настоящим обработчиком Django
+(шаблоны, middleware) в пуле процессов и атомарно записывается в дерево вывода
+вместе с .gz/.br. Для каждой страницы известны области поколений контента,
+от которых она зависит; в манифесте сборки хранится их снимок, и при следующем
+запуске пересобираются только страницы, чьи поколения изменились.
+Страницы удалённых объектов удаляются из дерева.
+"""
+from __future__ import annotations
+import json
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+import django
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from guide.models import ContentGeneration, GenerationScope, Product, QAItem, QAStatus, Subcategory
+from guide.storage import compressed_variants
+
+MANIFEST_NAME = '.static-site.json'
+COMPRESS_MIN_SIZE = 256
+CHECKPOINT_EVERY = 500
+NAV = (GenerationScope.NAV, 0)
+GLOBAL = (GenerationScope.GLOBAL, 0)
+
+
+@dataclass(frozen=True, slots=True)
+class Page:
+    url: str
+    scopes: tuple[tuple[str, int], ...]
+
+    @property
+    def path(self) -> str:
+        """Файл в дереве вывода: /a/b/ -> a/b/index.html, /sitemap.xml -> sitemap.xml."""
+        relative = self.url.lstrip('/')
+        if not relative or relative.endswith('/'):
+            relative += 'index.html'
+        return relative
+
+
+def public_pages() -> Iterator[Page]:
+    """
+    Публичные страницы с областями, от которых зависит их HTML
+    (шапка с навигацией есть на всех страницах). Поиск и редакторские формы не входят.
+    """
+    yield Page(reverse('guide:home'), (GLOBAL,))
+    yield Page(reverse('guide:contacts'), (NAV,))
+    yield Page(reverse('guide:robots'), ())  # статичен, меняется только с хостом (--base-url)
+    yield Page(reverse('guide:sitemap'), (GLOBAL,))
+
+    for pk, slug in Product.objects.filter(is_active=True).order_by('id').values_list('pk', 'slug').iterator():
+        yield Page(
+            reverse('guide:product_list', kwargs={'product_slug': slug}),
+            ((GenerationScope.PRODUCT, pk), NAV),
+        )
+
+    subcategories = (
+        Subcategory.objects.filter(is_active=True, product__is_active=True)
+        .order_by('id')
+        .values_list('pk', 'product_id', 'product__slug', 'slug')
+    )
+    for pk, product_id, product_slug, slug in subcategories.iterator():
+        yield Page(
+            reverse('guide:qa_list', kwargs={'product_slug': product_slug, 'sub_slug': slug}),
+            ((GenerationScope.SUBCATEGORY, pk), (GenerationScope.PRODUCT, product_id), NAV),
+        )
+
+    qas = (
+        QAItem.objects.filter(
+            is_active=True,
+            status=QAStatus.PUBLISHED,
+            subcategory__is_active=True,
+            product__is_active=True,
+        )
+        .order_by('id')
+        .values_list('pk', 'subcategory_id', 'product_id', 'product__slug', 'subcategory__slug')
+    )
+    for pk, sub_id, product_id, product_slug, sub_slug in qas.iterator(chunk_size=2000):
+        yield Page(
+            reverse('guide:qa_detail', kwargs={'product_slug': product_slug, 'sub_slug': sub_slug, 'qa_id': pk}),
+            (
+                (GenerationScope.QA, pk),
+                # список вопросов подкатегории и хлебные крошки
+                (GenerationScope.SUBCATEGORY, sub_id),
+                (GenerationScope.PRODUCT, product_id),
+                NAV,
+            ),
+        )
+
+
+def generation_snapshot() -> dict[tuple[str, int], int]:
+    """Все поколения одним проходом по таблице (без IN-списков на сотни тысяч ключей)."""
+    return {
+        (scope, key): value
+        for scope, key, value in ContentGeneration.objects.values_list('scope', 'key', 'value').iterator()
+    }
+
+
+def page_signature(page: Page, generations: dict[tuple[str, int], int]) -> str:
+    return ' '.join(f'{scope}:{key}={generations.get((scope, key), 0)}' for scope, key in page.scopes)
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Запись через временный файл в том же каталоге и os.replace: nginx не увидит половину файла."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            out.write(data)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def remove_page(output: Path, relative: str) -> None:
+    for suffix in ('', '.gz', '.br'):
+        try:
+            (output / (relative + suffix)).unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _init_worker() -> None:
+    # при spawn процесс стартует пустым; при fork django.setup() ничего не делает
+    django.setup()
+
+
+def render_pages(batch: list[tuple[str, str]], output: str, host: str, secure: bool) -> list[tuple[str, str | None]]:
+    """Рендерит пачку (url, файл) и пишет результат; возвращает (url, ошибка или None)."""
+    client = Client(HTTP_HOST=host)
+    root = Path(output)
+    results = []
+    try:
+        for url, relative in batch:
+            try:
+                response = client.get(url, secure=secure)
+                if response.status_code != 200:
+                    results.append((url, f'HTTP {response.status_code}'))
+                    continue
+                data = response.content
+                target = root / relative
+                write_atomic(target, data)
+                for suffix, payload in compressed_variants(data) if len(data) >= COMPRESS_MIN_SIZE else ():
+                    write_atomic(target.with_name(target.name + suffix), payload)
+                results.append((url, None))
+            except Exception as exc:
+                results.append((url, f'{type(exc).__name__}: {exc}'))
+    finally:
+        connections.close_all()
+    return results
+
+
+@dataclass
+class BuildResult:
+    total: int = 0
+    rendered: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    failed: list[tuple[str, str]] | None = None
+
+
+class StaticSiteBuilder:
+    def __init__(self, output: Path, *, host: str, secure: bool = False, workers: int = 1,
+                 batch_size: int = 50, force: bool = False, progress=None):
+        self.output = output
+        self.host = host
+        self.secure = secure
+        self.workers = workers
+        self.batch_size = batch_size
+        self.force = force
+        self.progress = progress
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.output / MANIFEST_NAME
+
+    def load_manifest(self) -> dict:
+        try:
+            data = json.loads(self.manifest_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+        # сборка под другой хост/схему — ссылки в sitemap другие, пересобираем всё
+        if data.get('host') != self.host or data.get('secure') != self.secure:
+            return {}
+        return data.get('pages', {})
+
+    def build(self) -> BuildResult:
+        self.output.mkdir(parents=True, exist_ok=True)
+        previous = {} if self.force else self.load_manifest()
+        generations = generation_snapshot()
+
+        pages: dict[str, dict] = {}
+        pending: list[tuple[str, str]] = []
+        result = BuildResult(failed=[])
+        built: dict[str, dict] = {}  # страницы, которые лежат на диске с актуальной подписью
+        for page in public_pages():
+            signature = page_signature(page, generations)
+            entry = pages[page.url] = {'file': page.path, 'signature': signature}
+            old = previous.get(page.url)
+            if old and old['signature'] == signature and (self.output / page.path).exists():
+                built[page.url] = entry
+                result.unchanged += 1
+            else:
+                pending.append((page.url, page.path))
+        result.total = len(pages)
+
+        # страницы, которых больше нет (удалены/сняты с публикации) — до рендера,
+        # чтобы промежуточные манифесты могли хранить только собранное
+        current_files = {entry['file'] for entry in pages.values()}
+        for url, entry in previous.items():
+            if url not in pages and entry['file'] not in current_files:
+                remove_page(self.output, entry['file'])
+                result.removed += 1
+
+        for url, error in self._render(pending):
+            if error:
+                result.failed.append((url, error))
+                if url in previous:
+                    # старый файл остаётся, со старой подписью — пересоберётся в следующий раз
+                    built[url] = previous[url]
+            else:
+                built[url] = pages[url]
+                result.rendered += 1
+                if result.rendered % CHECKPOINT_EVERY == 0:
+                    self.save_manifest(built)
+
+        self.save_manifest(built)
+        return result
+
+    def save_manifest(self, pages: dict[str, dict]) -> None:
+        """Манифест пишется и по ходу сборки: прерванная сборка продолжается с того же места."""
+        manifest = {'host': self.host, 'secure': self.secure, 'pages': pages}
+        write_atomic(self.manifest_path, json.dumps(manifest, ensure_ascii=False).encode())
+
+    def _render(self, pending: list[tuple[str, str]]) -> Iterator[tuple[str, str | None]]:
+        if not pending:
+            return
+        # первая страница — в этом процессе: если не рендерится она (нет манифеста статики,
+        # недоступна БД), не рендерятся и остальные — не запускаем пул впустую
+        (first_url, first_error), = render_pages(pending[:1], str(self.output), self.host, self.secure)
+        if first_error:
+            yield from ((url, first_error) for url, _ in pending)
+            return
+        yield first_url, None
+        pending = pending[1:]
+
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        done = 1
+        if self.workers <= 1 or len(batches) <= 1:
+            for batch in batches:
+                results = render_pages(batch, str(self.output), self.host, self.secure)
+                done += len(results)
+                if self.progress:
+                    self.progress(done, len(pending) + 1)
+                yield from results
+            return
+
+        # дочерние процессы не должны наследовать открытые соединения с БД
+        connections.close_all()
+        method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(method),
+            initializer=_init_worker,
+        ) as pool:
+            futures = [
+                pool.submit(render_pages, batch, str(self.output), self.host, self.secure)
+                for batch in batches
+            ]
+            for future in as_completed(futures):
+                results = future.result()
+                done += len(results)
+                if self.progress:
+                    self.progress(done, len(pending) + 1)
+                yield from results
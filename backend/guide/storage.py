@@ -0,0 +1,136 @@
+from __future__ import annotations
+import gzip
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.storage import FileSystemStorage
+
+try:
+    import brotli
+except ImportError:  # .br не создаём, остаётся только .gz
+    brotli = None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище медиа, адресуемое по содержимому.
+    Файл хэшируется во время записи и кладётся один раз под именем своего дайджеста:
+    одинаковые загрузки превращаются в один файл и один (кэшируемый навсегда) URL.
+    """
+    blob_prefix = 'qa/blobs'
+    hash_algorithm = 'sha256'
+
+    def blob_name(self, digest: str, ext: str = '') -> str:
+        return f'{self.blob_prefix}/{digest[:2]}/{digest}{ext}'
+
+    def is_blob(self, name: str | None) -> bool:
+        return bool(name) and name.startswith(f'{self.blob_prefix}/')
+
+    @staticmethod
+    def digest_from_name(name: str) -> str:
+        return Path(name).stem
+
+    def get_available_name(self, name, max_length=None):
+        # имя всё равно вычисляется по содержимому в _save — суффиксы не нужны
+        return name
+
+    def _save(self, name, content):
+        ext = Path(name).suffix.lower()
+        tmp_dir = Path(self.location) / self.blob_prefix / 'tmp'
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        if hasattr(content, 'seek'):
+            content.seek(0)
+
+        # 1) пишем во временный файл, параллельно считая хэш
+        digest = hashlib.new(self.hash_algorithm)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    out.write(chunk)
+
+            # 2) переносим под имя дайджеста; если такой блоб уже есть — просто выбрасываем копию
+            name = self.blob_name(digest.hexdigest(), ext)
+            full_path = self.path(name)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            if self._touch(full_path):
+                os.unlink(tmp_path)
+            else:
+                os.replace(tmp_path, full_path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(full_path, self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        return name
+
+    @staticmethod
+    def _touch(full_path: str) -> bool:
+        """
+        Существующий блоб снова нужен: свежий mtime, чтобы media_gc (--min-age-hours) не унёс его
+        в карантин, пока ссылка на него ещё не сохранена в БД. False — блоба нет (или его только что унёс GC).
+        """
+        try:
+            os.utime(full_path)
+        except FileNotFoundError:
+            return False
+        return True
+
+
+qa_media_storage = ContentAddressedStorage()
+
+
+def get_qa_media_storage() -> ContentAddressedStorage:
+    return qa_media_storage
+
+
+def compressed_variants(data: bytes) -> list[tuple[str, bytes]]:
+    """Соседи .gz/.br для готового файла (только те, что меньше оригинала)."""
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(data, quality=11)))
+    return [(suffix, payload) for suffix, payload in variants if len(payload) < len(data)]
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Статика с хэшем в имени (manifest) + заранее сжатые соседи .gz/.br,
+    чтобы ни Django, ни nginx не жали файлы на лету.
+    """
+    compress_extensions = ('.css', '.js', '.svg', '.txt', '.xml', '.json', '.map', '.html')
+    compress_min_size = 256
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed: dict[str, str] = {}
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed[name] = hashed_name
+            yield name, hashed_name, processed
+
+        if dry_run:
+            return
+        # сжимаем только финальные имена (после всех проходов manifest)
+        for hashed_name in hashed.values():
+            self._write_compressed(hashed_name)
+
+    def _write_compressed(self, name: str) -> None:
+        if not name.endswith(self.compress_extensions):
+            return
+        with self.open(name) as f:
+            data = f.read()
+        if len(data) < self.compress_min_size:
+            return
+
+        full_path = self.path(name)
+        for suffix, payload in compressed_variants(data):
+            with open(full_path + suffix, 'wb') as out:
+                out.write(payload)
@@ -1,7 +1,10 @@
+from functools import cache
+
 from django import template
 from django.utils.safestring import mark_safe
-import markdown2
-import bleach
+
+from guide.metrics import MARKDOWN_RENDERS
+from guide.utils.timing import timed
 
 register = template.Library()
 
@@ -33,6 +36,18 @@ MD_EXTRAS = {
     'header-ids': False,       # якоря заголовков не нужны тут
 }
 
+
+@cache
+def renderers():
+    """
+    markdown2 и bleach импортируются при первом рендере, а не при загрузке библиотеки тегов:
+    воркер стартует быстрее, а прогрев (guide.warmup) подтягивает их до первого запроса.
+    """
+    import bleach
+    import markdown2
+    return markdown2, bleach
+
+
 @register.filter(name='markdown_safe')
 def markdown_safe(text_md: str | None):
     """
@@ -41,6 +56,13 @@ def markdown_safe(text_md: str | None):
     """
     if not text_md:
         return ''
+    MARKDOWN_RENDERS.inc()
+    with timed('markdown'):
+        return _render_markdown(text_md)
+
+
+def _render_markdown(text_md: str):
+    markdown2, bleach = renderers()
     # 1) md -> html
     html = markdown2.markdown(text_md, extras=MD_EXTRAS)
 
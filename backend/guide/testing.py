@@ -0,0 +1,126 @@
+"""
+Вспомогательные функции для тестов: небольшой набор данных и проверка
+бюджетов запросов для всех маршрутов guide/urls.py.
+"""
+from __future__ import annotations
+import tempfile
+from dataclasses import dataclass
+
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+from django.urls import URLPattern, reverse
+
+from guide import urls as guide_urls
+from guide.metrics import REGISTRY
+from guide.middleware.queries import QueryBudgetExceeded
+from guide.models import (
+    BlockKind,
+    LinkPlacement,
+    NavLink,
+    Product,
+    QABlock,
+    QAItem,
+    QAStatus,
+    Subcategory,
+)
+
+
+class GuideTestRunner(DiscoverRunner):
+    """Файлы метрик тестовых запросов пишутся во временный каталог, а не в GUIDE_METRICS_DIR проекта."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.metrics_dir = tempfile.TemporaryDirectory(prefix='giguide-test-metrics-')
+        self.metrics_settings = override_settings(GUIDE_METRICS_DIR=self.metrics_dir.name)
+        self.metrics_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        REGISTRY.close()
+        self.metrics_settings.disable()
+        self.metrics_dir.cleanup()
+        super().teardown_test_environment(**kwargs)
+
+
+@dataclass(slots=True)
+class SeededGuide:
+    product: Product
+    subcategory: Subcategory
+    qa: QAItem
+
+    def url_kwargs(self) -> dict:
+        return {
+            'product_slug': self.product.slug,
+            'sub_slug': self.subcategory.slug,
+            'qa_id': self.qa.pk,
+        }
+
+
+def seed_guide(
+    products: int = 3,
+    subcategories: int = 3,
+    qas: int = 5,
+    blocks: int = 4,
+    links: int = 3,
+) -> SeededGuide:
+    """Продукты -> подкатегории -> опубликованные вопросы с блоками + ссылки шапки."""
+    first = None
+    for p in range(1, products + 1):
+        product = Product.objects.create(name=f'Продукт {p}', slug=f'product-{p}')
+        for s in range(1, subcategories + 1):
+            sub = Subcategory.objects.create(product=product, name=f'Раздел {p}.{s}', slug=f'section-{s}')
+            for q in range(1, qas + 1):
+                qa = QAItem.objects.create(
+                    subcategory=sub,
+                    question=f'Как настроить {p}.{s}.{q}?',
+                    status=QAStatus.PUBLISHED,
+                )
+                for b in range(1, blocks + 1):
+                    if b == 1:
+                        QABlock.objects.create(qa=qa, kind=BlockKind.HEADING, heading_text=f'Шаг {b}')
+                    else:
+                        QABlock.objects.create(qa=qa, kind=BlockKind.TEXT, text_md=f'Откройте **настройки** и выберите пункт {b}.')
+                if first is None:
+                    first = SeededGuide(product=product, subcategory=sub, qa=qa)
+    for i in range(1, links + 1):
+        NavLink.objects.create(placement=LinkPlacement.HEADER, label=f'Ссылка {i}', url=f'https://example.com/{i}')
+    return first
+
+
+def guide_view_urls(seeded: SeededGuide) -> list[tuple[str, str]]:
+    """(view_name, url) для каждого именованного маршрута guide/urls.py."""
+    kwargs = seeded.url_kwargs()
+    result = []
+    seen = set()
+    for pattern in guide_urls.urlpatterns:
+        if not isinstance(pattern, URLPattern) or not pattern.name or pattern.name in seen:
+            continue
+        seen.add(pattern.name)
+        view_name = f'{guide_urls.app_name}:{pattern.name}'
+        params = {name: kwargs[name] for name in pattern.pattern.converters}
+        url = reverse(view_name, kwargs=params)
+        if pattern.name == 'search':
+            url += '?q=настро'
+        result.append((view_name, url))
+    return result
+
+
+def assert_view_query_budgets(client, urls: list[tuple[str, str]], budgets: dict[str, int]) -> None:
+    """
+    Открывает каждый URL и падает, если вьюха превысила бюджет запросов
+    (QueryCountMiddleware в строгом режиме) или для неё бюджет не задан.
+    """
+    failures = []
+    with override_settings(GUIDE_QUERY_BUDGET_STRICT=True, GUIDE_QUERY_BUDGETS=budgets):
+        for view_name, url in urls:
+            if view_name not in budgets:
+                failures.append(f'{view_name}: не задан бюджет в GUIDE_QUERY_BUDGETS')
+                continue
+            try:
+                response = client.get(url)
+            except QueryBudgetExceeded as exc:
+                failures.append(str(exc))
+                continue
+            if response.status_code >= 400:
+                failures.append(f'{view_name} {url}: HTTP {response.status_code}')
+    if failures:
+        raise AssertionError('\n'.join(failures))
@@ -1,3 +1,1426 @@
-from django.test import TestCase
+import contextlib
+import gzip
+import io
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import connection, router, transaction
+from django.db.models.signals import post_delete
+from django.test.utils import CaptureQueriesContext
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from guide.models import (
+    BlockKind, ContentGeneration, GenerationScope, MediaBlob, NavLink, Product, QABlock, QAItem, QARevision, QAStatus,
+    Subcategory,
+)
+from guide.bench import generate_knowledge_base, parse_scale
+from guide.cache import LocalLRU, TwoTierCache, content_epoch
+from guide.management.commands.bench import Command as BenchCommand
+from guide.management.commands.loadtest import DEFAULT_MIX as LOADTEST_DEFAULT_MIX, parse_mix
+from guide.metrics import REGISTRY, REQUESTS
+from guide.middleware.replicas import STICKY_COOKIE
+from guide.revisions import apply_delta, make_delta, state_tokens, tokens_state
+from guide.routers import PRIMARY, ReplicaRouter, pin_primary, replica_reads
+from guide.selectors.nav import menu_links_qs
+from guide.selectors.products import products_for_home
+from guide.selectors.qa import build_quick_faqs_for_product, quick_faq_groups
+from guide.selectors.sitemap import sitemap_entries
+from guide.selectors.subcategories import subcategories_for_product
+from guide.slow_queries import _record_slow_query, get_slow_query_log, install_slow_query_log, recent_slow_queries
+from guide.static_site import StaticSiteBuilder
+from guide.storage import qa_media_storage
+from guide.testing import assert_view_query_budgets, guide_view_urls, seed_guide
+from guide.views.static import serve_static
+from guide.warmup import STEPS as WARMUP_STEPS, warm_up, warm_up_on_startup
+
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+TEST_STORAGES = {
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+def create_qa(question: str = 'Как настроить почту?') -> QAItem:
+    product = Product.objects.create(name='Почта', slug='mail')
+    subcategory = Subcategory.objects.create(product=product, name='Настройка', slug='setup')
+    return QAItem.objects.create(subcategory=subcategory, question=question)
+
+
+def create_subcategory(slug: str, qas: int = 0, blocks: int = 0) -> Subcategory:
+    """Продукт с одной подкатегорией, в ней qas вопросов по blocks текстовых блоков."""
+    product = Product.objects.create(name=slug, slug=slug)
+    subcategory = Subcategory.objects.create(product=product, name=slug, slug=slug)
+    for i in range(qas):
+        qa = QAItem.objects.create(subcategory=subcategory, question=f'{slug} {i}')
+        for j in range(blocks):
+            QABlock.objects.create(qa=qa, kind=BlockKind.TEXT, text_md=f'Абзац {j}')
+    return subcategory
+
+
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES)
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seeded = seed_guide()
+        cls.staff = get_user_model().objects.create_user('editor', password='x', is_staff=True)
+
+    def test_anonymous_views_within_budget(self):
+        urls = [
+            (name, url) for name, url in guide_view_urls(self.seeded)
+            if not name.endswith(('_add', '_edit', '_history', ':export'))
+        ]
+        assert_view_query_budgets(self.client, urls, settings.GUIDE_QUERY_BUDGETS)
+
+    def test_staff_views_within_budget(self):
+        self.client.force_login(self.staff)
+        assert_view_query_budgets(self.client, guide_view_urls(self.seeded), settings.GUIDE_QUERY_BUDGETS)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class AsyncViewTests(TestCase):
+    """Публичные страницы — async-вьюхи; запросы к БД идут по очереди и отдают те же данные."""
+
+    def setUp(self):
+        self.qa = create_qa()
+        self.qa.status = QAStatus.PUBLISHED
+        self.qa.save()
+        QABlock.objects.create(qa=self.qa, kind=BlockKind.TEXT, text_md='Откройте клиент.')
+        sub = self.qa.subcategory
+        self.urls = [
+            reverse('guide:home'),
+            reverse('guide:qa_list', kwargs={'product_slug': sub.product.slug, 'sub_slug': sub.slug}),
+            reverse('guide:qa_detail', kwargs={
+                'product_slug': sub.product.slug, 'sub_slug': sub.slug, 'qa_id': self.qa.pk,
+            }),
+            reverse('guide:search') + '?q=почту',
+        ]
+
+    async def test_async_views(self):
+        for url in self.urls:
+            with self.subTest(url):
+                response = await self.async_client.get(url)
+                self.assertContains(response, self.qa.question)
+
+
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES, GUIDE_SERVER_TIMING=True)
+class ServerTimingTests(TestCase):
+    """Заголовок Server-Timing: метрики name;dur=мс[;desc="Nx"], в том числе db, cache, app и total."""
+
+    ENTRY = re.compile(r'^(?P<name>[\w.]+);dur=\d+\.\d(?:;desc="\d+x")?$')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seeded = seed_guide(products=1, subcategories=1, qas=2, blocks=2, links=1)
+
+    def setUp(self):
+        cache.clear()
+        content_epoch()  # эпоха читается один раз за процесс — не в замеряемом запросе
+
+    def entries(self, response) -> dict[str, str]:
+        self.assertIn('Server-Timing', response.headers)
+        entries = {}
+        for entry in response.headers['Server-Timing'].split(', '):
+            match = self.ENTRY.match(entry)
+            self.assertIsNotNone(match, entry)
+            entries[match['name']] = entry
+        return entries
+
+    def test_sync_view(self):
+        url = reverse('guide:product_list', kwargs={'product_slug': self.seeded.product.slug})
+        with self.assertLogs('guide.timing', 'INFO') as logs:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        entries = self.entries(response)
+        self.assertLessEqual({'db', 'template', 'app', 'total'}, set(entries))
+        self.assertRegex(entries['db'], r'desc="[1-9]\d*x"$')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record['view'], record['status']), ('guide:product_list', 200))
+        self.assertIn('db', record['sections'])
+
+    async def test_async_view(self):
+        with self.assertLogs('guide.timing', 'INFO'):
+            response = await self.async_client.get(reverse('guide:qa_detail', kwargs=self.seeded.url_kwargs()))
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual({'db', 'cache', 'template', 'markdown', 'app', 'total'}, set(self.entries(response)))
+
+    def test_absent_when_disabled(self):
+        with override_settings(GUIDE_SERVER_TIMING=False):
+            self.client = self.client_class()  # цепочка middleware собирается при первом запросе клиента
+            response = self.client.get(reverse('guide:home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response.headers)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'планы проверяются для SQLite')
+class SelectorIndexUsageTests(TestCase):
+    """Запросы селекторов идут по индексам: без полного прохода по таблице и без временной сортировки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seeded = seed_guide()
+
+    def selector_calls(self):
+        product = self.seeded.product
+        return {
+            'menu_links_qs': lambda: list(menu_links_qs()),
+            'products_for_home': lambda: list(products_for_home()),
+            'quick_faq_groups': quick_faq_groups,
+            'build_quick_faqs_for_product': lambda: build_quick_faqs_for_product(product),
+            'sitemap_entries': sitemap_entries,
+            'subcategories_for_product': lambda: list(subcategories_for_product(product)),
+        }
+
+    def capture(self, call) -> list[tuple[str, tuple]]:
+        queries = []
+
+        def wrapper(execute, sql, params, many, context):
+            queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(wrapper):
+            call()
+        return queries
+
+    def query_plan(self, sql: str, params) -> list[str]:
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def test_selectors_use_indexes(self):
+        for name, call in self.selector_calls().items():
+            queries = self.capture(call)
+            self.assertTrue(queries, name)
+            for sql, params in queries:
+                plan = self.query_plan(sql, params)
+                with self.subTest(selector=name, sql=sql[:120]):
+                    bad = [
+                        step for step in plan
+                        if 'TEMP B-TREE' in step
+                        or (step.startswith('SCAN guide_') and 'INDEX' not in step)
+                    ]
+                    self.assertEqual(bad, [], '\n'.join(plan))
+
+
+class DenormalizedCounterTests(TestCase):
+    def assertCounters(self, product, subcategories: int, qas: int):
+        product.refresh_from_db()
+        self.assertEqual((product.subcategory_count, product.published_qa_count), (subcategories, qas))
+
+    def assertMatchesRecount(self):
+        stored = (
+            list(Subcategory.objects.order_by('pk').values_list('published_qa_count', flat=True)),
+            list(Product.objects.order_by('pk').values_list('subcategory_count', 'published_qa_count')),
+        )
+        call_command('recount', stdout=io.StringIO())
+        recounted = (
+            list(Subcategory.objects.order_by('pk').values_list('published_qa_count', flat=True)),
+            list(Product.objects.order_by('pk').values_list('subcategory_count', 'published_qa_count')),
+        )
+        self.assertEqual(stored, recounted)
+
+    def test_counters_follow_changes(self):
+        seeded = seed_guide(products=2, subcategories=2, qas=3, blocks=1, links=0)
+        product, sub = seeded.product, seeded.subcategory
+        self.assertCounters(product, 2, 6)
+
+        draft = QAItem.objects.create(subcategory=sub, question='Черновик')
+        self.assertCounters(product, 2, 6)
+        draft.status = QAStatus.PUBLISHED
+        draft.save()
+        self.assertCounters(product, 2, 7)
+
+        # перенос вопроса в подкатегорию другого продукта
+        other_sub = Subcategory.objects.exclude(product=product).first()
+        draft.subcategory = other_sub
+        draft.save()
+        self.assertCounters(product, 2, 6)
+        self.assertCounters(other_sub.product, 2, 7)
+
+        # выключение подкатегории убирает её вопросы из счётчика продукта
+        sub.refresh_from_db()
+        sub.is_active = False
+        sub.save()
+        self.assertCounters(product, 1, 3)
+
+        # устаревший экземпляр не затирает счётчик при save()
+        stale = Subcategory.objects.exclude(pk=sub.pk).filter(product=product).get()
+        QAItem.objects.create(subcategory=stale, question='Новый', status=QAStatus.PUBLISHED)
+        stale.name = 'Переименована'
+        stale.save()
+        self.assertCounters(product, 1, 4)
+
+        QAItem.objects.filter(subcategory=stale).first().delete()
+        self.assertCounters(product, 1, 3)
+        self.assertMatchesRecount()
+
+        stale.delete()
+        self.assertCounters(product, 0, 0)
+        self.assertMatchesRecount()
+
+    def test_dry_run_matches_recount(self):
+        seeded = seed_guide(products=1, subcategories=2, qas=2, blocks=1, links=0)
+        # разошёлся только счётчик подкатегории; продукт верен
+        Subcategory.objects.filter(pk=seeded.subcategory.pk).update(published_qa_count=99)
+        out = io.StringIO()
+        call_command('recount', dry_run=True, stdout=out)
+        self.assertIn('подкатегорий 1, продуктов 0', out.getvalue())
+        call_command('recount', stdout=out)
+        self.assertIn('Исправлено: подкатегорий 1, продуктов 0', out.getvalue())
+        self.assertCounters(seeded.product, 2, 4)
+
+    def test_recount_bumps_generations_of_fixed_rows(self):
+        seeded = seed_guide(products=2, subcategories=2, qas=2, blocks=1, links=0)
+        sub, product = seeded.subcategory, seeded.product
+        other = Product.objects.exclude(pk=product.pk).get()
+        scopes = [
+            (GenerationScope.GLOBAL, 0), (GenerationScope.NAV, 0), (GenerationScope.SUBCATEGORY, sub.pk),
+            (GenerationScope.PRODUCT, product.pk), (GenerationScope.PRODUCT, other.pk),
+        ]
+
+        before = ContentGeneration.objects.current_many(scopes)
+        call_command('recount', stdout=io.StringIO())
+        self.assertEqual(ContentGeneration.objects.current_many(scopes), before)  # нечего чинить
+
+        Subcategory.objects.filter(pk=sub.pk).update(published_qa_count=99)
+        call_command('recount', dry_run=True, stdout=io.StringIO())
+        self.assertEqual(ContentGeneration.objects.current_many(scopes), before)
+
+        call_command('recount', stdout=io.StringIO())
+        after = ContentGeneration.objects.current_many(scopes)
+        self.assertEqual(
+            [scope for scope in scopes if after[scope] > before[scope]],
+            [scope for scope in scopes if scope != (GenerationScope.PRODUCT, other.pk)],
+        )
+
+    def test_qa_product_follows_subcategory(self):
+        seeded = seed_guide(products=2, subcategories=1, qas=2, blocks=1, links=0)
+        sub = seeded.subcategory
+        self.assertEqual(seeded.qa.product_id, sub.product_id)
+
+        other = Product.objects.exclude(pk=sub.product_id).get()
+        sub.product = other
+        sub.slug = 'moved'
+        sub.save()
+        self.assertEqual(set(QAItem.objects.filter(subcategory=sub).values_list('product_id', flat=True)), {other.pk})
+        self.assertCounters(other, 2, 4)
+
+
+class ContentGenerationTests(TestCase):
+    """Поколения: перенос поднимает старые и новые области, каскадное удаление — без запросов на потомка."""
+
+    @staticmethod
+    def generations(*scopes):
+        return ContentGeneration.objects.current_many(list(scopes))
+
+    def assertBumped(self, before: dict):
+        after = self.generations(*before)
+        self.assertEqual([scope for scope in before if after[scope] <= before[scope]], [])
+
+    def test_moves_bump_old_and_new_scopes(self):
+        sub, target = create_subcategory('mail', qas=2, blocks=1), create_subcategory('vpn')
+        old_product, other = sub.product_id, target.product
+        qa_scopes = [(GenerationScope.QA, pk) for pk in sub.qa_items.values_list('pk', flat=True)]
+
+        before = self.generations((GenerationScope.PRODUCT, old_product), (GenerationScope.PRODUCT, other.pk), *qa_scopes)
+        sub.product = other
+        sub.slug = 'moved'
+        sub.save()
+        self.assertBumped(before)
+
+        qa = sub.qa_items.first()
+        before = self.generations(
+            (GenerationScope.SUBCATEGORY, sub.pk), (GenerationScope.PRODUCT, other.pk),
+            (GenerationScope.SUBCATEGORY, target.pk), (GenerationScope.PRODUCT, target.product_id),
+        )
+        qa.subcategory = target
+        qa.save()
+        self.assertBumped(before)
+
+    def test_cascade_delete_bumps_in_constant_queries(self):
+        def generation_queries(sub) -> int:
+            with CaptureQueriesContext(connection) as ctx:
+                sub.delete()
+            return sum('guide_contentgeneration' in q['sql'] for q in ctx.captured_queries)
+
+        small = create_subcategory('small', qas=1, blocks=1)
+        large = create_subcategory('large', qas=6, blocks=3)
+        before = self.generations((GenerationScope.PRODUCT, large.product_id))
+        self.assertEqual(generation_queries(small), generation_queries(large))
+        self.assertBumped(before)
+
+    def test_failed_delete_rolls_back_and_retry_bumps(self):
+        sub = create_subcategory('flaky', qas=2, blocks=1)
+        scopes = [(GenerationScope.SUBCATEGORY, sub.pk), (GenerationScope.PRODUCT, sub.product_id)]
+        before = self.generations(*scopes)
+
+        def fail(sender, **kwargs):
+            raise RuntimeError('хранилище недоступно')
+
+        # блоки удаляются первыми: pre_delete подкатегории уже прошёл, её post_delete — ещё нет
+        post_delete.connect(fail, sender=QABlock, dispatch_uid='test-failing-delete')
+        self.addCleanup(post_delete.disconnect, sender=QABlock, dispatch_uid='test-failing-delete')
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            sub.delete()
+        post_delete.disconnect(sender=QABlock, dispatch_uid='test-failing-delete')
+
+        self.assertTrue(QABlock.objects.filter(qa__subcategory=sub).exists())
+        self.assertEqual(self.generations(*scopes), before)
+
+        sub.delete()
+        self.assertFalse(QAItem.objects.filter(subcategory_id=scopes[0][1]).exists())
+        self.assertBumped(before)
+
+
+class ServeStaticTests(TestCase):
+    """Предсжатая статика: кодировка по Accept-Encoding с q-значениями, 304 по If-Modified-Since."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for suffix, data in (('', b'body{}'), ('.gz', b'gz'), ('.br', b'br')):
+            Path(tmp.name, 'app.css' + suffix).write_bytes(data)
+        static_root = override_settings(STATIC_ROOT=tmp.name)
+        static_root.enable()
+        self.addCleanup(static_root.disable)
+
+    def serve(self, **headers):
+        return serve_static(RequestFactory().get('/static/app.css', headers=headers), 'app.css')
+
+    def test_accept_encoding_q_values(self):
+        cases = {
+            'gzip, br': 'br',
+            'br;q=0, gzip': 'gzip',
+            'gzip;q=0.5, br;q=0.4': 'gzip',
+            'gzip;q=0': None,
+            '*': 'br',
+            '*;q=0, gzip': 'gzip',
+            'identity': None,
+        }
+        for header, expected in cases.items():
+            with self.subTest(header):
+                self.assertEqual(self.serve(accept_encoding=header).headers.get('Content-Encoding'), expected)
+
+    def test_not_modified(self):
+        last_modified = self.serve(accept_encoding='br')['Last-Modified']
+        response = self.serve(accept_encoding='br', if_modified_since=last_modified)
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+
+class MediaBlobTests(TestCase):
+    """Одинаковые загрузки — один файл и одна строка MediaBlob; удаление и замена снимают ссылку."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.media = Path(tmp.name)
+        media = override_settings(MEDIA_ROOT=tmp.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.qa = create_qa()
+
+    def add_image(self, data: bytes) -> QABlock:
+        return QABlock.objects.create(qa=self.qa, kind=BlockKind.IMAGE, media_file=ContentFile(data, name='pic.png'))
+
+    def test_dedup_and_release(self):
+        first, second = self.add_image(b'same'), self.add_image(b'same')
+        self.assertEqual(first.media_file.name, second.media_file.name)
+        self.assertEqual(len(list(self.media.rglob('*.png'))), 1)
+        self.assertEqual(MediaBlob.objects.get().ref_count, 2)
+
+        second.delete()
+        self.assertEqual(MediaBlob.objects.get().ref_count, 1)
+
+        old_name = first.media_file.name
+        first.media_file = ContentFile(b'other', name='pic.png')
+        first.save()
+        self.assertEqual(MediaBlob.objects.get(name=old_name).ref_count, 0)
+        self.assertEqual(MediaBlob.objects.get(name=first.media_file.name).ref_count, 1)
+
+    def orphan(self, data: bytes, age_hours: float) -> str:
+        """Блоб без ссылок (как после удаления блока) заданного возраста."""
+        name = qa_media_storage.save('pic.png', ContentFile(data))
+        MediaBlob.objects.create(name=name, digest=qa_media_storage.digest_from_name(name))
+        self.age(self.media / name, age_hours)
+        return name
+
+    @staticmethod
+    def age(path: Path, hours: float) -> None:
+        stamp = time.time() - hours * 3600
+        os.utime(path, (stamp, stamp))
+
+    def gc(self) -> None:
+        call_command('media_gc', verbosity=0, stdout=io.StringIO())
+
+    def test_gc_quarantine_restore_purge(self):
+        used = self.add_image(b'used').media_file.name
+        self.age(self.media / used, 48)
+        old, young = self.orphan(b'old', 48), self.orphan(b'young', 1)
+        quarantine = self.media / '_quarantine'
+
+        self.gc()
+        self.assertTrue((self.media / used).exists())  # ref_count > 0
+        self.assertTrue((self.media / young).exists())  # моложе --min-age-hours
+        self.assertTrue((quarantine / old).exists())
+        self.assertFalse((self.media / old).exists())
+
+        # снова нужен — возвращается из карантина
+        MediaBlob.objects.filter(name=old).update(ref_count=1)
+        self.gc()
+        self.assertTrue((self.media / old).exists())
+
+        # пролежал в карантине дольше срока — удаляется вместе со строкой MediaBlob
+        MediaBlob.objects.filter(name=old).update(ref_count=0)
+        self.age(self.media / old, 48)
+        self.gc()
+        self.age(quarantine / old, 8 * 24)
+        self.gc()
+        self.assertFalse((quarantine / old).exists())
+        self.assertFalse(MediaBlob.objects.filter(name=old).exists())
+
+    def test_reupload_refreshes_blob_mtime(self):
+        name = self.orphan(b'orphan', 48)
+        self.assertEqual(self.add_image(b'orphan').media_file.name, name)
+        self.assertGreater((self.media / name).stat().st_mtime, time.time() - 60)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class TwoTierCacheTests(TestCase):
+    """LRU процесса, single-flight get_or_set и смена версии/эпохи в ключах."""
+
+    def setUp(self):
+        cache.clear()
+        content_epoch()  # эпоха читается в этом потоке, до потоков single-flight
+        self.cache = TwoTierCache('test-cache')
+
+    def test_local_lru_evicts_least_recent_and_expired(self):
+        lru = LocalLRU(max_entries=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual((lru.get('a'), lru.get('c')), (1, 3))
+        self.assertIsNot(lru.get('b'), 2)
+        expired = LocalLRU(max_entries=2, ttl=-1)
+        expired.set('a', 1)
+        self.assertIsNot(expired.get('a'), 1)
+
+    def test_single_flight_within_process(self):
+        calls = []
+        started = threading.Event()
+
+        def produce():
+            calls.append(1)
+            started.set()
+            time.sleep(0.05)
+            return 'html'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.cache.get_or_set('qa', produce, version=1)))
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, ['html'] * 4)
+        self.assertEqual(len(calls), 1)
+
+    def test_locked_key_serves_previous_version_without_waiting(self):
+        self.cache.set('qa', 'old', version=1)
+        # другой воркер уже считает версию 2
+        cache.add(self.cache.make_key('qa', 2) + ':lock', 1)
+        self.cache.local.clear()
+        started = time.monotonic()
+        self.assertEqual(self.cache.get_or_set('qa', lambda: 'new', version=2), 'old')
+        self.assertLess(time.monotonic() - started, 0.5)
+        # устаревшее значение не кэшируется под новой версией
+        self.assertIsNone(self.cache.get('qa', version=2))
+        # без прошлого значения считаем сами, тоже не дожидаясь блокировки
+        self.assertEqual(self.cache.get_or_set('other', lambda: 'fresh', version=2), 'fresh')
+
+    def test_version_and_epoch_invalidate(self):
+        self.assertEqual(self.cache.get_or_set('qa', lambda: 'v1', version=1), 'v1')
+        self.assertEqual(self.cache.get_or_set('qa', lambda: 'v2', version=2), 'v2')
+        self.assertEqual(self.cache.get('qa', version=1), 'v1')
+        self.assertIn(f':e{content_epoch()}:', self.cache.make_key('qa', 1))
+        with mock.patch('guide.cache._epoch', content_epoch() + 1):
+            # пересозданная БД: те же номера поколений, но другие ключи
+            self.cache.local.clear()
+            self.assertIsNone(self.cache.get('qa', version=1))
+
+    def test_timeout_defaults_to_backend_setting(self):
+        def stored_timeouts(cache_obj, **kwargs) -> set:
+            with mock.patch.object(cache, 'set_many') as set_many:
+                cache_obj.set('qa', 'html', version=1, **kwargs)
+            return {call.args[1] for call in set_many.call_args_list}
+
+        self.assertEqual(stored_timeouts(self.cache), {DEFAULT_TIMEOUT})  # TIMEOUT бэкенда, а не «навсегда»
+        self.assertEqual(stored_timeouts(self.cache, timeout=None), {None})
+        self.assertEqual(stored_timeouts(self.cache, timeout=30), {30})
+        self.assertEqual(stored_timeouts(TwoTierCache('short', timeout=5)), {5})
+        self.assertEqual(stored_timeouts(TwoTierCache('forever', timeout=None)), {None})
+
+
+class MetricsRegistryTests(TestCase):
+    """Файлы метрик: по boot id процесса, в каталоге тестов, без файлов умерших воркеров."""
+
+    def setUp(self):
+        REGISTRY.flush()
+        self.directory = REGISTRY.directory()
+
+    def other_worker(self, name: str, requests: float, age: float = 0.0) -> Path:
+        path = self.directory / f'metrics-{name}.json'
+        path.write_text(json.dumps({REQUESTS.name: {'{"view": "other"}': requests}}), encoding='utf-8')
+        if age:
+            os.utime(path, (time.time() - age, time.time() - age))
+        self.addCleanup(path.unlink, missing_ok=True)
+        return path
+
+    def test_tests_write_to_temp_dir_keyed_by_boot_id(self):
+        self.assertNotEqual(self.directory, Path(settings.BASE_DIR) / 'metrics')
+        self.assertTrue(REGISTRY.path().exists())
+        self.assertNotEqual(REGISTRY.path().name, f'metrics-{os.getpid()}.json')
+
+    def test_collect_skips_and_removes_dead_worker_files(self):
+        alive = self.other_worker('1-alive', 2)
+        dead = self.other_worker('2-dead', 5, age=3600)
+        collected = REGISTRY.collect()[REQUESTS.name]
+        self.assertEqual(collected.get('{"view": "other"}'), 2)
+        self.assertTrue(alive.exists())
+        self.assertFalse(dead.exists())
+
+    def test_close_removes_own_file(self):
+        path = REGISTRY.path()
+        REGISTRY.close()
+        self.assertFalse(path.exists())
+        REQUESTS.inc(view='restart')
+        self.assertNotEqual(REGISTRY.path(), path)  # новый boot id после перезапуска сброса
+
+    def test_concurrent_inc_is_exact_and_flushed_with_sorted_label_keys(self):
+        def worker():
+            for _ in range(500):
+                REQUESTS.inc(view='race', status='200')
+                REQUESTS.inc(status='200', view='race')
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        REGISTRY.flush()
+        flushed = json.loads(REGISTRY.path().read_text(encoding='utf-8'))[REQUESTS.name]
+        self.assertEqual(flushed['{"status": "200", "view": "race"}'], 4000)
+        self.assertIn('giguide_requests_total{status="200",view="race"} 4000', REGISTRY.render())
+
+
+class SlowQueryLogTests(TestCase):
+    """Журнал медленных запросов: запись с параметрами и планом, отчёт manage.py slowqueries."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / 'slow.jsonl'
+        # порог ниже любого запроса: в журнал попадает всё
+        slow = override_settings(GUIDE_SLOW_QUERY_MS=1e-6, GUIDE_SLOW_QUERY_LOG=str(self.path))
+        slow.enable()
+        self.addCleanup(slow.disable)
+        # буфер процесса общий: записи теста дописываются в его журнал, а не в журнал проекта
+        self.addCleanup(get_slow_query_log().flush)
+        install_slow_query_log(connection)
+        self.addCleanup(connection.execute_wrappers.remove, _record_slow_query)
+
+    def test_capture_with_params_and_plan(self):
+        list(QAItem.objects.filter(pk__in=[1, 2], question='x'))
+        entry = recent_slow_queries()[-1]
+        self.assertIn('guide_qaitem', entry['sql'])
+        self.assertEqual(entry['params'], [1, 2, 'x'])
+        self.assertTrue(entry['caller'].startswith('tests.py:'))
+        self.assertTrue(entry['plan'])  # EXPLAIN QUERY PLAN выполнен
+
+    def test_mapping_params(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT %(first)s + %(second)s', {'first': 1, 'second': 2})
+        self.assertEqual(recent_slow_queries()[-1]['params'], {'first': 1, 'second': 2})
+
+    def test_report_groups_normalized_sql(self):
+        for pk in (1, 2, 3):
+            QAItem.objects.filter(pk=pk).exists()
+        get_slow_query_log().flush()
+        out = io.StringIO()
+        call_command('slowqueries', file=str(self.path), sort='count', limit=1, stdout=out)
+        report = out.getvalue()
+        self.assertIn('count=3', report)
+        self.assertIn('"guide_qaitem"."id" = ?', report)
+        self.assertIn('tests.py:', report)
+        self.assertIn('SEARCH', report)  # план по первичному ключу
+
+
+class ImportGuideTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        media = override_settings(MEDIA_ROOT=str(self.root / 'media'))
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def write(self, relative: str, text: str) -> Path:
+        path = self.root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding='utf-8')
+        return path
+
+    def test_markdown_tree_and_jsonl(self):
+        self.write('tree/mail/_index.md', '---\nname: Почта\n---\n')
+        self.write('tree/mail/setup/pic.png', 'png')
+        self.write('tree/mail/setup/01.md', (
+            '---\nstatus: published\n---\n# Как настроить почту?\n\nОткройте клиент.\n\n'
+            '## Шаги\n\n![Окно](pic.png "Настройки")\n\n```\n# не заголовок\n```\n'
+        ))
+        self.write('tree/mail/setup/02.md', '# Как сбросить пароль?\n\nЧерез портал.\n')
+        call_command('import_guide', str(self.root / 'tree'), verbosity=0, stdout=io.StringIO())
+
+        product = Product.objects.get(slug='mail')
+        self.assertEqual((product.name, product.subcategory_count, product.published_qa_count), ('Почта', 1, 1))
+        first, second = QAItem.objects.order_by('position')
+        self.assertEqual((first.question, first.position, second.position), ('Как настроить почту?', 1, 2))
+        self.assertEqual(first.product_id, product.pk)
+        self.assertEqual(second.status, QAStatus.DRAFT)
+        self.assertEqual(
+            list(first.blocks.values_list('kind', flat=True)),
+            [BlockKind.TEXT, BlockKind.HEADING, BlockKind.IMAGE, BlockKind.TEXT],
+        )
+        image = first.blocks.get(kind=BlockKind.IMAGE)
+        self.assertEqual(MediaBlob.objects.get(name=image.media_file.name).ref_count, 1)
+
+        lines = [
+            {'type': 'qa', 'product': 'mail', 'subcategory': 'setup', 'question': 'Третий?', 'status': 'published',
+             'blocks': [{'kind': 'text', 'text_md': 'Ответ'}]},
+            {'type': 'qa', 'product': 'mail', 'subcategory': 'setup', 'question': 'Сломанный',
+             'blocks': [{'kind': 'text'}]},
+        ]
+        self.write('dump.jsonl', '\n'.join(json.dumps(line, ensure_ascii=False) for line in lines) + '\n{oops\n')
+        out = io.StringIO()
+        call_command('import_guide', str(self.root / 'dump.jsonl'), stdout=out)
+        self.assertIn('Пропущено записей: 2', out.getvalue())
+
+        third = QAItem.objects.get(question='Третий?')
+        self.assertEqual(third.position, 3)
+        self.assertEqual(QABlock.objects.filter(qa=third).count(), 1)
+        product.refresh_from_db()
+        self.assertEqual(product.published_qa_count, 2)
+        # у каждого импортированного вопроса — исходный снимок в истории правок
+        self.assertEqual(
+            QARevision.objects.filter(number=1, is_snapshot=True).count(), QAItem.objects.count(),
+        )
+
+    def test_bumps_generations_of_touched_scopes(self):
+        existing = seed_guide(products=1, subcategories=1, qas=1, blocks=1, links=0)
+        untouched = seed_guide(products=1, subcategories=1, qas=1, blocks=1, links=0)
+        lines = [
+            {'type': 'qa', 'product': existing.product.slug, 'subcategory': existing.subcategory.slug,
+             'question': 'В старую подкатегорию?'},  # черновик: счётчики (и recount) не меняются
+            {'type': 'qa', 'product': 'vpn', 'subcategory': 'connect', 'question': 'В новую?'},
+        ]
+        self.write('dump.jsonl', '\n'.join(json.dumps(line, ensure_ascii=False) for line in lines) + '\n')
+        stale = [
+            (GenerationScope.PRODUCT, existing.product.pk), (GenerationScope.SUBCATEGORY, existing.subcategory.pk),
+            (GenerationScope.NAV, 0),
+        ]
+        other = [(GenerationScope.PRODUCT, untouched.product.pk), (GenerationScope.QA, untouched.qa.pk)]
+        before = ContentGeneration.objects.current_many(stale + other)
+
+        call_command('import_guide', str(self.root / 'dump.jsonl'), batch_size=1, verbosity=0, stdout=io.StringIO())
+
+        after = ContentGeneration.objects.current_many(stale + other)
+        self.assertEqual([scope for scope in stale if after[scope] <= before[scope]], [])
+        self.assertEqual([scope for scope in other if after[scope] != before[scope]], [])
+        new = QAItem.objects.select_related('subcategory').get(question='В новую?')
+        created = ContentGeneration.objects.current_many(new.content_scopes())
+        self.assertEqual([scope for scope, value in created.items() if not value], [])
+
+
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES)
+class ExportGuideTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seeded = seed_guide(products=2, subcategories=2, qas=3, blocks=2, links=0)
+        cls.staff = get_user_model().objects.create_user('editor', password='x', is_staff=True)
+
+    def export(self, **params) -> list[dict]:
+        response = self.client.get(reverse('guide:export'), params)
+        self.assertEqual(response.status_code, 200)
+        body = b''.join(response.streaming_content)
+        if params.get('gzip'):
+            body = gzip.decompress(body)
+        return [json.loads(line) for line in body.decode().splitlines()]
+
+    def test_export_is_staff_only(self):
+        self.assertEqual(self.client.get(reverse('guide:export')).status_code, 403)
+
+    def test_streams_all_records_and_resumes_from_cursor(self):
+        self.client.force_login(self.staff)
+        records = self.export(gzip='1')
+        kinds = [r['type'] for r in records]
+        self.assertEqual(kinds, ['product'] * 2 + ['subcategory'] * 4 + ['qa'] * 12)
+        qa = records[-1]
+        self.assertEqual(len(qa['blocks']), 2)
+        self.assertEqual(qa['product'], QAItem.objects.get(pk=qa['id']).product.slug)
+
+        rest = self.export(after=records[7]['cursor'])
+        self.assertEqual([r['cursor'] for r in rest], [r['cursor'] for r in records[8:]])
+        self.assertEqual(self.client.get(reverse('guide:export'), {'after': 'qa:x'}).status_code, 400)
+
+        out = io.StringIO()
+        call_command('export_guide', stdout=out)
+        self.assertEqual([json.loads(line)['cursor'] for line in out.getvalue().splitlines()],
+                         [r['cursor'] for r in records])
+
+    async def test_asgi_export_streams_async(self):
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get(reverse('guide:export'))
+        self.assertTrue(response.is_async)
+        lines = [line async for line in response.streaming_content]
+        self.assertEqual(len(lines), 18)
+
+    def snapshot(self) -> dict:
+        """Порядок и флаги всего контента в терминах slug'ов и текста, без первичных ключей."""
+        return {
+            'products': list(Product.objects.values_list('slug', 'position', 'is_active')),
+            'subcategories': list(Subcategory.objects.values_list('product__slug', 'slug', 'position', 'is_active')),
+            'qas': list(QAItem.objects.values_list('subcategory__slug', 'question', 'status', 'position', 'is_active')),
+            'blocks': list(
+                QABlock.objects.order_by('qa__question', 'position', 'id')
+                .values_list('qa__question', 'kind', 'heading_text', 'text_md', 'is_active')
+            ),
+        }
+
+    def test_round_trip_into_empty_database(self):
+        # порядок, отличный от порядка первичных ключей, и выключенные объекты на каждом уровне
+        Product.objects.filter(pk=self.seeded.product.pk).update(position=5, is_active=False)
+        Subcategory.objects.filter(pk=self.seeded.subcategory.pk).update(position=7, is_active=False)
+        QAItem.objects.filter(pk=self.seeded.qa.pk).update(position=9, is_active=False, status=QAStatus.DRAFT)
+        QABlock.objects.filter(pk=self.seeded.qa.blocks.order_by('position').first().pk).update(
+            position=3, is_active=False,
+        )
+        expected = self.snapshot()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            dump = Path(tmp, 'guide.jsonl.gz')
+            call_command('export_guide', '-o', str(dump), stderr=io.StringIO())
+            Product.objects.all().delete()
+            self.assertFalse(QAItem.objects.exists())
+            call_command('import_guide', str(dump), verbosity=0, stdout=io.StringIO())
+
+        self.assertEqual(self.snapshot(), expected)
+
+
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES)
+class StaticSiteTests(TestCase):
+    def test_incremental_build(self):
+        seeded = seed_guide(products=1, subcategories=2, qas=2, blocks=1, links=1)
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp)
+            builder = StaticSiteBuilder(output, host='testserver')
+            first = builder.build()
+            self.assertFalse(first.failed)
+            self.assertEqual(first.rendered, first.total)
+            detail = output / reverse('guide:qa_detail', kwargs=seeded.url_kwargs()).lstrip('/') / 'index.html'
+            self.assertTrue(detail.exists())
+            self.assertTrue((output / 'index.html.gz').exists())
+            self.assertTrue((output / 'sitemap.xml').exists())
+
+            self.assertEqual(builder.build().rendered, 0)
+
+            # правка вопроса меняет поколение продукта: все страницы продукта, главная и sitemap
+            qa = seeded.qa
+            qa.question = 'Изменённый вопрос'
+            qa.save()
+            second = builder.build()
+            self.assertEqual(second.rendered, 4 + 2 + 1 + 2)
+            self.assertEqual(second.unchanged, 2)
+            self.assertIn('Изменённый вопрос', detail.read_text(encoding='utf-8'))
+
+            qa.delete()
+            third = builder.build()
+            self.assertEqual(third.removed, 1)
+            self.assertFalse(detail.exists())
+
+
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES)
+class AdminChangelistTests(TestCase):
+    """Число запросов списков админки не растёт с числом строк, полного COUNT(*) нет."""
+    changelists = ('guide_subcategory', 'guide_qaitem', 'guide_qablock', 'guide_mediablob')
+
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_superuser('admin', password='x'))
+
+    def changelist_queries(self) -> dict[str, list[str]]:
+        result = {}
+        for name in self.changelists:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse(f'admin:{name}_changelist'))
+            self.assertEqual(response.status_code, 200, name)
+            result[name] = [q['sql'] for q in ctx.captured_queries]
+        return result
+
+    def test_query_count_does_not_grow_with_rows(self):
+        seed_guide(products=1, subcategories=2, qas=2, blocks=2, links=0)
+        small = self.changelist_queries()
+        seed_guide(products=3, subcategories=5, qas=6, blocks=4, links=0)
+        large = self.changelist_queries()
+        for name in self.changelists:
+            self.assertEqual(len(small[name]), len(large[name]), name)
+            full_counts = [sql for sql in large[name] if sql.startswith('SELECT COUNT(*)') and 'LIMIT' not in sql]
+            self.assertEqual(full_counts, [], name)
+
+    def test_numeric_search_and_autocomplete(self):
+        seeded = seed_guide(products=1, subcategories=2, qas=2, blocks=1, links=0)
+        response = self.client.get(reverse('admin:guide_qaitem_changelist'), {'q': str(seeded.qa.pk)})
+        self.assertEqual(list(response.context['cl'].result_list), [seeded.qa])
+        for name, obj in (('qaitem', seeded.qa), ('subcategory', seeded.subcategory)):
+            self.assertEqual(self.client.get(reverse(f'admin:guide_{name}_change', args=[obj.pk])).status_code, 200)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('admin:autocomplete'), {
+                'app_label': 'guide', 'model_name': 'qaitem', 'field_name': 'subcategory',
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertLessEqual(len(ctx.captured_queries), 5)
+
+    def test_numeric_search_also_matches_prefix(self):
+        seeded = seed_guide(products=1, subcategories=1, qas=2, blocks=1, links=0)
+        two_fa = QAItem.objects.create(
+            subcategory=seeded.subcategory, question=f'{seeded.qa.pk}FA: как включить вход по коду?',
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('admin:guide_qaitem_changelist'), {'q': str(seeded.qa.pk)})
+        self.assertCountEqual(response.context['cl'].result_list, [seeded.qa, two_fa])
+
+        search = next(q['sql'] for q in ctx.captured_queries if 'LIKE' in q['sql'] and 'LIMIT' in q['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + search)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('nocase', plan)
+        self.assertIn('PRIMARY KEY', plan)
+
+    def test_text_search_is_indexed_prefix(self):
+        seeded = seed_guide(products=1, subcategories=1, qas=2, blocks=1, links=0)
+        for name, term, expected in (
+            ('qaitem', seeded.qa.question[:-1], [seeded.qa]),
+            ('qablock', 'Шаг', list(QABlock.objects.filter(kind=BlockKind.HEADING))),
+        ):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse(f'admin:guide_{name}_changelist'), {'q': term})
+            self.assertCountEqual(response.context['cl'].result_list, expected, name)
+            search = next(q['sql'] for q in ctx.captured_queries if 'LIKE' in q['sql'] and 'LIMIT' in q['sql'])
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + search)
+                plan = ' '.join(row[-1] for row in cursor.fetchall())
+            self.assertIn('nocase', plan, name)
+
+
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES)
+class AdminBulkActionTests(TestCase):
+    """Действия над вопросами: число запросов не зависит от выделения, счётчики сходятся с recount."""
+
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_superuser('admin', password='x'))
+        seed_guide(products=2, subcategories=2, qas=0, blocks=0, links=0)
+        self.subs = list(Subcategory.objects.order_by('id'))
+        for sub in self.subs[:2]:
+            for i in range(6):
+                QAItem.objects.create(subcategory=sub, question=f'{sub.name} {i}', status=QAStatus.PUBLISHED)
+
+    def act(self, action: str, ids, **extra):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('admin:guide_qaitem_changelist'), {
+                'action': action, '_selected_action': [str(pk) for pk in ids], **extra,
+            })
+        self.assertEqual(response.status_code, 302)
+        return len(ctx.captured_queries)
+
+    def assert_counters_consistent(self):
+        out = io.StringIO()
+        call_command('recount', '--dry-run', stdout=out)
+        self.assertIn('подкатегорий 0, продуктов 0', out.getvalue())
+
+    def test_status_and_activation(self):
+        ids = list(QAItem.objects.order_by('id').values_list('pk', flat=True))
+        small = self.act('unpublish', ids[:2])
+        large = self.act('unpublish', ids)
+        self.assertEqual(small, large)
+        self.assertFalse(QAItem.objects.filter(status=QAStatus.PUBLISHED).exists())
+        self.assertEqual(Product.objects.get(pk=self.subs[0].product_id).published_qa_count, 0)
+        self.assert_counters_consistent()
+
+        self.act('publish', ids[:3])
+        self.act('deactivate', ids[:1])
+        self.assertEqual(Subcategory.objects.get(pk=self.subs[0].pk).published_qa_count, 2)
+        self.assert_counters_consistent()
+
+    def test_move_appends_in_order(self):
+        source, target = self.subs[0], self.subs[2]  # target — подкатегория другого продукта
+        QAItem.objects.create(subcategory=target, question='Уже был', status=QAStatus.PUBLISHED)
+        moving = list(QAItem.objects.filter(subcategory=source).order_by('position', 'id').values_list('pk', flat=True))
+        before = ContentGeneration.objects.current(GenerationScope.SUBCATEGORY, source.pk)
+
+        self.act('move_to_subcategory', moving[::-1], target_subcategory=str(target.pk))
+
+        moved = list(QAItem.objects.filter(subcategory=target).order_by('position').values_list('pk', 'position'))
+        self.assertEqual([pk for pk, _ in moved][1:], moving)
+        self.assertEqual([pos for _, pos in moved], list(range(1, len(moving) + 2)))
+        self.assertFalse(QAItem.objects.filter(pk__in=moving).exclude(product_id=target.product_id).exists())
+        self.assertEqual(Subcategory.objects.get(pk=target.pk).published_qa_count, len(moving) + 1)
+        self.assertGreater(ContentGeneration.objects.current(GenerationScope.SUBCATEGORY, source.pk), before)
+        self.assert_counters_consistent()
+
+    def test_move_requires_target(self):
+        qa = QAItem.objects.first()
+        self.act('move_to_subcategory', [qa.pk], target_subcategory='')
+        self.assertEqual(QAItem.objects.get(pk=qa.pk).subcategory_id, qa.subcategory_id)
+
+    def test_actions_and_admin_edits_record_revisions(self):
+        ids = list(QAItem.objects.order_by('id').values_list('pk', flat=True))
+        self.act('archive', ids[:2])
+        self.act('archive', ids[:2])  # состояние не изменилось — новых ревизий нет
+        history = list(QARevision.objects.filter(qa_id=ids[0]).order_by('number').values_list('number', 'author'))
+        admin_user = get_user_model().objects.get(username='admin')
+        self.assertEqual(history, [(1, None), (2, admin_user.pk)])  # исходное состояние и правка
+        state = QARevision.objects.states(ids[0], [1, 2])
+        self.assertEqual((state[1]['status'], state[2]['status']), (QAStatus.PUBLISHED, QAStatus.ARCHIVED))
+        self.assertFalse(QARevision.objects.filter(qa_id__in=ids[2:]).exists())
+
+        qa = QAItem.objects.get(pk=ids[2])
+        response = self.client.post(reverse('admin:guide_qaitem_change', args=[qa.pk]), {
+            'subcategory': qa.subcategory_id, 'question': 'Новый вопрос', 'status': qa.status,
+            'is_active': 'on', 'position': qa.position,
+            'blocks-TOTAL_FORMS': '0', 'blocks-INITIAL_FORMS': '0',
+        })
+        self.assertEqual(response.status_code, 302)
+        latest = QARevision.objects.filter(qa=qa).order_by('-number').first()
+        self.assertEqual((latest.number, latest.author_id), (2, admin_user.pk))
+        self.assertEqual(QARevision.objects.states(qa.pk, [2])[2]['question'], 'Новый вопрос')
+
+
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES, GUIDE_REVISION_SNAPSHOT_EVERY=3)
+class RevisionHistoryTests(TestCase):
+    """Снимок раз в N ревизий, между ними — дельты; любая ревизия восстанавливается из короткой цепочки."""
+
+    def setUp(self):
+        self.seeded = seed_guide(products=1, subcategories=1, qas=1, blocks=3, links=0)
+        self.qa = self.seeded.qa
+        self.text_block = self.qa.blocks.filter(kind=BlockKind.TEXT).first()
+        self.text_block.text_md = '\n'.join(f'Строка {i} длинного ответа про настройку.' for i in range(200))
+        self.text_block.save()
+
+    def edit(self, i: int) -> QARevision:
+        lines = self.text_block.text_md.split('\n')
+        lines[i] = f'Правка {i}'
+        self.text_block.text_md = '\n'.join(lines)
+        self.text_block.save()
+        return QARevision.objects.record(self.qa.pk)
+
+    def test_codec_roundtrip(self):
+        old = QARevision.objects.current_state(self.qa.pk)
+        new = {**old, 'question': 'Новый вопрос', 'blocks': old['blocks'][1:] + [{'kind': 'text', 'text_md': ''}]}
+        new_tokens = state_tokens(new)
+        self.assertEqual(apply_delta(state_tokens(old), make_delta(state_tokens(old), new_tokens)), new_tokens)
+        self.assertEqual(tokens_state(new_tokens)['blocks'][-1]['text_md'], '')
+        self.assertEqual(tokens_state(state_tokens(old)), old)
+
+    def test_snapshots_deltas_and_reconstruction(self):
+        first = QARevision.objects.record(self.qa.pk)
+        self.assertIsNone(QARevision.objects.record(self.qa.pk))  # без изменений ревизии нет
+        expected = {1: QARevision.objects.current_state(self.qa.pk)}
+        for number in range(2, 8):
+            self.edit(number)
+            expected[number] = QARevision.objects.current_state(self.qa.pk)
+
+        revisions = list(QARevision.objects.filter(qa=self.qa).order_by('number'))
+        self.assertEqual([r.number for r in revisions if r.is_snapshot], [1, 4, 7])
+        self.assertTrue(all(r.size < first.size / 10 for r in revisions if not r.is_snapshot))
+
+        with CaptureQueriesContext(connection) as ctx:
+            states = QARevision.objects.states(self.qa.pk, [5, 6])
+        self.assertEqual(len(ctx.captured_queries), 2)  # снимок №4 и две дельты одной цепочки
+        self.assertEqual(QARevision.objects.states(self.qa.pk, expected), expected)
+        self.assertEqual(states, {5: expected[5], 6: expected[6]})
+
+    def test_record_many_matches_record(self):
+        other = QAItem.objects.create(subcategory=self.qa.subcategory, question='Второй')
+        self.assertEqual(QARevision.objects.record_many([self.qa.pk, other.pk]), 2)
+        self.assertEqual(QARevision.objects.record_many([self.qa.pk, other.pk]), 0)
+        for number in range(2, 6):
+            self.text_block.text_md += f'\nДобавка {number}'
+            self.text_block.save()
+            other.question = f'Второй, правка {number}'
+            other.save()
+            with CaptureQueriesContext(connection) as ctx:
+                QARevision.objects.record_many([self.qa.pk, other.pk])
+            self.assertLessEqual(len(ctx.captured_queries), 6)  # не растёт с числом вопросов и ревизий
+            for qa_id in (self.qa.pk, other.pk):
+                self.assertEqual(
+                    QARevision.objects.states(qa_id, [number])[number], QARevision.objects.current_state(qa_id),
+                )
+        self.assertEqual(
+            list(QARevision.objects.filter(qa=self.qa, is_snapshot=True).values_list('number', flat=True)), [1, 4],
+        )
+
+    def test_history_view(self):
+        QARevision.objects.record(self.qa.pk)
+        self.edit(10)
+        url = reverse('guide:qa_history', kwargs=self.seeded.url_kwargs())
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(get_user_model().objects.create_user('editor', password='x', is_staff=True))
+        response = self.client.get(url)
+        self.assertContains(response, 'Ревизия 1 → 2')
+        self.assertEqual(response.context['rows'].count(('add', 'Правка 10')), 1)
+        self.assertEqual(self.client.get(url, {'to': 9}).status_code, 404)
+
+
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES)
+class JsonApiTests(TestCase):
+    """API: проекции полей, курсоры без пропусков и повторов, ETag/304 до основного запроса."""
+
+    def setUp(self):
+        self.seeded = seed_guide(products=3, subcategories=2, qas=3, blocks=2, links=0)
+
+    def get(self, name: str, params: dict | None = None, **kwargs):
+        return self.client.get(reverse(f'guide:{name}', kwargs=kwargs), params or {})
+
+    def test_keyset_pages_and_fields(self):
+        kwargs = {'product_slug': self.seeded.product.slug, 'sub_slug': self.seeded.subcategory.slug}
+        seen, after = [], None
+        while True:
+            params = {'limit': 2, 'fields': 'id,question', **({'after': after} if after else {})}
+            body = self.get('api_qa_list', params, **kwargs).json()
+            self.assertTrue(all(set(item) == {'id', 'question'} for item in body['data']))
+            seen += [item['id'] for item in body['data']]
+            if not (after := body['next']):
+                break
+        expected = QAItem.objects.filter(subcategory=self.seeded.subcategory).order_by('position', 'id')
+        self.assertEqual(seen, list(expected.values_list('pk', flat=True)))
+
+        products = self.get('api_products', {'fields': 'slug,subcategory_count'}).json()['data']
+        first = Product.objects.order_by('position', 'id').first()
+        self.assertEqual(products[0], {'slug': first.slug, 'subcategory_count': 2})
+        self.assertEqual(self.get('api_products', {'fields': 'slug,secret'}).status_code, 400)
+        self.assertEqual(self.get('api_products', {'after': 'мусор'}).status_code, 400)
+        self.assertEqual(self.get('api_subcategories', product_slug='nope').status_code, 404)
+
+    def test_etag_not_modified(self):
+        url = reverse('guide:api_products')
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(ctx.captured_queries), 1)  # только поколения
+        self.assertNotEqual(self.client.get(url, {'fields': 'id'})['ETag'], etag)
+
+        Product.objects.filter(pk=self.seeded.product.pk).update(name='Новое имя')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)  # update() без поколения
+        self.seeded.product.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detail_blocks_and_search(self):
+        qa = self.seeded.qa
+        data = self.get('api_qa_detail', qa_id=qa.pk).json()['data']
+        self.assertEqual(data['product'], self.seeded.product.slug)
+        kinds = list(qa.blocks.order_by('position', 'id').values_list('kind', flat=True))
+        self.assertEqual([b['kind'] for b in data['blocks']], kinds)
+        text = data['blocks'][kinds.index(BlockKind.TEXT)]
+        self.assertIn('<strong>настройки</strong>', text['html'])
+
+        QAItem.objects.bulk_set_status([qa.pk], QAStatus.DRAFT)
+        self.assertEqual(self.get('api_qa_detail', qa_id=qa.pk).status_code, 404)
+
+        body = self.get('api_search', {'q': 'КАК НАСТРОИТЬ 1.1', 'limit': 1}).json()
+        self.assertEqual(body['total'], 2)  # черновик не ищется
+        rest = self.get('api_search', {'q': 'КАК НАСТРОИТЬ 1.1', 'after': body['next']}).json()
+        self.assertEqual(rest['next'], None)
+        self.assertEqual(len({item['id'] for item in body['data'] + rest['data']}), 2)
+
+
+class RecordingReplicaRouter(ReplicaRouter):
+    """Роутер с одной (несуществующей) репликой: запоминает решения, а читать даёт из основной БД."""
+
+    def __init__(self):
+        self.replicas = ['replica1']
+        self.routed: list[tuple[str, str]] = []
+
+    def db_for_read(self, model, **hints):
+        self.routed.append((model._meta.label, super().db_for_read(model, **hints)))
+        return PRIMARY
+
+    def aliases(self, label: str) -> set[str]:
+        return {alias for routed_label, alias in self.routed if routed_label == label}
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class ReplicaRouterTests(TransactionTestCase):
+    """
+    Из реплик читается только контент публичных вьюх; всё остальное — из основной БД.
+    TransactionTestCase: внутри atomic() обычного TestCase роутер всегда выбирает основную БД.
+    """
+
+    def setUp(self):
+        self.qa = create_qa()
+        self.router = RecordingReplicaRouter()
+        patcher = mock.patch.object(router, 'routers', [self.router])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def qa_list_url(self) -> str:
+        sub = self.qa.subcategory
+        return reverse('guide:qa_list', kwargs={'product_slug': sub.product.slug, 'sub_slug': sub.slug})
+
+    def test_reads_primary_by_default(self):
+        self.assertEqual(self.router.db_for_read(QAItem), PRIMARY)
+        with replica_reads():
+            self.router.db_for_read(QAItem)
+            self.router.db_for_read(get_user_model())
+        self.assertEqual(self.router.aliases('guide.QAItem'), {PRIMARY, 'replica1'})
+        self.assertEqual(self.router.aliases('auth.User'), {PRIMARY})
+
+    def test_atomic_and_pin_use_primary(self):
+        with replica_reads():
+            with transaction.atomic():
+                self.router.db_for_read(QAItem)
+            with pin_primary():
+                self.router.db_for_read(QAItem)
+        self.assertEqual(self.router.aliases('guide.QAItem'), {PRIMARY})
+
+    def test_public_view_reads_content_from_replica(self):
+        self.client.force_login(get_user_model().objects.create_user('reader', password='x'))
+        self.router.routed.clear()
+        self.assertEqual(self.client.get(self.qa_list_url()).status_code, 200)
+        self.assertEqual(self.router.aliases('guide.Subcategory'), {'replica1'})
+        # сессия и пользователь — из основной БД, даже когда шаблон обращается к user внутри вьюхи
+        self.assertEqual(self.router.aliases('sessions.Session'), {PRIMARY})
+        self.assertEqual(self.router.aliases('auth.User'), {PRIMARY})
+
+    def test_sticky_cookie_pins_primary(self):
+        self.client.cookies[STICKY_COOKIE] = '1'
+        self.assertEqual(self.client.get(self.qa_list_url()).status_code, 200)
+        self.assertEqual({alias for _, alias in self.router.routed}, {PRIMARY})
+
+    def test_management_commands_read_primary(self):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            call_command('media_gc', '--dry-run', stdout=io.StringIO())
+        self.assertTrue(self.router.routed)
+        self.assertEqual({alias for _, alias in self.router.routed}, {PRIMARY})
+
+
+@override_settings(CACHES=TEST_CACHES)
+class WarmupTests(TransactionTestCase):
+    """
+    Прогрев воркера: отчёт по шагам и переключатель GUIDE_WARMUP в giguide/asgi.py и wsgi.py.
+    TransactionTestCase: запросы прогрева идут из отдельного потока и видят только закоммиченные данные.
+    """
+
+    def test_report_covers_all_steps(self):
+        seed_guide(products=2, subcategories=1, qas=2, blocks=1, links=2)
+        expected_queries = len(menu_links_qs()) + len(products_for_home()) + len(quick_faq_groups())
+        with self.assertLogs('guide.warmup', level='INFO') as logs:
+            report = warm_up(started=time.perf_counter())
+
+        self.assertEqual(list(report['steps']), [name for name, _ in WARMUP_STEPS])
+        steps = {name: step['items'] for name, step in report['steps'].items()}
+        self.assertEqual(steps['renderers'], 1)
+        self.assertGreater(steps['templates'], 0)
+        self.assertGreater(steps['urls'], 0)
+        self.assertEqual(steps['queries'], expected_queries)
+        self.assertGreaterEqual(report['startup_ms'], report['warmup_ms'])
+        self.assertTrue(any('worker ready' in line for line in logs.output))
+
+    def test_failed_step_is_reported_without_raising(self):
+        def broken() -> int:
+            raise RuntimeError('boom')
+
+        with mock.patch('guide.warmup.STEPS', [('broken', broken)]), self.assertLogs('guide.warmup', level='INFO'):
+            report = warm_up()
+
+        self.assertIsNone(report['steps']['broken']['items'])
+        self.assertNotIn('startup_ms', report)
+
+    def test_startup_warm_up_respects_setting(self):
+        with override_settings(GUIDE_WARMUP=False), mock.patch('guide.warmup.warm_up') as warm:
+            self.assertIsNone(warm_up_on_startup(started=1.0))
+        warm.assert_not_called()
+
+        with override_settings(GUIDE_WARMUP=True), mock.patch('guide.warmup.warm_up') as warm:
+            self.assertIs(warm_up_on_startup(started=1.0), warm.return_value)
+        warm.assert_called_once_with(started=1.0)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class BenchGeneratorTests(TestCase):
+    """Генератор синтетической базы для manage.py bench и вывод сравнения прогонов."""
+
+    @staticmethod
+    def snapshot() -> list[tuple]:
+        # heading_anchor содержит pk вопроса — его не сравниваем
+        order = ('qa__subcategory__product__slug', 'qa__subcategory__slug', 'qa__position', 'position')
+        return list(QABlock.objects.order_by(*order).values_list(
+            'qa__subcategory__product__slug', 'qa__subcategory__slug', 'qa__subcategory__is_active',
+            'qa__position', 'qa__question', 'qa__status', 'position', 'kind', 'heading_text', 'text_md',
+            'media_url', 'caption',
+        ))
+
+    def regenerate(self, qas: int, seed: int) -> dict[str, int]:
+        NavLink.objects.all().delete()
+        Product.objects.all().delete()
+        return generate_knowledge_base(qas, seed=seed)
+
+    def test_deterministic_per_seed(self):
+        self.regenerate(40, seed=7)
+        first = self.snapshot()
+        self.regenerate(40, seed=7)
+        self.assertEqual(self.snapshot(), first)
+        self.regenerate(40, seed=8)
+        self.assertNotEqual(self.snapshot(), first)
+
+    def test_creates_requested_counts(self):
+        counts = generate_knowledge_base(60, seed=1)
+
+        self.assertEqual(counts['qas'], 60)
+        self.assertEqual(counts, {
+            'products': Product.objects.count(),
+            'subcategories': Subcategory.objects.count(),
+            'qas': QAItem.objects.count(),
+            'blocks': QABlock.objects.count(),
+        })
+        self.assertEqual(NavLink.objects.count(), 5)
+        # счётчики пересчитаны: опубликованные вопросы видны в денормализованных полях
+        published = QAItem.objects.filter(status=QAStatus.PUBLISHED).count()
+        self.assertEqual(sum(Subcategory.objects.values_list('published_qa_count', flat=True)), published)
+
+    def test_parse_scale(self):
+        self.assertEqual(parse_scale('10K'), 10_000)
+        self.assertEqual(parse_scale('250'), 250)
+        with self.assertRaises(ValueError):
+            parse_scale('много')
+
+    def test_compare_output(self):
+        results = {
+            'home': {'p50_ms': 3.0, 'p90_ms': 4.0, 'p99_ms': 5.0, 'queries_median': 4, 'errors': 0},
+            'search': {'p50_ms': 8.0, 'p90_ms': 9.0, 'p99_ms': 10.0, 'queries_median': 2, 'errors': 1},
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'baseline.json'
+            path.write_text(json.dumps({'meta': {}, 'results': {
+                'home': {'p50_ms': 2.0, 'p99_ms': 10.0},
+                'search': {'p50_ms': 0.0, 'p99_ms': 10.0},
+            }}), encoding='utf-8')
+            out = io.StringIO()
+            command = BenchCommand(stdout=out)
+            command._print(results, command._load(str(path)))
+
+            with self.assertRaises(CommandError):
+                command._load(str(Path(tmp) / 'missing.json'))
+
+        header, home, search = out.getvalue().splitlines()
+        self.assertEqual(header.split()[-2:], ['Δp50', 'Δp99'])
+        self.assertEqual(home.split()[-2:], ['+50%', '-50%'])
+        self.assertEqual(search.split()[-2:], ['—', '+0%'])
+
+        out = io.StringIO()
+        BenchCommand(stdout=out)._print(results, None)
+        self.assertNotIn('Δp50', out.getvalue())
+
+
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES, GUIDE_QUERY_BUDGET_STRICT=False)
+class LoadTestCommandTests(TransactionTestCase):
+    """
+    manage.py loadtest: разбор --mix и короткий прогон.
+    Прогон идёт в тестовой БД вместо отдельной bench-базы; TransactionTestCase — воркеры в своих потоках.
+    """
+
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix('detail=5, list ,home=0'), {'detail': 5, 'list': 1})
+        self.assertEqual(set(parse_mix(LOADTEST_DEFAULT_MIX)), {'detail', 'list', 'home', 'search', 'edit', 'add'})
+
+    def test_invalid_mix(self):
+        for mix, message in (
+            ('detail=5,delete=1', 'Неизвестная операция "delete"'),
+            ('detail=много', 'Вес операции должен быть целым'),
+            ('detail=0,home=0', 'Пустая смесь операций'),
+        ):
+            with self.subTest(mix=mix), self.assertRaisesMessage(CommandError, message):
+                call_command('loadtest', '--mix', mix, stdout=io.StringIO())
+
+    def test_smoke_run_writes_report(self):
+        environment = mock.patch(
+            'guide.management.commands.loadtest.bench_environment',
+            lambda qas, keepdb=False: contextlib.nullcontext(),
+        )
+        for mode in ('wsgi', 'asgi'):
+            with self.subTest(mode=mode), tempfile.TemporaryDirectory() as tmp, environment:
+                output = Path(tmp) / 'loadtest.json'
+                call_command(
+                    'loadtest', '--scale', '30', '--mode', mode, '--workers', '2', '--seconds', '0.3',
+                    '--mix', 'detail=3,list=1,home=1', '--output', str(output), stdout=io.StringIO(),
+                )
+                report = json.loads(output.read_text(encoding='utf-8'))
+
+            self.assertEqual(report['meta']['mode'], mode)
+            self.assertEqual(report['meta']['mix'], {'detail': 3, 'list': 1, 'home': 1})
+            self.assertLessEqual(set(report['operations']), {'detail', 'list', 'home'})
+            self.assertGreater(report['overall']['count'], 0)
+            self.assertEqual(report['overall']['errors'], 0)
+            self.assertEqual(report['errors'], {})
+
+
+@override_settings(CACHES=TEST_CACHES, STORAGES=TEST_STORAGES, GUIDE_QUERY_BUDGET_STRICT=False)
+@unittest.skipUnless(connection.vendor == 'sqlite', 'команда сравнивает настройки SQLite')
+class BenchSqliteCommandTests(TransactionTestCase):
+    """manage.py bench_sqlite: короткий прогон всех вариантов во временной тестовой БД."""
+
+    def test_smoke_run_writes_report(self):
+        options = dict(connection.settings_dict['OPTIONS'])
+        environment = mock.patch(
+            'guide.management.commands.bench_sqlite.bench_environment',
+            lambda qas, keepdb=False: contextlib.nullcontext(),
+        )
+        # как в bench_environment: предупреждения о бюджете запросов на каждое сохранение не нужны
+        quiet = mock.patch.object(logging.getLogger('guide.queries'), 'disabled', True)
+        with tempfile.TemporaryDirectory() as tmp, environment, quiet:
+            output = Path(tmp) / 'bench_sqlite.json'
+            call_command(
+                'bench_sqlite', '--scale', '30', '--workers', '2', '--seconds', '0.1',
+                '--mix', 'detail=3,edit=1', '--output', str(output), stdout=io.StringIO(),
+            )
+            report = json.loads(output.read_text(encoding='utf-8'))
+
+        self.assertEqual(report['meta']['mix'], {'detail': 3, 'edit': 1})
+        self.assertEqual(
+            list(report['variants']), ['sqlite', '+pragmas', '+persistent', '+immediate', 'sqlite-prod'],
+        )
+        for name, variant in report['variants'].items():
+            with self.subTest(variant=name):
+                self.assertGreater(variant['reads'] + variant['writes'], 0)
+                # конкурентные записи могут упираться в блокировку — других сбоев быть не должно
+                self.assertEqual(variant['errors'], variant['locked'])
+        # настройки соединения после прогона возвращены
+        self.assertEqual(connection.settings_dict['OPTIONS'], options)
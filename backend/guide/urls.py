@@ -4,10 +4,18 @@ from guide.views.create_view import ProductCreateView, SubcategoryCreateView, QA
 from guide.views.detail_view import QaDetailView
 from django.views.generic import TemplateView
 from guide.views.list_view import SubcategoriesListView, QaListView
-from guide.views.system import RobotsView, SitemapView
+from guide.views.system import GuideExportView, RobotsView, SitemapView
+from guide.views.api import (
+    ProductsApiView,
+    QADetailApiView,
+    QAListApiView,
+    SearchApiView,
+    SubcategoriesApiView,
+)
 
 from guide.views.search import SearchView
 from guide.views.update_view import QAItemUpdateView
+from guide.views.history_view import QAHistoryView
 
 app_name = 'guide'
 
@@ -42,7 +50,27 @@ urlpatterns = [
         QAItemUpdateView.as_view(),
         name='qa_edit'
     ),
+    path(
+        '<slug:product_slug>/<slug:sub_slug>/<int:qa_id>/history/',
+        QAHistoryView.as_view(),
+        name='qa_history'
+    ),
     path('search/', SearchView.as_view(), name='search'),
     path('robots.txt', RobotsView.as_view(), name='robots'),
     path('sitemap.xml', SitemapView.as_view(), name='sitemap'),
+    path('export/guide.jsonl', GuideExportView.as_view(), name='export'),
+    # read-only JSON API (guide/api.py)
+    path('api/v1/products/', ProductsApiView.as_view(), name='api_products'),
+    path(
+        'api/v1/products/<slug:product_slug>/subcategories/',
+        SubcategoriesApiView.as_view(),
+        name='api_subcategories'
+    ),
+    path(
+        'api/v1/products/<slug:product_slug>/<slug:sub_slug>/qa/',
+        QAListApiView.as_view(),
+        name='api_qa_list'
+    ),
+    path('api/v1/qa/<int:qa_id>/', QADetailApiView.as_view(), name='api_qa_detail'),
+    path('api/v1/search/', SearchApiView.as_view(), name='api_search'),
 ]
@@ -0,0 +1,17 @@
+from __future__ import annotations
+from typing import Any
+
+from django.db.models import QuerySet
+
+from guide.utils.timing import timed
+
+
+async def alist(qs: QuerySet[Any], timing: str | None = None) -> list[Any]:
+    """
+    Асинхронно вычисляет queryset в список (async ORM, без блокировки event loop).
+    timing — секция Server-Timing: запрос ленивого селектора выполняется здесь, а не при его вызове.
+    """
+    if timing is None:
+        return [obj async for obj in qs]
+    with timed(timing):
+        return [obj async for obj in qs]
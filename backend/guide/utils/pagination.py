@@ -1,5 +1,6 @@
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.http import HttpRequest
+from django.utils.functional import cached_property
 
 
 def paginate(request: HttpRequest, qs, per_page: int = 12, page_param: str = 'page'):
@@ -12,3 +13,16 @@ def paginate(request: HttpRequest, qs, per_page: int = 12, page_param: str = 'pa
     except EmptyPage:
         page_obj = paginator.page(paginator.num_pages)
     return page_obj
+
+
+class CappedCountPaginator(Paginator):
+    """
+    Пагинатор для больших таблиц: считает строки не дальше count_limit
+    (SELECT COUNT(*) FROM (... LIMIT n)), а не полным COUNT(*) на каждой странице.
+    Страницы дальше лимита недоступны — в таких случаях нужен фильтр или поиск.
+    """
+    count_limit = 10_000
+
+    @cached_property
+    def count(self) -> int:
+        return self.object_list[:self.count_limit].count()
@@ -1,9 +1,15 @@
 from django.utils.text import slugify as dj_slugify
 from unidecode import unidecode
 
+
+def slugify_value(value: str) -> str:
+    """Латинский slug из любой строки (кириллица транслитерируется)."""
+    return dj_slugify(unidecode(value)) or 'item'
+
+
 def make_unique_slug(instance, value: str, field_name: str = 'slug') -> str:
     Model = instance.__class__
-    base = dj_slugify(unidecode(value)) or 'item'
+    base = slugify_value(value)
     max_len = getattr(Model._meta.get_field(field_name), 'max_length', None)
     if max_len:
         base = base[:max_len]
@@ -0,0 +1,70 @@
+from __future__ import annotations
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator
+
+
+class Timings:
+    """Накопитель времени по секциям одного запроса: name -> [секунды, вызовы]."""
+    __slots__ = ('sections',)
+
+    def __init__(self):
+        self.sections: dict[str, list] = {}
+
+    def add(self, name: str, duration: float) -> None:
+        section = self.sections.get(name)
+        if section is None:
+            self.sections[name] = [duration, 1]
+        else:
+            section[0] += duration
+            section[1] += 1
+
+
+# None — замеры выключены (вне ServerTimingMiddleware стоимость = одно чтение ContextVar)
+_current_timings: ContextVar[Timings | None] = ContextVar('guide_timings', default=None)
+
+
+def current_timings() -> Timings | None:
+    return _current_timings.get()
+
+
+@contextmanager
+def collect_timings() -> Iterator[Timings]:
+    timings = Timings()
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def timed_selector(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Декоратор для селекторов, возвращающих уже вычисленные данные: время попадёт в секцию sel.<имя функции>.
+    Ленивый QuerySet так не замерить (вызов лишь строит запрос) — его время пишут там, где он вычисляется.
+    """
+    name = f'sel.{func.__name__}'
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if _current_timings.get() is None:
+            return func(*args, **kwargs)
+        with timed(name):
+            return func(*args, **kwargs)
+
+    return wrapper
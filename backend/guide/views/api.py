@@ -0,0 +1,168 @@
+from __future__ import annotations
+from bisect import bisect_right
+
+from django.http import HttpRequest, HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.http import require_GET
+
+from guide.api import (
+    DEFAULT_FIELDS,
+    GLOBAL,
+    PRODUCT_FIELDS,
+    QA_DETAIL_FIELDS,
+    QA_FIELDS,
+    SUBCATEGORY_FIELDS,
+    ApiError,
+    columns_for,
+    dumps,
+    encode_cursor,
+    decode_cursor,
+    etag_matches,
+    keyset_page,
+    make_etag,
+    parse_fields,
+    parse_limit,
+    published_qas,
+    qa_blocks,
+    search_ids,
+    serialize,
+)
+from guide.models import ContentGeneration, GenerationScope, Product, QAItem, QAStatus, Subcategory
+from guide.views.base import UseReplicaDBMixin
+
+JSON = 'application/json; charset=utf-8'
+
+
+@method_decorator(require_GET, name='dispatch')
+class ApiView(UseReplicaDBMixin, View):
+    """
+    Ресурс API: scopes() находит объект и области поколений ответа (дёшево, до основного запроса),
+    payload() собирает данные. Совпал If-None-Match — 304 без payload().
+    """
+
+    def scopes(self, request: HttpRequest, **kwargs) -> list[tuple[str, int]]:
+        return [GLOBAL]
+
+    def payload(self, request: HttpRequest, generations: dict, **kwargs) -> dict:
+        """
+        Тело ответа ресурса; обязателен в каждом подклассе. generations — поколения областей
+        из scopes() (по ним же кэшируются части ответа), kwargs — параметры маршрута.
+        Ошибки запроса — ApiError, get() превратит её в JSON с нужным статусом.
+        """
+        raise NotImplementedError(f'{type(self).__name__} должен определить payload()')
+
+    def get(self, request: HttpRequest, **kwargs) -> HttpResponse:
+        try:
+            generations = ContentGeneration.objects.current_many(self.scopes(request, **kwargs))
+            etag = make_etag(generations, request.path, sorted(request.GET.lists()))
+            if etag_matches(request.headers.get('If-None-Match'), etag):
+                response = HttpResponseNotModified()
+            else:
+                response = HttpResponse(dumps(self.payload(request, generations, **kwargs)), content_type=JSON)
+        except ApiError as exc:
+            return JsonResponse({'error': str(exc)}, status=exc.status, json_dumps_params={'ensure_ascii': False})
+        response['ETag'] = etag
+        # кэшировать можно, но перед использованием — сверка по ETag
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+    @staticmethod
+    def fields(request: HttpRequest, spec: dict, resource: str) -> tuple[str, ...]:
+        return parse_fields(request.GET.get('fields'), spec, DEFAULT_FIELDS[resource])
+
+    @staticmethod
+    def page(request: HttpRequest, qs, spec: dict, resource: str) -> dict:
+        return keyset_page(
+            qs, ApiView.fields(request, spec, resource), spec,
+            order=('position', 'id'),
+            after=request.GET.get('after'),
+            limit=parse_limit(request.GET.get('limit')),
+        )
+
+
+class ProductsApiView(ApiView):
+    def payload(self, request, generations, **kwargs):
+        return self.page(request, Product.objects.filter(is_active=True), PRODUCT_FIELDS, 'product')
+
+
+class SubcategoriesApiView(ApiView):
+    def scopes(self, request, product_slug: str):
+        self.product_id = (
+            Product.objects.filter(slug=product_slug, is_active=True).values_list('pk', flat=True).first()
+        )
+        if self.product_id is None:
+            raise ApiError('Продукт не найден', status=404)
+        # подкатегории и счётчики их вопросов меняют поколение продукта
+        return [(GenerationScope.PRODUCT, self.product_id)]
+
+    def payload(self, request, generations, **kwargs):
+        qs = Subcategory.objects.filter(product_id=self.product_id, is_active=True)
+        return self.page(request, qs, SUBCATEGORY_FIELDS, 'subcategory')
+
+
+class QAListApiView(ApiView):
+    def scopes(self, request, product_slug: str, sub_slug: str):
+        found = (
+            Subcategory.objects.filter(
+                slug=sub_slug, is_active=True, product__slug=product_slug, product__is_active=True,
+            )
+            .values_list('pk', 'product_id').first()
+        )
+        if found is None:
+            raise ApiError('Подкатегория не найдена', status=404)
+        self.subcategory_id, product_id = found
+        return [(GenerationScope.SUBCATEGORY, self.subcategory_id), (GenerationScope.PRODUCT, product_id)]
+
+    def payload(self, request, generations, **kwargs):
+        # условие частичного индекса idx_qaitems_pub_subcat_pos
+        qs = QAItem.objects.filter(subcategory_id=self.subcategory_id, is_active=True, status=QAStatus.PUBLISHED)
+        return self.page(request, qs, QA_FIELDS, 'qa')
+
+
+class QADetailApiView(ApiView):
+    def scopes(self, request, qa_id: int):
+        self.names = self.fields(request, QA_DETAIL_FIELDS, 'qa_detail')
+        self.row = (
+            published_qas().filter(pk=qa_id)
+            .values(*columns_for(self.names, QA_DETAIL_FIELDS, ('id', 'subcategory_id', 'product_id')))
+            .first()
+        )
+        if self.row is None:
+            raise ApiError('Вопрос не найден', status=404)
+        return [
+            (GenerationScope.QA, qa_id),
+            (GenerationScope.SUBCATEGORY, self.row['subcategory_id']),
+            (GenerationScope.PRODUCT, self.row['product_id']),
+        ]
+
+    def payload(self, request, generations, qa_id: int):
+        if 'blocks' in self.names:
+            self.row['blocks'] = qa_blocks(qa_id, generations[(GenerationScope.QA, qa_id)])
+        return {'data': serialize([self.row], self.names, QA_DETAIL_FIELDS)[0]}
+
+
+class SearchApiView(ApiView):
+    """?q= — вопросы по возрастанию id; курсор — последний id страницы."""
+
+    def payload(self, request, generations, **kwargs):
+        names = self.fields(request, QA_FIELDS, 'search')
+        limit = parse_limit(request.GET.get('limit'))
+        cursor = decode_cursor(request.GET.get('after'), 1)
+        query = (request.GET.get('q') or '').strip()
+        if not query:
+            return {'data': [], 'next': None, 'total': 0}
+
+        ids = search_ids(query, generations[GLOBAL])
+        start = bisect_right(ids, cursor[0]) if cursor else 0
+        page_ids = ids[start:start + limit]
+        rows = list(
+            published_qas().filter(pk__in=page_ids).order_by('id')
+            .values(*columns_for(names, QA_FIELDS, ('id',)))
+        )
+        more = start + limit < len(ids)
+        return {
+            'data': serialize(rows, names, QA_FIELDS),
+            'next': encode_cursor((page_ids[-1],)) if more else None,
+            'total': len(ids),
+        }
@@ -1,10 +1,13 @@
 from __future__ import annotations
 from typing import Any, Dict
+from asgiref.sync import sync_to_async
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import render
 from django.views import View
 
+from guide.routers import pin_primary, replica_reads
 from guide.utils.context import common_context
+from guide.utils.timing import timed
 
 
 class BaseView(View):
@@ -22,4 +25,40 @@ class BaseView(View):
         return common_context(**base)
 
     def render(self, request: HttpRequest, **context: Any) -> HttpResponse:
-        return render(request, self.get_template_names()[0], self.get_context_data(request, **context))
+        with timed('template'):
+            return render(request, self.get_template_names()[0], self.get_context_data(request, **context))
+
+    async def arender(self, request: HttpRequest, **context: Any) -> HttpResponse:
+        """
+        Рендер для async-вьюх: шаблонизатор синхронный, поэтому уходит в поток.
+
+        Async-вьюхи портала освобождают цикл событий на время запросов к БД, но не распараллеливают их:
+        async ORM и sync_to_async (thread_sensitive) выполняют всё по очереди в одном sync-потоке
+        запроса и на одном соединении. Поэтому запросы идут последовательно, без asyncio.gather.
+        """
+        return await sync_to_async(self.render)(request, **context)
+
+
+class UsePrimaryDBMixin:
+    """Редакторские вьюхи читают только из основной БД (форма сразу видит свежие данные)."""
+
+    def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        with pin_primary():
+            return super().dispatch(request, *args, **kwargs)
+
+
+class UseReplicaDBMixin:
+    """
+    Публичные вьюхи чтения: контент справочника можно брать из реплик.
+    Остальное (сессии, пользователи) и всё под pin_primary() по-прежнему читается из основной БД.
+    """
+
+    def dispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        if self.view_is_async:
+            return self._adispatch(request, *args, **kwargs)
+        with replica_reads():
+            return super().dispatch(request, *args, **kwargs)
+
+    async def _adispatch(self, request: HttpRequest, *args: Any, **kwargs: Any) -> HttpResponse:
+        with replica_reads():
+            return await super().dispatch(request, *args, **kwargs)
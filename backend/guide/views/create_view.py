@@ -3,18 +3,18 @@ from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse
 
-from guide.views.base import BaseView
+from guide.views.base import BaseView, UsePrimaryDBMixin
 from guide.forms import (
     QAItemForm,
     QABlockFormSet,
     ProductForm,
     SubcategoryForm,
 )
-from guide.models import Product, Subcategory, QAItem
+from guide.models import Product, Subcategory, QAItem, QARevision
 from guide.utils.slug import make_unique_slug
 
 
-class SubcategoryCreateView(LoginRequiredMixin, UserPassesTestMixin, BaseView):
+class SubcategoryCreateView(UsePrimaryDBMixin, LoginRequiredMixin, UserPassesTestMixin, BaseView):
     template_name = 'pages/subcategory_form.html'
 
     def test_func(self):
@@ -60,7 +60,7 @@ class SubcategoryCreateView(LoginRequiredMixin, UserPassesTestMixin, BaseView):
         ))
 
 
-class ProductCreateView(LoginRequiredMixin, UserPassesTestMixin, BaseView):
+class ProductCreateView(UsePrimaryDBMixin, LoginRequiredMixin, UserPassesTestMixin, BaseView):
     template_name = 'pages/product_form.html'
 
     def test_func(self):
@@ -83,7 +83,7 @@ class ProductCreateView(LoginRequiredMixin, UserPassesTestMixin, BaseView):
         return self.render(request, form=form)
 
 
-class QAItemCreateView(LoginRequiredMixin, UserPassesTestMixin, BaseView):
+class QAItemCreateView(UsePrimaryDBMixin, LoginRequiredMixin, UserPassesTestMixin, BaseView):
     """
     Создание QAItem (вопрос-ответ) с наборами QABlock.
     Требует URL с product_slug и sub_slug, чтобы зафиксировать подкатегорию.
@@ -128,7 +128,7 @@ class QAItemCreateView(LoginRequiredMixin, UserPassesTestMixin, BaseView):
 
         with transaction.atomic():
             qa: QAItem = form.save(commit=False)
-            qa.subcategory_id = subcategory.id
+            qa.subcategory = subcategory
             qa.save()
             ordered_forms = getattr(formset, 'ordered_forms', None) or formset.forms
             position = 1
@@ -140,6 +140,7 @@ class QAItemCreateView(LoginRequiredMixin, UserPassesTestMixin, BaseView):
                 block.position = position
                 position += 1
                 block.save()
+            QARevision.objects.record(qa.pk, author=request.user)
         return redirect(reverse(
             'guide:qa_detail',
             kwargs={
@@ -1,31 +1,50 @@
-from django.shortcuts import get_object_or_404
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
 
-from guide.views.base import BaseView
-from guide.models import QAItem
+from guide.cache import qa_article_cache
+from guide.views.base import BaseView, UseReplicaDBMixin
+from guide.models import ContentGeneration, GenerationScope, QAItem
 from guide.selectors.nav import menu_links_qs
+from guide.utils.aio import alist
 
 
-class QaDetailView(BaseView):
+class QaDetailView(UseReplicaDBMixin, BaseView):
     template_name = 'pages/qa_detail.html'
+    article_template_name = 'partials/_qa_article.html'
 
-    def get(self, request, product_slug, sub_slug, qa_id):
-        qa = get_object_or_404(
-            QAItem,
+    def get_article_html(self, qa: QAItem) -> str:
+        """
+        HTML блоков ответа. Рендерится один раз на все воркеры и кэшируется
+        до следующего изменения вопроса или его блоков (версия ключа — поколение 'qa').
+        """
+        def produce() -> str:
+            blocks = list(qa.blocks.order_by('position', 'id'))
+            return str(render_to_string(self.article_template_name, {'blocks': blocks}))
+
+        version = ContentGeneration.objects.current(GenerationScope.QA, qa.pk)
+        return mark_safe(qa_article_cache.get_or_set(str(qa.pk), produce, version=version))
+
+    async def get(self, request, product_slug, sub_slug, qa_id):
+        qa = await aget_object_or_404(
+            QAItem.objects.select_related('subcategory', 'product'),
             pk=qa_id,
             subcategory__slug=sub_slug,
-            subcategory__product__slug=product_slug,
+            product__slug=product_slug,
             is_active=True
         )
 
-        blocks = qa.blocks.order_by('position', 'id')
-        all_questions = qa.subcategory.qa_items.order_by('position', 'id')
+        article = await sync_to_async(self.get_article_html)(qa)
+        all_questions = await alist(qa.subcategory.qa_items.order_by('position', 'id'))
+        top_links = await alist(menu_links_qs(), 'sel.menu_links_qs')
 
-        return self.render(
+        return await self.arender(
             request,
             qa=qa,
-            product=qa.subcategory.product,
+            product=qa.product,
             subcategory=qa.subcategory,
-            blocks=blocks,
+            article=article,
             all_questions=all_questions,
-            top_links=menu_links_qs(),
+            top_links=top_links,
         )
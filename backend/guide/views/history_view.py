@@ -0,0 +1,59 @@
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+
+from guide.models import QAItem, QARevision
+from guide.revisions import diff_rows
+from .base import BaseView, UsePrimaryDBMixin
+
+HISTORY_LIMIT = 100
+
+
+def _number(value: str | None) -> int | None:
+    return int(value) if value and value.isdigit() else None
+
+
+class QAHistoryView(UsePrimaryDBMixin, LoginRequiredMixin, UserPassesTestMixin, BaseView):
+    """
+    История правок вопроса и diff между двумя ревизиями (?from=&to=, по умолчанию — последняя правка).
+    Каждая ревизия восстанавливается из ближайшего снимка и не более N дельт.
+    """
+    template_name = 'pages/qa_history.html'
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, product_slug: str, sub_slug: str, qa_id: int):
+        qa = get_object_or_404(
+            QAItem.objects.select_related('subcategory', 'product').only(
+                'question', 'subcategory__slug', 'subcategory__name', 'product__slug', 'product__name',
+            ),
+            pk=qa_id, subcategory__slug=sub_slug, product__slug=product_slug,
+        )
+        history = list(
+            QARevision.objects.filter(qa=qa).order_by('-number')
+            .values('number', 'is_snapshot', 'size', 'created_at', 'author__username')[:HISTORY_LIMIT]
+        )
+
+        new = old = None
+        rows = []
+        if history:
+            new = _number(request.GET.get('to')) or history[0]['number']
+            old = _number(request.GET.get('from'))
+            if old is None:
+                old = new - 1
+            states = QARevision.objects.states(qa.pk, {old, new} - {0})
+            if new not in states or (old and old not in states):
+                raise Http404('Нет такой ревизии')
+            rows = diff_rows(states.get(old), states[new])
+
+        return self.render(
+            request,
+            qa=qa,
+            subcategory=qa.subcategory,
+            product=qa.product,
+            history=history,
+            old=old,
+            new=new,
+            rows=rows,
+        )
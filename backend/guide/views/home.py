@@ -1,19 +1,25 @@
 from __future__ import annotations
+
+from asgiref.sync import sync_to_async
 from django.http import HttpRequest, HttpResponse
-from guide.views.base import BaseView
+from guide.views.base import BaseView, UseReplicaDBMixin
 from guide.selectors.products import products_for_home
 from guide.selectors.qa import quick_faq_groups
 from guide.selectors.nav import menu_links_qs
+from guide.utils.aio import alist
 
 
-class HomeView(BaseView):
+class HomeView(UseReplicaDBMixin, BaseView):
     template_name = 'pages/home.html'
 
-    def get(self, request: HttpRequest) -> HttpResponse:
-        return self.render(
+    async def get(self, request: HttpRequest) -> HttpResponse:
+        products = await alist(products_for_home(limit=12), 'sel.products_for_home')
+        quick_faqs = await sync_to_async(quick_faq_groups)(max_products=12, per_product=4)
+        top_links = await alist(menu_links_qs(), 'sel.menu_links_qs')
+        return await self.arender(
             request,
             title='Главная — Портал ИТ Газпром Инвест',
-            products=products_for_home(limit=12),
-            quick_faqs=quick_faq_groups(max_products=12, per_product=4),
-            top_links=menu_links_qs(),
+            products=products,
+            quick_faqs=quick_faqs,
+            top_links=top_links,
         )
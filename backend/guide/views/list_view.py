@@ -1,21 +1,27 @@
 from __future__ import annotations
+
 from django.http import HttpRequest, HttpResponse
-from django.shortcuts import get_object_or_404
+from django.shortcuts import aget_object_or_404, get_object_or_404
 
-from guide.views.base import BaseView
-from guide.selectors.subcategories import subcategories_by_product_slug
+from guide.views.base import BaseView, UseReplicaDBMixin
+from guide.selectors.subcategories import subcategories_for_product
 from guide.selectors.qa import build_quick_faqs_for_product
 from guide.models import Product, Subcategory, QAItem
 from guide.selectors.nav import menu_links_qs
+from guide.utils.aio import alist
+from guide.utils.timing import timed
 
 
-class SubcategoriesListView(BaseView):
+class SubcategoriesListView(UseReplicaDBMixin, BaseView):
     template_name = 'pages/list_subcategories.html'
 
     def get(self, request: HttpRequest, product_slug: str) -> HttpResponse:
         product = get_object_or_404(Product, slug=product_slug, is_active=True)
-        subcategories = subcategories_by_product_slug(product_slug)
+        with timed('sel.subcategories_for_product'):
+            subcategories = list(subcategories_for_product(product))
         quick_faqs = build_quick_faqs_for_product(product)
+        with timed('sel.menu_links_qs'):
+            top_links = list(menu_links_qs())
 
         return self.render(
             request,
@@ -23,31 +29,32 @@ class SubcategoriesListView(BaseView):
             product=product,
             subcategories=subcategories,
             quick_faqs=quick_faqs,
-            top_links=menu_links_qs(),
+            top_links=top_links,
         )
 
 
-class QaListView(BaseView):
+class QaListView(UseReplicaDBMixin, BaseView):
     template_name = 'pages/list_qa.html'
 
-    def get(self, request, product_slug: str, sub_slug: str):
-        subcategory = get_object_or_404(
-            Subcategory,
+    async def get(self, request, product_slug: str, sub_slug: str):
+        subcategory = await aget_object_or_404(
+            Subcategory.objects.select_related('product'),
             slug=sub_slug,
             product__slug=product_slug,
             is_active=True
         )
 
-        qas = QAItem.objects.filter(
+        qas = await alist(QAItem.objects.filter(
             subcategory=subcategory,
             is_active=True
-        ).order_by('position', 'id')
+        ).order_by('position', 'id'))
+        top_links = await alist(menu_links_qs(), 'sel.menu_links_qs')
 
-        return self.render(
+        return await self.arender(
             request,
             title=subcategory.name,
             subcategory=subcategory,
             qas=qas,
             product=subcategory.product,
-            top_links=menu_links_qs(),
+            top_links=top_links,
         )
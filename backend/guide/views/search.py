@@ -1,12 +1,14 @@
 from itertools import groupby
 
+from asgiref.sync import sync_to_async
 from django.db.models import Q, Prefetch
 from django.http import HttpRequest, HttpResponse
 
-from guide.views.base import BaseView
+from guide.views.base import BaseView, UseReplicaDBMixin
 from guide.utils.pagination import paginate
 from guide.selectors.nav import menu_links_qs
 from guide.models import QAItem, QABlock
+from guide.utils.aio import alist
 from giguide import settings
 
 
@@ -15,15 +17,30 @@ def _cf(s: str | None) -> str:
 
 
 
-class SearchView(BaseView):
+class SearchView(UseReplicaDBMixin, BaseView):
     template_name = 'pages/search_results.html'
     per_page = 12
 
-    def get(self, request: HttpRequest) -> HttpResponse:
+    async def get(self, request: HttpRequest) -> HttpResponse:
         q = (request.GET.get('q') or '').strip()
         if len(q) < 1:
-            return self.render(request, title='Поиск', q=q, groups=[], total=0, page_obj=None)
+            return await self.arender(request, title='Поиск', q=q, groups=[], total=0, page_obj=None)
 
+        groups, total, page_obj = await sync_to_async(self.search)(request, q)
+        top_links = await alist(menu_links_qs(), 'sel.menu_links_qs')
+
+        return await self.arender(
+            request,
+            title='Поиск',
+            q=q,
+            groups=groups,
+            total=total,
+            page_obj=page_obj,
+            top_links=top_links,
+        )
+
+    def search(self, request: HttpRequest, q: str):
+        """Поиск целиком синхронный (и разный для SQLite/прочих БД) — выполняется в потоке."""
         q_cf = _cf(q)
         is_sqlite = 'sqlite' in settings.DATABASES['default']['ENGINE']
 
@@ -35,15 +52,15 @@ class SearchView(BaseView):
                 | Q(blocks__caption__icontains=q)
                 | Q(blocks__alt_text__icontains=q)
             )
-            .select_related('subcategory', 'subcategory__product')
+            .select_related('subcategory', 'product')
             .distinct()
-            .order_by('subcategory__product__name', 'subcategory__name', 'question')
+            .order_by('product__name', 'subcategory__name', 'question')
         )
 
         if is_sqlite:
             base_qs = (
                 QAItem.objects.all()
-                .select_related('subcategory', 'subcategory__product')
+                .select_related('subcategory', 'product')
                 .prefetch_related(
                     Prefetch(
                         'blocks',
@@ -70,7 +87,7 @@ class SearchView(BaseView):
                 ):
                     matched.append(qa)
 
-            matched.sort(key=lambda x: (x.subcategory.product.name, x.subcategory.name, x.question))
+            matched.sort(key=lambda x: (x.product.name, x.subcategory.name, x.question))
 
             total = len(matched)
             page_obj = paginate(request, matched, per_page=self.per_page)
@@ -81,15 +98,7 @@ class SearchView(BaseView):
             items = list(page_obj.object_list)
 
         groups = []
-        for (product, subcategory), chunk in groupby(items, key=lambda x: (x.subcategory.product, x.subcategory)):
+        for (product, subcategory), chunk in groupby(items, key=lambda x: (x.product, x.subcategory)):
             groups.append({'product': product, 'subcategory': subcategory, 'qas': list(chunk)})
 
-        return self.render(
-            request,
-            title='Поиск',
-            q=q,
-            groups=groups,
-            total=total,
-            page_obj=page_obj,
-            top_links=menu_links_qs(),
-        )
+        return groups, total, page_obj
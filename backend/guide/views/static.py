@@ -0,0 +1,76 @@
+from __future__ import annotations
+import mimetypes
+import os
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpRequest, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views import static
+from django.views.static import was_modified_since
+
+# порядок важен: br жмёт лучше, gzip понимают все
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+
+def accepted_encodings(header: str) -> list[str]:
+    """
+    Кодировки из PRECOMPRESSED, которые клиент принимает (q > 0), по убыванию q.
+    'gzip;q=0' — явный отказ; '*' распространяется на не перечисленные кодировки.
+    """
+    weights: dict[str, float] = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+    default = weights.get('*', 0.0)
+    ranked = [(weights.get(encoding, default), encoding) for encoding, _ in PRECOMPRESSED]
+    # sorted() устойчива: при равном q остаётся порядок PRECOMPRESSED (br раньше gzip)
+    return [encoding for q, encoding in sorted(ranked, key=lambda item: -item[0]) if q > 0]
+
+
+def serve_static(request: HttpRequest, path: str) -> HttpResponse:
+    """
+    Раздача собранной статики без nginx (DJANGO_SERVE_STATIC=True).
+    Если клиент умеет br/gzip и рядом лежит заранее сжатый файл — отдаём его.
+    """
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except ValueError:
+        raise Http404(path)
+
+    suffixes = dict(PRECOMPRESSED)
+    for encoding in accepted_encodings(request.headers.get('Accept-Encoding', '')):
+        suffix = suffixes[encoding]
+        if os.path.isfile(full_path + suffix):
+            stat = os.stat(full_path + suffix)
+            # как static.serve: If-Modified-Since без изменений — 304 без тела
+            if not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime):
+                response = HttpResponseNotModified()
+                response.headers['Last-Modified'] = http_date(stat.st_mtime)
+                break
+            content_type, _ = mimetypes.guess_type(full_path)
+            response = FileResponse(
+                open(full_path + suffix, 'rb'),
+                content_type=content_type or 'application/octet-stream',
+                filename=os.path.basename(full_path),
+            )
+            response.headers['Content-Encoding'] = encoding
+            response.headers['Last-Modified'] = http_date(stat.st_mtime)
+            break
+    else:
+        response = static.serve(request, path, document_root=settings.STATIC_ROOT)
+
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
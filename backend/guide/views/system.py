@@ -1,8 +1,15 @@
 from __future__ import annotations
-from django.http import HttpRequest, HttpResponse
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpRequest, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.views import View
 from django.views.decorators.http import require_GET
 from django.utils.decorators import method_decorator
+from guide.exporter import ExportCursorError, aexport_lines, agzip_lines, export_lines, gzip_lines, parse_cursor
+from guide.metrics import REGISTRY
 from guide.views.base import BaseView
+from guide.selectors.sitemap import sitemap_entries
 
 
 @method_decorator(require_GET, name='dispatch')
@@ -20,6 +27,56 @@ class SitemapView(BaseView):
     template_name = 'system/sitemap.xml'
 
     def get(self, request: HttpRequest) -> HttpResponse:
-        resp = self.render(request)
+        resp = self.render(
+            request,
+            entries=sitemap_entries(),
+            base_url=request.build_absolute_uri('/').rstrip('/'),
+        )
         resp['Content-Type'] = 'application/xml; charset=utf-8'
         return resp
+
+
+@method_decorator(require_GET, name='dispatch')
+class MetricsView(View):
+    """Метрики в текстовом формате Prometheus: только staff или адреса из GUIDE_METRICS_ALLOWED_IPS."""
+
+    def get(self, request: HttpRequest) -> HttpResponse:
+        allowed_ip = request.META.get('REMOTE_ADDR') in settings.GUIDE_METRICS_ALLOWED_IPS
+        if not (allowed_ip or request.user.is_staff):
+            raise PermissionDenied
+        return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@method_decorator(require_GET, name='dispatch')
+class GuideExportView(View):
+    """
+    Выгрузка всей базы знаний в JSONL потоком (только staff).
+    ?after=qa:123 — продолжить после курсора, ?gzip=1 — сжатый файл.
+    """
+
+    def get(self, request: HttpRequest) -> HttpResponse:
+        if not request.user.is_staff:
+            raise PermissionDenied
+        cursor = request.GET.get('after') or None
+        try:
+            parse_cursor(cursor)
+        except ExportCursorError as exc:
+            return HttpResponseBadRequest(str(exc))
+        compress = request.GET.get('gzip') in ('1', 'true')
+
+        # под ASGI — асинхронный итератор, иначе Django соберёт синхронный в список целиком
+        if isinstance(request, ASGIRequest):
+            content = aexport_lines(cursor)
+            content = agzip_lines(content) if compress else content
+        else:
+            content = export_lines(cursor)
+            content = gzip_lines(content) if compress else content
+
+        filename = 'guide.jsonl.gz' if compress else 'guide.jsonl'
+        response = StreamingHttpResponse(
+            content,
+            content_type='application/gzip' if compress else 'application/x-ndjson; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['Cache-Control'] = 'no-store'
+        return response
@@ -4,12 +4,12 @@ from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse
 
-from guide.models import Product, Subcategory, QAItem, QABlock
+from guide.models import Product, Subcategory, QAItem, QABlock, QARevision
 from guide.forms import QAItemForm, QABlockFormSet
-from .base import BaseView
+from .base import BaseView, UsePrimaryDBMixin
 
 
-class QAItemUpdateView(LoginRequiredMixin, UserPassesTestMixin, BaseView):
+class QAItemUpdateView(UsePrimaryDBMixin, LoginRequiredMixin, UserPassesTestMixin, BaseView):
     template_name = 'pages/qa_item_form.html'  # используем тот же шаблон, что и при создании
 
     def test_func(self):
@@ -56,9 +56,11 @@ class QAItemUpdateView(LoginRequiredMixin, UserPassesTestMixin, BaseView):
             )
 
         with transaction.atomic():
+            # исходное состояние, если его ещё нет в истории (вопрос старше истории или правился в админке)
+            QARevision.objects.record(qa.pk)
             qa = form.save(commit=False)
             # подкатегорию не даём менять из формы:
-            qa.subcategory_id = subcategory.id
+            qa.subcategory = subcategory
             qa.save()
 
             # Сохраняем блоки в DOM-порядке, пропуская удалённые
@@ -79,6 +81,8 @@ class QAItemUpdateView(LoginRequiredMixin, UserPassesTestMixin, BaseView):
                 if f.cleaned_data.get('DELETE') and f.instance.pk:
                     f.instance.delete()
 
+            QARevision.objects.record(qa.pk, author=request.user)
+
         return redirect(reverse('guide:qa_detail', kwargs={
             'product_slug': product.slug,
             'sub_slug': subcategory.slug,
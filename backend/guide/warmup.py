@@ -0,0 +1,124 @@
+"""
+Прогрев воркера до первого запроса: импорт рендерера Markdown, компиляция
+шаблонов проекта в кэширующий загрузчик, заполнение URL-резолвера и первые
+запросы селекторов (соединение с БД, страницы SQLite в кэше ОС).
+
+Вызывается из giguide/asgi.py и giguide/wsgi.py (warm_up_on_startup, GUIDE_WARMUP) и командой manage.py warmup.
+"""
+from __future__ import annotations
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.template import engines
+from django.template.exceptions import TemplateDoesNotExist, TemplateSyntaxError
+from django.urls import get_resolver
+
+logger = logging.getLogger('guide.warmup')
+
+TEMPLATE_SUFFIXES = ('.html', '.txt', '.xml')
+
+
+def project_template_dirs() -> list[Path]:
+    """Каталоги шаблонов проекта и его приложений (шаблоны contrib.admin не трогаем)."""
+    base = Path(settings.BASE_DIR).resolve()
+    dirs = [Path(d) for conf in settings.TEMPLATES for d in conf.get('DIRS', [])]
+    for app in apps.get_app_configs():
+        path = Path(app.path).resolve()
+        if path.is_relative_to(base):
+            dirs.append(path / 'templates')
+    return [d for d in dirs if d.is_dir()]
+
+
+def preload_templates() -> int:
+    engine = engines['django']
+    loaded = 0
+    for directory in project_template_dirs():
+        for path in directory.rglob('*'):
+            if path.suffix not in TEMPLATE_SUFFIXES or not path.is_file():
+                continue
+            name = path.relative_to(directory).as_posix()
+            try:
+                engine.get_template(name)
+                loaded += 1
+            except (TemplateDoesNotExist, TemplateSyntaxError):
+                logger.debug('warmup: пропущен шаблон %s', name, exc_info=True)
+    return loaded
+
+
+def populate_urls() -> int:
+    resolver = get_resolver()
+    return len(resolver.reverse_dict) + len(resolver.namespace_dict)
+
+
+def import_renderers() -> int:
+    from guide.templatetags.md import markdown_safe
+    markdown_safe('**прогрев** [ссылка](https://example.com)')
+    return 1
+
+
+def prime_queries() -> int:
+    """Первые запросы главной: соединение, компиляция запросов ORM, горячие страницы индексов."""
+    from guide.selectors.nav import menu_links_qs
+    from guide.selectors.products import products_for_home
+    from guide.selectors.qa import quick_faq_groups
+
+    try:
+        return len(list(menu_links_qs())) + len(list(products_for_home())) + len(quick_faq_groups())
+    finally:
+        connections.close_all()
+
+
+STEPS: list[tuple[str, Callable[[], int]]] = [
+    ('renderers', import_renderers),
+    ('templates', preload_templates),
+    ('urls', populate_urls),
+    ('queries', prime_queries),
+]
+
+
+def warm_up(started: float | None = None) -> dict:
+    """
+    Выполняет шаги прогрева в отдельном потоке и ждёт его: под uvicorn модуль
+    приложения импортируется внутри цикла событий, а ORM там вызывать нельзя.
+    started — time.perf_counter() начала загрузки приложения, для отчёта о старте.
+    """
+    report: dict = {'steps': {}}
+
+    def run() -> None:
+        for name, step in STEPS:
+            began = time.perf_counter()
+            try:
+                count = step()
+            except Exception:
+                logger.exception('warmup: шаг %s завершился ошибкой', name)
+                count = None
+            report['steps'][name] = {'ms': round((time.perf_counter() - began) * 1000, 1), 'items': count}
+
+    began = time.perf_counter()
+    thread = threading.Thread(target=run, name='guide-warmup')
+    thread.start()
+    thread.join()
+    finished = time.perf_counter()
+
+    report['warmup_ms'] = round((finished - began) * 1000, 1)
+    if started is not None:
+        report['startup_ms'] = round((finished - started) * 1000, 1)
+    logger.info(
+        'worker ready: startup=%sms warmup=%sms %s',
+        report.get('startup_ms', '-'), report['warmup_ms'],
+        ' '.join(f'{name}={step["ms"]}ms' for name, step in report['steps'].items()),
+    )
+    return report
+
+
+def warm_up_on_startup(started: float | None = None) -> dict | None:
+    """Прогрев при загрузке воркера; GUIDE_WARMUP=False его отключает (тогда None)."""
+    if not settings.GUIDE_WARMUP:
+        return None
+    return warm_up(started=started)